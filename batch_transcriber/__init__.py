@@ -0,0 +1,2 @@
+from .batch_transcriber import *
+from .job_queue import *
@@ -0,0 +1,5 @@
+import sys
+
+from .batch_transcriber import main
+
+sys.exit(main())
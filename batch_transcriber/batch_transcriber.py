@@ -0,0 +1,181 @@
+import os, sys, json, time, uuid, argparse
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from cache_handler import *
+from video_downloader import download_video
+from job_scheduler import get_memory_scheduler
+from job_scheduler.cancellation import JobCancelled, cancellation_scope, make_cancellable
+from pipeline_metrics import get_metrics
+
+MEDIA_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".m4a", ".mp3", ".wav")
+DEFAULT_MODEL = "tiny"
+
+_worker_models = {}  # Whisper models loaded in this worker process
+
+def _preferred_model():
+    # The GUI settings, read without settings_window so that Qt is never imported
+    try:
+        with open(CONFIG_FILE, "r") as f:
+            return json.load(f).get("preferred_model", DEFAULT_MODEL)
+    except (OSError, json.JSONDecodeError):
+        return DEFAULT_MODEL
+
+def collect_items(paths, feeds):
+    """
+    Items to transcribe as {"name", "video_path", "url"}: the given media files, the media
+    files of the given directories and the lectures of the given cached feeds.
+    """
+    items = []
+    for path in paths:
+        if os.path.isdir(path):
+            for fname in sorted(os.listdir(path)):
+                if fname.lower().endswith(MEDIA_EXTENSIONS):
+                    items.append({"name": fname, "video_path": os.path.join(path, fname), "url": None})
+        elif os.path.isfile(path):
+            items.append({"name": os.path.basename(path), "video_path": path, "url": None})
+        else:
+            raise FileNotFoundError(f"No such file or directory: {path}")
+    for feed in feeds:
+        index_path = os.path.join(RSS_DIR, feed + ".json")
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f"No cached feed named {feed}, subscribe to it in the application first")
+        for entry in load_entry_index(index_path)["entries"]:
+            if entry["url"]:
+                # Named like the lectures downloaded from the feed list, so they share the cache
+                video_path = os.path.join(VIDEO_DIR, f"{entry['key']}.mp4")
+                items.append({"name": entry["key"], "video_path": video_path, "url": entry["url"]})
+    return items
+
+def transcribe_item(item, model_name, on_wait=None, token=None):
+    """
+    Download the item if needed and transcribe it into the cache, runs in a worker process.
+    The transcription waits for memory, and may use a smaller model, see MemoryScheduler.
+    Returns the time it took and the model used. Cancelling token (a CancellationToken)
+    stops the download or the transcription with JobCancelled and frees the model.
+    """
+    start = time.perf_counter()
+    video_path = item["video_path"]
+    if item["url"] and not os.path.exists(video_path):
+        download_video(item["url"], video_path, token=token)
+
+    scheduler = get_memory_scheduler()
+    metrics = get_metrics()
+    with scheduler.reserve(model_name, on_wait, token=token) as model_name:
+        model = _worker_models.get(model_name)
+        if not metrics.cache_lookup("model", model is not None):
+            import whisper
+            with metrics.stage("model_load", job=model_name, model=model_name):
+                model = _worker_models[model_name] = make_cancellable(whisper.load_model(model_name))
+            scheduler.set_resident(model_name, True)
+        try:
+            with cancellation_scope(token), \
+                    metrics.stage("transcribe", job=os.path.basename(video_path), model=model_name) as record:
+                result = model.transcribe(video_path)  # Whisper decodes the audio with ffmpeg itself
+                segments = result.get("segments") or [{"end": 0}]
+                record["audio_seconds"] = get_video_duration(video_path) or segments[-1]["end"]
+        except JobCancelled:
+            del model  # The traceback keeps this frame alive, and the model with it
+            _worker_models.pop(model_name, None)
+            scheduler.set_resident(model_name, False)
+            raise
+
+    cache_file = get_cache_path(video_path, model_name)
+    tmp_file = f"{cache_file}.{uuid.uuid4().hex[:8]}.tmp"  # Unique, workers may share the cache
+    with open(tmp_file, "w") as f:
+        json.dump(result, f)
+    os.replace(tmp_file, cache_file)
+    return time.perf_counter() - start, model_name
+
+def _transcribe_in_worker(item, model_name):
+    # Pool workers exit without running atexit, their metrics are written after each item
+    try:
+        return transcribe_item(item, model_name)
+    finally:
+        get_metrics().flush()
+
+def run_batch(items, model_name, workers=1):
+    """Transcribe items not cached yet with a pool of worker processes, returns the number of failures."""
+    start = time.perf_counter()
+    todo = []
+    for item in items:
+        if os.path.exists(get_cache_path(item["video_path"], model_name)):
+            print(f"[skipped] {item['name']}: already transcribed")
+        else:
+            todo.append(item)
+
+    failed = 0
+    if todo:
+        # Each worker process holds its own model, don't start more than the memory can hold
+        scheduler = get_memory_scheduler()
+        budget = scheduler.get_budget()
+        if budget:
+            fitting = max(1, budget // scheduler.required_memory(model_name))
+            if fitting < workers:
+                print(f"Using {fitting} workers instead of {workers}, {model_name} needs "
+                      f"{scheduler.required_memory(model_name) / (1 << 30):.1f} GB each")
+                workers = fitting
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_transcribe_in_worker, item, model_name): item for item in todo}
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    seconds, used_model = future.result()
+                    downgraded = f" with {used_model}" if used_model != model_name else ""
+                    print(f"[done] {item['name']}: {seconds:.1f}s{downgraded}")
+                except Exception as e:
+                    failed += 1
+                    print(f"[failed] {item['name']}: {e}")
+
+    total = time.perf_counter() - start
+    print(f"{len(todo) - failed} transcribed, {len(items) - len(todo)} skipped, {failed} failed "
+          f"in {total:.1f}s with model {model_name}")
+    return failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m batch_transcriber",
+                                     description="Transcribe videos into the cache without the GUI.")
+    parser.add_argument("paths", nargs="*", help="media files or directories to transcribe")
+    parser.add_argument("--feed", action="append", default=[],
+                        help="cached feed whose lectures are downloaded and transcribed, can be repeated")
+    parser.add_argument("--model", help="Whisper model, the preferred model of the settings by default")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of worker processes (default 1)")
+    parser.add_argument("--memory-budget", type=float, default=0,
+                        help="GB of memory the transcriptions may use, 75%% of the physical memory by default")
+    parser.add_argument("--allow-downgrade", action="store_true",
+                        help="use a smaller model rather than wait when the memory is short")
+    parser.add_argument("--enqueue", action="store_true",
+                        help="add the items to the queue shared through the cache directory instead")
+    parser.add_argument("--worker", action="store_true", help="process the shared queue until it is empty")
+    parser.add_argument("--forever", action="store_true", help="with --worker, wait for new jobs when idle")
+    parser.add_argument("--queue-status", action="store_true", help="print the number of jobs in the shared queue")
+    parser.add_argument("--cancel", nargs="+", metavar="JOB", help="cancel queued or running jobs, by id or item name")
+    args = parser.parse_args(argv)
+
+    from .job_queue import enqueue_items, run_worker, queue_status, cancel_jobs
+    get_memory_scheduler().configure(int(args.memory_budget * (1 << 30)), args.allow_downgrade)
+    if args.queue_status:
+        print(", ".join(f"{count} {name}" for name, count in queue_status().items()))
+        return 0
+    if args.cancel:
+        print(f"{cancel_jobs(set(args.cancel))} jobs cancelled")
+        return 0
+    if args.worker:
+        return 1 if run_worker(exit_when_idle=not args.forever) else 0
+    if not args.paths and not args.feed:
+        parser.error("nothing to transcribe, give files, directories or --feed")
+
+    os.makedirs(VIDEO_DIR, exist_ok=True)
+    os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
+    try:
+        items = collect_items(args.paths, args.feed)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        return 2
+    model_name = args.model or _preferred_model()
+    if args.enqueue:
+        # Paths in the cache are stored relative to it, see enqueue_items()
+        print(f"{enqueue_items(items, model_name)} jobs queued with model {model_name}")
+        return 0
+    failed = run_batch(items, model_name, max(1, args.jobs))
+    return 1 if failed else 0
@@ -0,0 +1,288 @@
+import os, json, time, uuid, socket, hashlib, threading
+
+from cache_handler import *
+from job_scheduler.cancellation import CancellationToken, JobCancelled
+
+from .batch_transcriber import transcribe_item
+
+# Job files move between these directories of QUEUE_DIR, always with an atomic rename
+PENDING_DIR = QUEUE_DIR + "pending/"
+CLAIMED_DIR = QUEUE_DIR + "claimed/"
+DONE_DIR = QUEUE_DIR + "done/"
+FAILED_DIR = QUEUE_DIR + "failed/"
+CANCELLED_DIR = QUEUE_DIR + "cancelled/"
+
+LEASE_SECONDS = 300  # A claimed job without heartbeat for this long is given to another worker
+HEARTBEAT_SECONDS = 30
+CANCEL_POLL = 2  # Seconds between two checks that a claimed job wasn't cancelled
+RECLAIM_GRACE = 1  # Seconds a job file may be missing while a reclaimer checks its lease
+MAX_ATTEMPTS = 3
+IDLE_POLL = 10  # Seconds between two looks at an empty queue
+
+def _make_queue_dirs():
+    for directory in (PENDING_DIR, CLAIMED_DIR, DONE_DIR, FAILED_DIR, CANCELLED_DIR):
+        os.makedirs(directory, exist_ok=True)
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+def _job_id(video_path, model_name):
+    # The same transcript always gets the same job, so it can't be queued twice
+    return hashlib.md5(get_cache_path(video_path, model_name).encode()).hexdigest()[:16]
+
+def _queued_ids():
+    ids = set()
+    for directory in (PENDING_DIR, CLAIMED_DIR):
+        for fname in os.listdir(directory):
+            if fname.endswith((".json", ".reclaiming")):
+                ids.add(fname.split("--")[0].removesuffix(".json"))
+    return ids
+
+def _stored_video_path(video_path):
+    """
+    Path of a video as stored in a job: relative to CACHE_DIR when in the cache (the lectures
+    of the feeds), whose location differs between hosts, absolute otherwise.
+    """
+    video_path = os.path.abspath(video_path)
+    try:
+        relative = os.path.relpath(video_path, CACHE_DIR)
+    except ValueError:
+        return video_path  # On another drive
+    if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+        return video_path  # Outside of the cache, workers must see it at the same path
+    return relative
+
+def _local_video_path(job):
+    """Path of the video of a job on this host."""
+    return os.path.join(CACHE_DIR, job["video_path"]) if job.get("in_cache") else job["video_path"]
+
+def enqueue_items(items, model_name):
+    """
+    Add items (see collect_items) to the shared queue, skipping the ones already transcribed
+    or queued. Returns the number of jobs added.
+    """
+    _make_queue_dirs()
+    queued = _queued_ids()
+    added = 0
+    for item in items:
+        job_id = _job_id(item["video_path"], model_name)
+        if job_id in queued or os.path.exists(get_cache_path(item["video_path"], model_name)):
+            continue
+        video_path = _stored_video_path(item["video_path"])
+        job = dict(item, video_path=video_path, in_cache=not os.path.isabs(video_path),
+                   id=job_id, model=model_name, attempts=0, errors=[])
+        # Written aside and renamed, a worker never sees a partial job
+        tmp_path = os.path.join(QUEUE_DIR, f"{job_id}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(job, f)
+        os.replace(tmp_path, os.path.join(PENDING_DIR, f"{job_id}.json"))
+        queued.add(job_id)
+        added += 1
+    return added
+
+def reclaim_stale_jobs(lease_seconds=LEASE_SECONDS):
+    """Put back in the queue the claimed jobs whose worker stopped sending heartbeats."""
+    reclaimed = 0
+    for fname in os.listdir(CLAIMED_DIR):
+        if not fname.endswith((".json", ".reclaiming")):
+            continue  # .reclaiming: left by a reclaimer that died, its lease is checked again
+        path = os.path.join(CLAIMED_DIR, fname)
+        claimed_name = fname.split(".json")[0] + ".json"
+        try:
+            if time.time() - os.path.getmtime(path) < lease_seconds:
+                continue
+            # Taken aside first, only one of the workers reclaiming it at the same time succeeds.
+            # A heartbeat may have come between the check and the rename, the lease is checked
+            # again once the job is ours and the file put back if the worker is alive
+            aside_path = os.path.join(CLAIMED_DIR, f"{claimed_name}.{uuid.uuid4().hex[:8]}.reclaiming")
+            os.rename(path, aside_path)
+            if time.time() - os.stat(aside_path).st_mtime < lease_seconds:
+                os.rename(aside_path, os.path.join(CLAIMED_DIR, claimed_name))
+                continue
+            os.rename(aside_path, os.path.join(PENDING_DIR, claimed_name.split("--")[0].removesuffix(".json") + ".json"))
+            print(f"Reclaimed job {claimed_name} from a dead worker")
+            reclaimed += 1
+        except FileNotFoundError:
+            pass  # Finished, or reclaimed by someone else
+    return reclaimed
+
+def _pid_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        pass  # Exists but belongs to someone else, or can't tell on this platform
+    return True
+
+def reclaim_local_jobs():
+    """
+    Put back in the queue, without waiting for their lease, the jobs claimed by workers of
+    this host that aren't running anymore, e.g. after a reboot.
+    """
+    hostname = socket.gethostname()
+    reclaimed = 0
+    for fname in os.listdir(CLAIMED_DIR):
+        if not fname.endswith(".json") or "--" not in fname:
+            continue
+        worker_host, _, pid = fname.removesuffix(".json").split("--", 1)[1].rpartition("-")
+        if worker_host != hostname or not pid.isdigit() or _pid_running(int(pid)):
+            continue
+        try:
+            os.rename(os.path.join(CLAIMED_DIR, fname), os.path.join(PENDING_DIR, fname.split("--")[0] + ".json"))
+            print(f"Reclaimed job {fname} from a stopped worker of this host")
+            reclaimed += 1
+        except FileNotFoundError:
+            pass
+    return reclaimed
+
+def claim_job(worker_id):
+    """Claim a pending job, returns (claimed path, job) or None if the queue is empty."""
+    for fname in sorted(os.listdir(PENDING_DIR)):
+        if not fname.endswith(".json"):
+            continue
+        pending_path = os.path.join(PENDING_DIR, fname)
+        claimed_path = os.path.join(CLAIMED_DIR, f"{fname.removesuffix('.json')}--{worker_id}.json")
+        try:
+            # The modification time is the lease: refresh it first, rename keeps it
+            os.utime(pending_path)
+            os.rename(pending_path, claimed_path)
+        except FileNotFoundError:
+            continue  # Claimed by another worker first
+        with open(claimed_path, "r") as f:
+            return claimed_path, json.load(f)
+    return None
+
+def cancel_jobs(names):
+    """
+    Cancel the queued jobs with these ids or item names. A claimed job is stopped by its
+    worker within CANCEL_POLL seconds. Returns the number of jobs cancelled.
+    """
+    _make_queue_dirs()
+    cancelled = 0
+    for directory in (PENDING_DIR, CLAIMED_DIR):
+        for fname in os.listdir(directory):
+            if not fname.endswith(".json"):
+                continue
+            path = os.path.join(directory, fname)
+            try:
+                with open(path, "r") as f:
+                    job = json.load(f)
+                if job["id"] not in names and job["name"] not in names:
+                    continue
+                os.rename(path, os.path.join(CANCELLED_DIR, f"{job['id']}.json"))
+            except FileNotFoundError:
+                continue  # Finished or moved meanwhile
+            print(f"[cancelled] {job['name']}")
+            cancelled += 1
+    return cancelled
+
+class _Heartbeat:
+    """
+    Refreshes the lease of a claimed job in the background while it is processed. The job
+    file disappears when the job is cancelled or reclaimed, its token is cancelled then.
+    """
+    def __init__(self, claimed_path, token):
+        self.claimed_path = claimed_path
+        self.token = token
+        self.stopped = threading.Event()
+        self.lost = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        last_beat = time.monotonic()
+        while not self.stopped.wait(CANCEL_POLL):
+            try:
+                if time.monotonic() - last_beat >= HEARTBEAT_SECONDS:
+                    os.utime(self.claimed_path)
+                    last_beat = time.monotonic()
+                elif not os.path.exists(self.claimed_path):
+                    raise FileNotFoundError(self.claimed_path)
+            except FileNotFoundError:
+                # Give a reclaimer checking the lease at this moment the time to put it back
+                if self.stopped.wait(RECLAIM_GRACE):
+                    return
+                if os.path.exists(self.claimed_path):
+                    continue  # The heartbeat is sent at the next poll
+                self.lost = True  # Cancelled, or reclaimed because the worker was considered dead
+                self.token.cancel()
+                return
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+def process_claimed(claimed_path, job):
+    """
+    Transcribe a claimed job and move it to done, back to pending or to failed, returns which,
+    or "cancelled" if it was stopped because it was cancelled or reclaimed meanwhile.
+    """
+    token = CancellationToken()
+    heartbeat = _Heartbeat(claimed_path, token)
+    try:
+        item = dict(job, video_path=_local_video_path(job))
+        seconds, model_name = transcribe_item(item, job["model"], token=token)
+        error = None
+    except JobCancelled:
+        print(f"[stopped] {job['name']}: cancelled or given to another worker")
+        return "cancelled"
+    except Exception as e:
+        error = str(e)
+    finally:
+        heartbeat.stop()
+    if heartbeat.lost:
+        # Another worker may be transcribing it again, the cache write is atomic either way
+        print(f"[lease lost] {job['name']}")
+    try:
+        if error is None:
+            os.rename(claimed_path, os.path.join(DONE_DIR, f"{job['id']}.json"))
+            print(f"[done] {job['name']}: {seconds:.1f}s with {model_name}")
+            return "done"
+        job["attempts"] += 1
+        job["errors"].append(error)
+        retry = job["attempts"] < MAX_ATTEMPTS
+        # Rewrite the claimed file, then move it: it is in exactly one directory at any time
+        _write_atomic(claimed_path, job)
+        os.rename(claimed_path, os.path.join(PENDING_DIR if retry else FAILED_DIR, f"{job['id']}.json"))
+        print(f"[{'retry' if retry else 'failed'}] {job['name']}: {error}")
+        return "pending" if retry else "failed"
+    except FileNotFoundError:
+        return "reclaimed"  # Reclaimed meanwhile, it is someone else's now
+
+def run_worker(exit_when_idle=True, lease_seconds=LEASE_SECONDS):
+    """
+    Process jobs of the shared queue until it is empty (or forever). Any number of workers,
+    on any host mounting the cache, can run at the same time: a job is claimed by renaming
+    its file, which only one of them can do, and its lease is kept alive by heartbeats.
+    Returns the number of jobs that failed in this worker.
+    """
+    _make_queue_dirs()
+    os.makedirs(VIDEO_DIR, exist_ok=True)
+    os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    print(f"Worker {worker_id} started")
+    reclaim_local_jobs()
+    failed = 0
+    while True:
+        reclaim_stale_jobs(lease_seconds)
+        claimed = claim_job(worker_id)
+        if claimed is None:
+            if exit_when_idle and not os.listdir(CLAIMED_DIR):
+                break
+            time.sleep(IDLE_POLL)
+            continue
+        if process_claimed(*claimed) == "failed":
+            failed += 1
+    print(f"Worker {worker_id} finished, the queue is empty")
+    return failed
+
+def queue_status():
+    _make_queue_dirs()
+    return {name: len([f for f in os.listdir(directory) if f.endswith(".json")])
+            for name, directory in (("pending", PENDING_DIR), ("claimed", CLAIMED_DIR),
+                                    ("done", DONE_DIR), ("failed", FAILED_DIR),
+                                    ("cancelled", CANCELLED_DIR))}
@@ -1,4 +1,7 @@
 from .video_hash import get_video_hash
-from .get_path import get_cache_path, get_cache_video_path
+from .get_path import get_cache_path, get_cache_audio_path, get_cache_video_path
 from .rss_cache import *
-from .cache_directories import *
\ No newline at end of file
+from .rss_index import *
+from .cache_directories import *
+from .thumbnails import *
+from .cache_usage import *
\ No newline at end of file
@@ -26,4 +26,16 @@ CONFIG_FILE = CACHE_DIR + "config.json"
 RSS_DIR = CACHE_DIR + "rss/"
 VIDEO_DIR = CACHE_DIR + "videos/"
 URL_DIR = CACHE_DIR + "url/"
-TRANSCRIPT_DIR = CACHE_DIR + "transcript/"
\ No newline at end of file
+RSS_META_DIR = CACHE_DIR + "rss_meta/"
+TRANSCRIPT_DIR = CACHE_DIR + "transcript/"
+THUMBNAIL_DIR = CACHE_DIR + "thumbnails/"
+DAEMON_FILE = CACHE_DIR + "daemon.json"
+QUEUE_DIR = CACHE_DIR + "queue/"
+MODEL_MEMORY_FILE = CACHE_DIR + "model_memory.json"
+JOBS_DIR = CACHE_DIR + "jobs/"
+WAVEFORM_DIR = CACHE_DIR + "waveforms/"
+SLIDES_DIR = CACHE_DIR + "slides/"
+SPRITES_DIR = CACHE_DIR + "sprites/"
+PROXY_DIR = CACHE_DIR + "proxies/"
+METRICS_LOG = CACHE_DIR + "metrics.jsonl"
+METRICS_FILE = CACHE_DIR + "metrics.prom"
@@ -0,0 +1,49 @@
+import os
+
+from .cache_directories import *
+
+DEFAULT_CACHE_BUDGET = 20  # GB of lectures the prefetch may fill the cache up to, 0 for no limit
+
+# Directories of the lecture files, what the cache budget applies to
+LECTURE_DIRS = [VIDEO_DIR, AUDIO_DIR, TRANSCRIPT_DIR, WAVEFORM_DIR, SLIDES_DIR, SPRITES_DIR, PROXY_DIR]
+
+def _directory_size(directory):
+    total = 0
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        total += entry.stat(follow_symlinks=False).st_size
+                    elif entry.is_dir(follow_symlinks=False):
+                        total += _directory_size(entry.path)  # e.g. the sprite sheets of a video
+                except OSError:
+                    pass  # Removed meanwhile
+    except FileNotFoundError:
+        pass
+    return total
+
+def get_cache_usage():
+    """Bytes used by the cached lectures, partial downloads included."""
+    return sum(_directory_size(directory) for directory in LECTURE_DIRS)
+
+def estimate_lecture_size():
+    """Mean size of the cached videos, 0 when there is none yet."""
+    sizes = []
+    try:
+        with os.scandir(VIDEO_DIR) as it:
+            for entry in it:
+                if entry.name.endswith(".mp4"):
+                    try:
+                        sizes.append(entry.stat().st_size)
+                    except OSError:
+                        pass
+    except FileNotFoundError:
+        pass
+    return sum(sizes) // len(sizes) if sizes else 0
+
+def fits_cache_budget(budget_gb, needed=0):
+    """True if needed more bytes fit in a cache budget of budget_gb, 0 being no limit."""
+    if not budget_gb:
+        return True
+    return get_cache_usage() + needed <= budget_gb * (1 << 30)
@@ -6,6 +6,7 @@ from .video_hash import *  # Import hash function
 from .cache_directories import *  # Import hash function
 
 os.makedirs(CACHE_DIR, exist_ok=True)  # Ensure the cache directory exists
+os.makedirs(AUDIO_DIR, exist_ok=True)  # Ensure the cache directory exists
 
 def get_cache_path(video_path, model_name):
     video_path = Path(video_path).stem
@@ -13,5 +14,9 @@ def get_cache_path(video_path, model_name):
     # video_hash = get_video_hash(video_path) changed video_cache with video_path next
     return os.path.join(TRANSCRIPT_DIR, f"{video_path}_{model_name}.json")
 
+def get_cache_audio_path(video_path):
+    """Audio track of a video kept without the video (audio only acquisition)."""
+    return os.path.join(AUDIO_DIR, f"{Path(video_path).stem}.m4a")
+
 def get_cache_video_path():
     return os.path.join(CACHE_DIR)
\ No newline at end of file
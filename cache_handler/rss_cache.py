@@ -2,35 +2,47 @@ import os, json
 
 from .video_hash import *  # Import hash function
 from .cache_directories import *
+from .rss_index import *
 
 os.makedirs(RSS_DIR, exist_ok=True)  # Ensure the cache directory existss
 os.makedirs(URL_DIR, exist_ok=True)  # Ensure the cache directory existss
+os.makedirs(RSS_META_DIR, exist_ok=True)  # Ensure the cache directory existss
 
 def set_rss_cache(feed_rss, url_rss):
-    """Set rss feed in cache"""
-    rss_cache_file_path = RSS_DIR+url_rss
-    with open(f"{rss_cache_file_path}.json", "w") as f:
-        json.dump(feed_rss, f, ensure_ascii=False, indent=4)
+    """Set rss feed in cache as a compact entry index, returns the entries that are new"""
+    index_path = os.path.join(RSS_DIR, url_rss + ".json")
+    try:
+        previous = load_entry_index(index_path) if os.path.exists(index_path) else None
+    except (ValueError, TypeError, AttributeError, KeyError) as e:
+        print(f"Corrupt feed index {index_path}, rebuilt: {e}")
+        save_entry_index(index_path, build_entry_index(feed_rss))
+        return []  # Which entries are new is unknown, the back catalog isn't reported
+    index = build_entry_index(feed_rss, previous)
+    save_entry_index(index_path, index)
+
+    known_ids = {e["id"] for e in previous["entries"]} if previous else set()
+    return [e for e in index["entries"] if e["id"] not in known_ids]
 
 def get_rss_cache(url_rss):
-    """Get rss feed in cache"""
-    # Construct the file path; note: you may want to use a hash or other sanitization
-    # in a real-world scenario to avoid filename issues.
+    """Get the entries of the rss feed in cache"""
     cache_file_path = os.path.join(RSS_DIR, url_rss + ".json")
     
     if not os.path.exists(cache_file_path):
         return []
     
-    with open(cache_file_path, "r", encoding="utf-8") as f:
-        feed_data = json.load(f)
-    
-    urls = []
+    try:
+        return load_entry_index(cache_file_path)["entries"]
+    except (ValueError, TypeError, AttributeError, KeyError) as e:
+        print(f"Corrupt feed index {cache_file_path}: {e}")
+        return []  # Rebuilt by the next set_rss_cache
 
 def set_rss_url_cache(feed_rss, url_rss):
     """Set rss furl eed in cache"""
-    rss_cache_file_path = URL_DIR+url_rss
-    with open(f"{rss_cache_file_path}.json", "w") as f:
+    rss_cache_file_path = f"{URL_DIR}{url_rss}.json"
+    tmp_path = rss_cache_file_path + ".tmp"
+    with open(tmp_path, "w") as f:
         json.dump(feed_rss, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, rss_cache_file_path)  # Never leave a truncated file
 
 def get_rss_url_cache(url_rss):
     """Get rss feed in cache"""
@@ -42,7 +54,20 @@ def get_rss_url_cache(url_rss):
         return []
     
     with open(cache_file_path, "r", encoding="utf-8") as f:
-        feed_data = json.load(f)
+        feed_url = json.load(f)
     
-    urls = []
-    return 
\ No newline at end of file
+    return feed_url
+
+def set_rss_validators(url_rss, etag, last_modified):
+    """Store the ETag and Last-Modified headers of the last feed download"""
+    with open(os.path.join(RSS_META_DIR, url_rss + ".json"), "w") as f:
+        json.dump({"etag": etag, "last_modified": last_modified}, f)
+
+def get_rss_validators(url_rss):
+    """Get the headers for a conditional GET of the feed, empty if the feed was never downloaded"""
+    cache_file_path = os.path.join(RSS_META_DIR, url_rss + ".json")
+    try:
+        with open(cache_file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
\ No newline at end of file
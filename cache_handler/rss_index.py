@@ -0,0 +1,146 @@
+import os, json, hashlib, threading
+
+from .cache_directories import *
+
+INDEX_VERSION = 1
+
+# Whisper models a cached transcript can be named after
+TRANSCRIPT_MODELS = ["tiny", "base", "small", "medium", "large", "turbo"]
+
+# Cache status of a lecture
+STATUS_MISSING = "missing"  # Nothing cached
+STATUS_DOWNLOADED = "downloaded"  # Video cached, not transcribed
+STATUS_TRANSCRIBED = "transcribed"  # Video and transcript cached
+STATUS_AUDIO_ONLY = "audio_only"  # Transcribed, video not cached
+
+_index_cache = {}  # index path -> (mtime, index), shared with the callers, never modified
+_index_lock = threading.Lock()
+
+def _entry_id(entry):
+    """Stable id of a feed entry, from its guid, or its link when the feed has none."""
+    source = entry.get("id") or entry.get("link") or (entry.get("title", "") + str(entry.get("published", "")))
+    return hashlib.md5(source.encode("utf-8")).hexdigest()[:16]
+
+def _entry_key(title, date):
+    """The lecture name used for the cached files: title upper cases and day-month-year."""
+    date_str = f"_{date[2]}-{date[1]}-{date[0]}" if date else ""
+    return ''.join(c for c in title if c.isupper()) + date_str
+
+def _parse_duration(duration):
+    """itunes:duration is either seconds or [[HH:]MM:]SS."""
+    try:
+        seconds = 0
+        for part in str(duration).split(":"):
+            seconds = seconds * 60 + float(part)
+        return int(seconds)
+    except ValueError:
+        return None
+
+def _media_url(entry):
+    # The enclosure is the media file, the link is often the page of the lecture
+    for enclosure in entry.get("enclosures", []):
+        if enclosure.get("href"):
+            return enclosure["href"]
+    return entry.get("link") or None
+
+def build_entry_index(feed, previous=None):
+    """
+    Normalize a parsed feed into a compact entry index:
+    {"version", "title", "entries": [{"id", "key", "title", "date", "url", "duration"}]}
+
+    Entries already in the previous index keep their key, so cached files stay attached to
+    them. New keys are checked against the ones in use and get a numbered suffix on collision.
+    """
+    previous_keys = {e["id"]: e["key"] for e in (previous or {}).get("entries", [])}
+    used_keys = set(previous_keys.values())
+    entries = []
+    for raw in feed.get("entries", []):
+        entry_id = _entry_id(raw)
+        title = raw.get("title", "Missing title")
+        date = raw.get("published_parsed")
+        date = list(date[:3]) if date else None
+        key = previous_keys.get(entry_id)
+        if key is None:
+            base_key = key = _entry_key(title, date)
+            suffix = 2
+            while key in used_keys:
+                key = f"{base_key}_{suffix}"
+                suffix += 1
+            used_keys.add(key)
+        duration = raw.get("itunes_duration")
+        entries.append({
+            "id": entry_id,
+            "key": key,
+            "title": title,
+            "date": date,
+            "url": _media_url(raw),
+            "duration": _parse_duration(duration) if duration else None,
+        })
+    return {"version": INDEX_VERSION, "title": feed.get("feed", {}).get("title", ""), "entries": entries}
+
+def save_entry_index(index_path, index):
+    """Write the index to index_path, it is kept in memory for load_entry_index, don't modify it afterwards."""
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, index_path)
+    with _index_lock:
+        _index_cache[index_path] = (os.path.getmtime(index_path), index)
+
+def load_entry_index(index_path):
+    """
+    Entry index stored at index_path, read from disk only when the file changed.
+    Raw feedparser dumps written by older versions are converted on the fly.
+    The index is shared by the callers and must not be modified, copy it to make changes.
+    """
+    try:
+        mtime = os.path.getmtime(index_path)
+    except OSError:
+        return {"version": INDEX_VERSION, "title": "", "entries": []}
+    with _index_lock:
+        cached = _index_cache.get(index_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    with open(index_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != INDEX_VERSION:
+        data = build_entry_index(data)
+        save_entry_index(index_path, data)
+        return data
+    with _index_lock:
+        _index_cache[index_path] = (mtime, data)
+    return data
+
+def _transcribed_keys():
+    keys = set()
+    if os.path.isdir(TRANSCRIPT_DIR):
+        for fname in os.listdir(TRANSCRIPT_DIR):
+            base, ext = os.path.splitext(fname)
+            key, _, model = base.rpartition("_")
+            if ext.lower() == ".json" and model in TRANSCRIPT_MODELS:
+                keys.add(key)
+    return keys
+
+def _cached_video_keys():
+    if not os.path.isdir(VIDEO_DIR):
+        return set()
+    return {os.path.splitext(f)[0] for f in os.listdir(VIDEO_DIR) if f.endswith(".mp4")}
+
+def _status(video_cached, transcribed):
+    if video_cached:
+        return STATUS_TRANSCRIBED if transcribed else STATUS_DOWNLOADED
+    return STATUS_AUDIO_ONLY if transcribed else STATUS_MISSING
+
+def get_cache_status(key):
+    """Cache status of a single lecture."""
+    video_cached = os.path.exists(os.path.join(VIDEO_DIR, f"{key}.mp4"))
+    transcribed = any(os.path.exists(os.path.join(TRANSCRIPT_DIR, f"{key}_{model}.json"))
+                      for model in TRANSCRIPT_MODELS)
+    return _status(video_cached, transcribed)
+
+def get_cache_statuses(keys):
+    """Cache status of many lectures, listing each cache directory once."""
+    videos = _cached_video_keys()
+    transcripts = _transcribed_keys()
+    return {key: _status(key in videos, key in transcripts) for key in keys}
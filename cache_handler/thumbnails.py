@@ -0,0 +1,57 @@
+import os, ffmpeg, hashlib
+
+from pathlib import Path
+
+from .cache_directories import *
+
+os.makedirs(THUMBNAIL_DIR, exist_ok=True)  # Ensure the cache directory exists
+
+# Position of the representative frame, as a fraction of the video duration.
+# The first seconds of a lecture are usually a black screen or a title card.
+THUMBNAIL_POSITION = 0.1
+
+def get_thumbnail_path(video_path, width, height):
+    """Thumbnails are cached per video and per icon size."""
+    video_name = Path(video_path).stem
+    # Videos with the same name in different folders get their own thumbnail
+    path_hash = hashlib.md5(os.path.abspath(video_path).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(THUMBNAIL_DIR, f"{video_name}_{path_hash}_{width}x{height}.png")
+
+def get_video_duration(video_path):
+    """Return the video duration in seconds, or 0 if ffprobe can't tell."""
+    try:
+        probe = ffmpeg.probe(video_path)
+        return float(probe["format"].get("duration", 0))
+    except (ffmpeg.Error, KeyError, ValueError, OSError):
+        return 0
+
+def generate_thumbnail(video_path, width, height):
+    """
+    Extract a representative frame of the video with ffmpeg and store it in the
+    thumbnail cache, scaled and padded to the given size.
+    Returns the thumbnail path, or None if the extraction failed.
+    """
+    thumbnail_path = get_thumbnail_path(video_path, width, height)
+    if os.path.exists(thumbnail_path) and os.path.getmtime(thumbnail_path) >= os.path.getmtime(video_path):
+        return thumbnail_path
+
+    # Seeking on the input lets ffmpeg jump to the closest keyframe
+    # instead of decoding everything up to the position.
+    position = get_video_duration(video_path) * THUMBNAIL_POSITION
+    tmp_path = thumbnail_path + ".tmp.png"
+    try:
+        (
+            ffmpeg
+            .input(video_path, ss=f"{position:.2f}")
+            .filter("scale", width, height, force_original_aspect_ratio="decrease")
+            .filter("pad", width, height, "(ow-iw)/2", "(oh-ih)/2")
+            .output(tmp_path, vframes=1)
+            .run(overwrite_output=True, quiet=True)
+        )
+        os.replace(tmp_path, thumbnail_path)  # Never expose half written files
+    except (ffmpeg.Error, OSError) as e:
+        print(f"Error generating thumbnail for {video_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+    return thumbnail_path
@@ -0,0 +1,4 @@
+from .memory_scheduler import *
+from .priority_scheduler import *
+from .cancellation import *
+from .job_store import *
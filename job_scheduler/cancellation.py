@@ -0,0 +1,130 @@
+import signal, threading, subprocess
+
+from contextlib import contextmanager
+
+PROCESS_POLL = 0.5  # Seconds between two looks at the token while waiting for a process
+
+class JobCancelled(Exception):
+    """Raised in a job at its next check once its token was cancelled."""
+
+class CancellationToken:
+    """
+    Cooperative cancellation and pause of a job. The job calls check() between its steps
+    (download chunks, Whisper windows...), which blocks while the job is paused and raises
+    JobCancelled once it is cancelled. Callbacks registered with on_cancel() are called
+    once on cancellation, from the cancelling thread, to stop what can't check by itself.
+    """
+    def __init__(self):
+        self.cancelled = False
+        self.paused = False
+        self.callbacks = []
+        self.condition = threading.Condition()
+
+    def cancel(self):
+        with self.condition:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            self.condition.notify_all()
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def pause(self):
+        with self.condition:
+            self.paused = True
+
+    def resume(self):
+        with self.condition:
+            self.paused = False
+            self.condition.notify_all()
+
+    def is_cancelled(self):
+        return self.cancelled
+
+    def is_paused(self):
+        return self.paused and not self.cancelled
+
+    def on_cancel(self, callback):
+        with self.condition:
+            if not self.cancelled:
+                self.callbacks.append(callback)
+                return
+        callback()
+
+    def wait_resumed(self, timeout=None):
+        """Block while paused, False if still paused after timeout."""
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.paused or self.cancelled, timeout)
+
+    def sleep(self, seconds):
+        """time.sleep() ending early, with JobCancelled, when the job is cancelled."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.cancelled, seconds)
+        self.check()
+
+    def check(self):
+        with self.condition:
+            self.condition.wait_for(lambda: not self.paused or self.cancelled)
+            if self.cancelled:
+                raise JobCancelled("Cancelled")
+
+def check_token(token):
+    if token is not None:
+        token.check()
+
+def wait_process(process, token=None, poll=PROCESS_POLL):
+    """
+    communicate() with a subprocess while following token: the process is killed when the
+    token is cancelled, and stopped while the job is paused where the platform allows it.
+    Returns (stdout, stderr) like communicate().
+    """
+    from .priority_scheduler import lower_child_priority  # It imports this module
+    lower_child_priority(process)
+    while True:
+        try:
+            return process.communicate(timeout=poll)
+        except subprocess.TimeoutExpired:
+            pass  # Retrying communicate() doesn't lose any output
+        if token is None:
+            continue
+        if token.is_paused() and hasattr(signal, "SIGSTOP"):
+            process.send_signal(signal.SIGSTOP)
+            token.wait_resumed()
+            process.send_signal(signal.SIGCONT)
+        if token.is_cancelled():
+            process.kill()
+            process.communicate()
+            raise JobCancelled("Cancelled")
+
+# --- Whisper windows --- #
+_thread_state = threading.local()
+
+@contextmanager
+def cancellation_scope(token):
+    """Make token the one checked by the Whisper models used by this thread, see make_cancellable()."""
+    previous = getattr(_thread_state, "token", None)
+    _thread_state.token = token
+    try:
+        yield token
+    finally:
+        _thread_state.token = previous
+
+def make_cancellable(model):
+    """
+    Have a Whisper model check the token of the calling thread before decoding each of its
+    30 second windows, transcribe() gives no other hook. A model is shared by the
+    transcriptions of the process, one at a time (see model_cache.transcribing()) but from
+    whichever thread runs them, so the token is looked up per thread instead of being bound
+    to the model.
+    """
+    if getattr(model, "cancellable", False):
+        return model
+    decode = model.decode
+
+    def checked_decode(*args, **kwargs):
+        check_token(getattr(_thread_state, "token", None))
+        return decode(*args, **kwargs)
+    model.decode = checked_decode
+    model.cancellable = True
+    return model
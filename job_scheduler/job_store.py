@@ -0,0 +1,207 @@
+import os, json, time, uuid, threading
+
+from contextlib import contextmanager
+
+from cache_handler import *
+
+# Kinds of jobs of the application
+JOB_LECTURE = "lecture"  # Download and transcription of a feed lecture by the auto pipeline
+JOB_AUDIO_ONLY = "audio only"  # Audio track download and transcription from the feed list
+JOB_DOWNLOAD = "download"  # Video download from the feed list
+JOB_TRANSCRIPTION = "transcription"  # Transcription started from the transcriber page
+
+# Job states
+STATE_QUEUED = "queued"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+STATE_CANCELLED = "cancelled"
+STATE_INTERRUPTED = "interrupted"  # The application stopped before the end, not resumable
+
+UNFINISHED_STATES = (STATE_QUEUED, STATE_RUNNING)
+
+MAX_ATTEMPTS = 3  # Starts of a job before it is given up, e.g. if it crashes the application
+MAX_HISTORY = 500  # Finished jobs kept for the history and the statistics
+THROUGHPUT_WINDOW = 24 * 3600  # Seconds of history the throughput is computed over
+
+class JobStore:
+    """
+    Durable record of the jobs of the application: one JSON file per job in JOBS_DIR, with
+    its state, current stage, attempts, time spent in each stage and error. Jobs still
+    queued or running when the application stopped are handed back to their runner by
+    resume() at the next launch; their stages skip what is already in the cache.
+
+    Every method takes job ids, None is accepted and ignored so that the runners can be
+    called without a job.
+    """
+    def __init__(self, directory=JOBS_DIR):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.jobs = self._load()  # id -> job dict
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        jobs = {}
+        for fname in os.listdir(self.directory):
+            if not fname.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, fname), "r") as f:
+                    job = json.load(f)
+                jobs[job["id"]] = job
+            except (OSError, ValueError, KeyError):
+                print(f"Ignoring unreadable job file {fname}")
+        return jobs
+
+    def _save(self, job):
+        # Called with the lock held, the file is replaced atomically
+        path = os.path.join(self.directory, f"{job['id']}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(job, f)
+        os.replace(tmp_path, path)
+
+    # --- Lifecycle --- #
+    def add(self, kind, name, **params):
+        """Record a new queued job, params are what its runner needs to start it again."""
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "kind": kind,
+            "name": name,
+            "params": params,
+            "state": STATE_QUEUED,
+            "stage": None,
+            "attempts": 0,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "timings": {},  # stage -> seconds, summed over the attempts
+            "error": None,
+        }
+        with self.lock:
+            self.jobs[job["id"]] = job
+            self._save(job)
+        return job["id"]
+
+    def start(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            job["state"] = STATE_RUNNING
+            job["attempts"] += 1
+            job["started"] = time.time()
+            self._save(job)
+
+    @contextmanager
+    def stage(self, job_id, name):
+        """Record that the job is in stage name, and the time it spends there."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                job["stage"] = name
+                self._save(job)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            if job is not None:
+                with self.lock:
+                    job["timings"][name] = job["timings"].get(name, 0.0) + time.monotonic() - start
+                    self._save(job)
+
+    def finish(self, job_id, state=STATE_DONE, error=None):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            job["state"] = state
+            job["error"] = error
+            job["stage"] = None
+            job["finished"] = time.time()
+            self._save(job)
+            self._prune()
+
+    def discard(self, job_id):
+        with self.lock:
+            if self.jobs.pop(job_id, None) is not None:
+                os.remove(os.path.join(self.directory, f"{job_id}.json"))
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _prune(self):
+        # Called with the lock held
+        finished = [job for job in self.jobs.values() if job["state"] not in UNFINISHED_STATES]
+        finished.sort(key=lambda job: job["finished"] or 0)
+        for job in finished[:max(0, len(finished) - MAX_HISTORY)]:
+            del self.jobs[job["id"]]
+            try:
+                os.remove(os.path.join(self.directory, f"{job['id']}.json"))
+            except FileNotFoundError:
+                pass
+
+    def resume(self, runners):
+        """
+        Hand the jobs left unfinished by the previous run to runners[kind](job). Jobs of
+        kinds without a runner are marked interrupted, and so are the ones started
+        MAX_ATTEMPTS times already. Returns the number of jobs resumed.
+        """
+        with self.lock:
+            unfinished = [dict(job) for job in self.jobs.values() if job["state"] in UNFINISHED_STATES]
+        unfinished.sort(key=lambda job: job["created"])
+        resumed = 0
+        for job in unfinished:
+            runner = runners.get(job["kind"])
+            if runner is None:
+                self.finish(job["id"], STATE_INTERRUPTED, "The application stopped before the end")
+            elif job["attempts"] >= MAX_ATTEMPTS:
+                self.finish(job["id"], STATE_FAILED, f"Interrupted {job['attempts']} times, given up")
+            else:
+                with self.lock:
+                    self.jobs[job["id"]]["state"] = STATE_QUEUED
+                    self._save(self.jobs[job["id"]])
+                print(f"Resuming {job['kind']} job {job['name']} (stage {job['stage'] or 'queued'})")
+                runner(job)
+                resumed += 1
+        return resumed
+
+    # --- History --- #
+    def history(self):
+        """Every job recorded, the most recent first."""
+        with self.lock:
+            jobs = [dict(job) for job in self.jobs.values()]
+        return sorted(jobs, key=lambda job: job["created"], reverse=True)
+
+    def stats(self, now=None):
+        """Counts per state, throughput over the last THROUGHPUT_WINDOW and mean time per stage."""
+        now = now or time.time()
+        jobs = self.history()
+        states = {}
+        for job in jobs:
+            states[job["state"]] = states.get(job["state"], 0) + 1
+        recent = [job for job in jobs if job["state"] == STATE_DONE and now - job["finished"] < THROUGHPUT_WINDOW]
+        stage_times = {}
+        for job in jobs:
+            if job["state"] == STATE_DONE:
+                for stage, seconds in job["timings"].items():
+                    stage_times.setdefault(stage, []).append(seconds)
+        return {
+            "states": states,
+            "done_last_day": len(recent),
+            "per_hour": len(recent) * 3600 / THROUGHPUT_WINDOW,
+            "mean_stage_seconds": {stage: sum(times) / len(times) for stage, times in stage_times.items()},
+        }
+
+_job_store = None
+_job_store_lock = threading.Lock()
+
+def get_job_store():
+    """Job store shared by the whole application."""
+    global _job_store
+    with _job_store_lock:
+        if _job_store is None:
+            _job_store = JobStore()
+        return _job_store
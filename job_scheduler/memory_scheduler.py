@@ -0,0 +1,286 @@
+import os, json, time, threading
+
+from contextlib import contextmanager
+
+from cache_handler import *
+
+from .cancellation import JobCancelled
+
+# Approximate memory needed to load and run each model, in bytes (from the Whisper README),
+# used until the peak of a model was measured on this machine
+MODEL_MEMORY = {
+    "tiny": 1 << 30,
+    "base": 1 << 30,
+    "small": 2 << 30,
+    "medium": 5 << 30,
+    "large": 10 << 30,
+    "turbo": 6 << 30,
+}
+
+DEFAULT_BUDGET_FRACTION = 0.75  # Of the physical memory, when no budget is configured
+SAMPLE_INTERVAL = 0.5  # Seconds between two memory samples of a running job
+WAIT_POLL = 5.0  # Seconds between two checks of the available memory while waiting
+RAMP_UP_SECONDS = 60  # Time a job may take to load its model, its memory isn't in use before
+
+def get_available_memory():
+    """Memory available to new allocations without swapping, in bytes, or None if unknown."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None  # e.g. on Windows and macOS
+
+def get_total_memory():
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def _process_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _format_gb(size):
+    return f"{size / (1 << 30):.1f} GB"
+
+class MemoryRejected(Exception):
+    """The job needs more memory than the budget, even alone."""
+
+class MemoryScheduler:
+    """
+    Admission control of transcription jobs by memory.
+
+    A job reserves the peak memory of its model before it starts: the peak measured on this
+    machine (stored in MODEL_MEMORY_FILE) or the README estimate. The jobs of a process share
+    the loaded models, so the reservation is per model, the jobs using the same one hold it
+    together. The models kept loaded without a job (preloaded, or cached after their last
+    transcription) count against the budget too, their owners declare them with
+    set_resident().
+
+    A job is admitted when the reservations and the idle loaded models fit in the budget and
+    the model fits in the available memory, otherwise it waits for a running job to end, or
+    runs with the largest smaller model that fits when downgrading is allowed. Waiting jobs
+    are told why through their on_wait callback, and stop waiting when their cancellation
+    token is cancelled.
+    """
+    def __init__(self, budget=0, allow_downgrade=False):
+        self.budget = budget
+        self.allow_downgrade = allow_downgrade
+        self.reserved = {}  # model name -> [bytes, admission time, jobs using it]
+        self.resident = set()  # names of the models loaded in the process
+        self.sampler = None  # _PeakSampler measuring the job running alone, if any
+        self.condition = threading.Condition()
+        self.peaks = self._load_peaks()
+
+    def configure(self, budget=None, allow_downgrade=None):
+        """budget is in bytes, 0 means a fraction of the physical memory."""
+        with self.condition:
+            if budget is not None:
+                self.budget = budget
+            if allow_downgrade is not None:
+                self.allow_downgrade = allow_downgrade
+            self.condition.notify_all()
+
+    # --- Measured peaks --- #
+    def _load_peaks(self):
+        try:
+            with open(MODEL_MEMORY_FILE, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _record_peak(self, model_name, peak):
+        with self.condition:
+            # Keep the highest peak seen, the memory use of a run depends on the audio too
+            if peak <= self.peaks.get(model_name, 0):
+                return
+            self.peaks[model_name] = peak
+            peaks = dict(self.peaks)
+        tmp_path = f"{MODEL_MEMORY_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(peaks, f)
+        os.replace(tmp_path, MODEL_MEMORY_FILE)
+
+    def required_memory(self, model_name):
+        return self.peaks.get(model_name) or MODEL_MEMORY.get(model_name, 0)
+
+    # --- Loaded models --- #
+    def set_resident(self, model_name, resident):
+        """Declare a model loaded in the process, or freed, with or without a job using it."""
+        with self.condition:
+            if resident:
+                if model_name not in self.reserved:
+                    self._spoil_measure()  # Loaded next to the measured job
+                self.resident.add(model_name)
+            else:
+                self.resident.discard(model_name)
+                self.condition.notify_all()
+
+    def _spoil_measure(self):
+        # Called with the lock held, the memory of the measured job isn't its own anymore
+        if self.sampler is not None:
+            self.sampler.spoiled = True
+
+    # --- Admission --- #
+    def get_budget(self):
+        if self.budget:
+            return self.budget
+        total = get_total_memory()
+        return int(total * DEFAULT_BUDGET_FRACTION) if total else None
+
+    def _refusal(self, model_name):
+        """Why model_name can't start now, or None if it can. Called with the lock held."""
+        if model_name in self.reserved:
+            return None  # Shared with the jobs running with it
+        required = self.required_memory(model_name)
+        reserved = sum(size for size, _, _ in self.reserved.values())
+        reserved += sum(self.required_memory(name) for name in self.resident - self.reserved.keys() - {model_name})
+        budget = self.get_budget()
+        if budget is not None and reserved + required > budget:
+            return (f"{model_name} needs {_format_gb(required)}, {_format_gb(reserved)} of the "
+                    f"{_format_gb(budget)} budget are reserved or held by loaded models")
+        if model_name in self.resident:
+            return None  # Already in memory
+        available = get_available_memory()
+        if available is not None:
+            # Jobs admitted a moment ago haven't loaded their model yet
+            now = time.monotonic()
+            available -= sum(size for name, (size, admitted, _) in self.reserved.items()
+                             if now - admitted < RAMP_UP_SECONDS and name not in self.resident)
+        if available is not None and required > available:
+            return f"{model_name} needs {_format_gb(required)}, only {_format_gb(available)} available"
+        return None
+
+    def can_load(self, model_name):
+        """True if a job with model_name would be admitted now, e.g. to preload it. Reserves nothing."""
+        with self.condition:
+            return self._refusal(model_name) is None
+
+    def _smaller_models(self, model_name):
+        required = self.required_memory(model_name)
+        smaller = [m for m in MODEL_MEMORY if m != model_name and self.required_memory(m) < required]
+        return sorted(smaller, key=self.required_memory, reverse=True)
+
+    def _wake(self):
+        with self.condition:
+            self.condition.notify_all()
+
+    def admit(self, model_name, on_wait=None, token=None):
+        """
+        Block until a job with model_name can start, returns the model to use, to release()
+        once done. Raises MemoryRejected if the model can never fit and no downgrade is possible.
+        """
+        if token is not None:
+            token.on_cancel(self._wake)
+        with self.condition:
+            last_reason = None
+            while True:
+                if token is not None and token.is_cancelled():
+                    raise JobCancelled("Cancelled while waiting for memory")
+                reason = self._refusal(model_name)
+                if reason is None:
+                    return self._reserve(model_name)
+                if self.allow_downgrade:
+                    for smaller in self._smaller_models(model_name):
+                        if self._refusal(smaller) is None:
+                            print(f"Downgraded {model_name} to {smaller}: {reason}")
+                            if on_wait:
+                                on_wait(f"downgraded to {smaller}: {reason}")
+                            return self._reserve(smaller)
+                if not self.reserved:
+                    # Nothing to wait for, it doesn't fit next to the idle loaded models
+                    raise MemoryRejected(f"Not enough memory: {reason}")
+                if reason != last_reason:
+                    print(f"Waiting for memory: {reason}")
+                    if on_wait:
+                        on_wait(reason)
+                    last_reason = reason
+                # Woken up when a job ends, polled for memory freed by other applications
+                self.condition.wait(WAIT_POLL)
+
+    def _reserve(self, model_name):
+        # Called with the lock held
+        self._spoil_measure()  # Another job runs next to the measured one
+        reservation = self.reserved.setdefault(model_name, [self.required_memory(model_name), time.monotonic(), 0])
+        reservation[2] += 1
+        return model_name
+
+    def release(self, model_name):
+        with self.condition:
+            reservation = self.reserved.get(model_name)
+            if reservation is not None:
+                reservation[2] -= 1
+                if not reservation[2]:
+                    del self.reserved[model_name]
+            self.condition.notify_all()
+
+    @contextmanager
+    def reserve(self, model_name, on_wait=None, token=None):
+        """
+        Context manager admitting a job, gives the model to use. The peak memory of the job
+        is measured when it loads the model with no other model loaded, if no other job or
+        model load starts meanwhile, to refine the reservations of the next jobs.
+        """
+        model_name = self.admit(model_name, on_wait, token)
+        sampler = None
+        with self.condition:
+            if self.reserved[model_name][2] == 1 and len(self.reserved) == 1 and not self.resident:
+                sampler = self.sampler = _PeakSampler()
+        try:
+            yield model_name
+        finally:
+            if sampler:
+                peak = sampler.stop()
+                with self.condition:
+                    self.sampler = None
+                if peak and not sampler.spoiled:
+                    self._record_peak(model_name, peak)
+            self.release(model_name)
+
+class _PeakSampler:
+    """Samples the resident memory of the process, growth from the start to the highest sample."""
+    def __init__(self):
+        self.start = _process_rss()
+        self.peak = self.start
+        self.spoiled = False  # Set when something else took memory meanwhile
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        if self.start is not None:
+            self.thread.start()
+
+    def _run(self):
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            rss = _process_rss()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+
+    def stop(self):
+        if self.start is None:
+            return None
+        self.stopped.set()
+        self.thread.join()
+        return self.peak - self.start
+
+_memory_scheduler = None
+_memory_scheduler_lock = threading.Lock()
+
+def get_memory_scheduler():
+    """Memory scheduler shared by every transcription of the process."""
+    global _memory_scheduler
+    with _memory_scheduler_lock:
+        if _memory_scheduler is None:
+            _memory_scheduler = MemoryScheduler()
+        return _memory_scheduler
+
+def apply_memory_settings(settings):
+    budget = settings.get("memory_budget", 0)  # GB
+    get_memory_scheduler().configure(int(budget * (1 << 30)), settings.get("allow_model_downgrade", False))
@@ -0,0 +1,165 @@
+import os, sys, time, threading
+
+from contextlib import contextmanager
+
+from .cancellation import check_token
+
+# Priority classes, from the most to the least urgent
+PRIORITY_INTERACTIVE = 0  # Playback
+PRIORITY_USER = 1  # Transcriptions and downloads the user asked for
+PRIORITY_BACKGROUND = 2  # Prefetch and automatic transcription of new lectures
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_USER: "user",
+    PRIORITY_BACKGROUND: "background",
+}
+
+BACKGROUND_NICENESS = 10  # Added to the niceness of the processes (ffmpeg) background jobs start
+SAMPLE_INTERVAL = 1.0  # Seconds between two samples of the CPU time of the process
+CANCEL_POLL = 1.0  # Seconds between two looks at the token of a job paused for playback
+
+def _cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+_thread_state = threading.local()  # priority of the job running on the thread
+
+def lower_child_priority(process):
+    """
+    Add BACKGROUND_NICENESS to the niceness of process, a subprocess just started by the
+    calling thread, if it runs a background job.
+    """
+    if getattr(_thread_state, "priority", None) != PRIORITY_BACKGROUND:
+        return
+    try:
+        niceness = os.getpriority(os.PRIO_PROCESS, process.pid)
+        os.setpriority(os.PRIO_PROCESS, process.pid, niceness + BACKGROUND_NICENESS)
+    except (AttributeError, OSError):
+        pass  # Not supported on this platform, or already exited
+
+class PriorityScheduler:
+    """
+    Keeps playback smooth while transcriptions run in the same process.
+
+    Jobs declare their priority class with job(). Background jobs pause at their checkpoints
+    while a video is playing, and the ffmpeg processes they start get a higher niceness.
+    The threads of the process are not reniced: Whisper computes on the intra-op threads of
+    torch, which are shared by every transcription and keep the niceness of the thread that
+    created them. Instead torch, whose thread count is global to the process, gets half of
+    the cores while something more urgent than a background transcription is running.
+
+    The CPU time of the process is sampled and split evenly between the running jobs,
+    playback included, an estimate of the share of each class, see cpu_report().
+    """
+    def __init__(self):
+        self.active = {priority: 0 for priority in PRIORITY_NAMES}  # running jobs per class
+        self.players = set()  # ids of the players currently playing
+        self.cpu_time = {priority: 0.0 for priority in PRIORITY_NAMES}
+        self.cpu_time_idle = 0.0  # Spent with no job and no playback
+        self.condition = threading.Condition()
+        self.sampler = None
+
+    # --- Jobs --- #
+    @contextmanager
+    def job(self, priority):
+        """
+        Run the body as a job of the priority class, on the calling thread: the processes it
+        starts are reniced according to it, see lower_child_priority().
+        """
+        previous = getattr(_thread_state, "priority", None)
+        _thread_state.priority = priority
+        with self.condition:
+            self.active[priority] += 1
+            self._start_sampler()
+        self._update_torch_threads()
+        try:
+            yield
+        finally:
+            _thread_state.priority = previous
+            with self.condition:
+                self.active[priority] -= 1
+            self._update_torch_threads()
+
+    def checkpoint(self, priority, token=None):
+        """
+        Called by jobs between their steps, blocks background jobs while a video is playing.
+        Checks the cancellation token of the job too.
+        """
+        check_token(token)
+        if priority != PRIORITY_BACKGROUND:
+            return
+        with self.condition:
+            if self.players:
+                print("Background job paused during playback")
+            while self.players and not (token and token.is_cancelled()):
+                self.condition.wait(CANCEL_POLL if token else None)
+        check_token(token)
+
+    # --- Playback --- #
+    def set_playing(self, player_id, playing):
+        with self.condition:
+            if playing:
+                self.players.add(player_id)
+                self._start_sampler()
+            else:
+                self.players.discard(player_id)
+                self.condition.notify_all()
+        self._update_torch_threads()
+
+    def _update_torch_threads(self):
+        if "torch" not in sys.modules:
+            return  # Set when the first transcription imports it
+        import torch
+        with self.condition:
+            busy = self.players or (self.active[PRIORITY_USER] and self.active[PRIORITY_BACKGROUND])
+        threads = max(1, _cpu_count() // 2) if busy else _cpu_count()
+        if torch.get_num_threads() != threads:
+            torch.set_num_threads(threads)
+
+    # --- CPU accounting --- #
+    def _start_sampler(self):
+        # Called with the lock held
+        if self.sampler is None:
+            self.sampler = threading.Thread(target=self._sample, daemon=True)
+            self.sampler.start()
+
+    def _sample(self):
+        last = time.process_time()
+        while True:
+            time.sleep(SAMPLE_INTERVAL)
+            now = time.process_time()
+            spent, last = now - last, now
+            with self.condition:
+                shares = dict(self.active)
+                shares[PRIORITY_INTERACTIVE] += len(self.players)
+                total = sum(shares.values())
+                if not total:
+                    self.cpu_time_idle += spent
+                    continue
+                for priority, count in shares.items():
+                    self.cpu_time[priority] += spent * count / total
+
+    def cpu_report(self):
+        """
+        Estimated CPU seconds used by each class since the first job or playback, plus the idle
+        time. The process time is split evenly between the jobs running during each sample,
+        the compute threads of torch can't be told apart per job.
+        """
+        with self.condition:
+            report = {PRIORITY_NAMES[priority]: seconds for priority, seconds in self.cpu_time.items()}
+            report["idle"] = self.cpu_time_idle
+            return report
+
+_priority_scheduler = None
+_priority_scheduler_lock = threading.Lock()
+
+def get_priority_scheduler():
+    """Priority scheduler shared by every job of the process."""
+    global _priority_scheduler
+    with _priority_scheduler_lock:
+        if _priority_scheduler is None:
+            _priority_scheduler = PriorityScheduler()
+        return _priority_scheduler
@@ -0,0 +1,2 @@
+from .jobs_window import *
+from .metrics_window import *
@@ -0,0 +1,75 @@
+import time
+
+from PyQt6.QtWidgets import (QVBoxLayout, QDialog, QLabel, QTableWidget, QTableWidgetItem, QHeaderView,
+                             QAbstractItemView)
+from PyQt6.QtCore import QTimer
+
+from job_scheduler.job_store import get_job_store
+
+REFRESH_INTERVAL = 2000  # ms
+COLUMNS = ["Created", "Kind", "Name", "State", "Stage", "Attempts", "Time", "Error"]
+
+def _format_seconds(seconds):
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds // 60:.0f}m {seconds % 60:02.0f}s"
+    return f"{seconds // 3600:.0f}h {seconds % 3600 // 60:02.0f}m"
+
+class JobsDialog(QDialog):
+    """History of the downloads and transcriptions of the job store, with throughput statistics."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Jobs")
+        self.resize(800, 450)
+        self.init_ui()
+        self.refresh()
+
+        # Running jobs move on while the dialog is open
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(REFRESH_INTERVAL)
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        self.stats_label = QLabel()
+        self.stats_label.setWordWrap(True)
+        layout.addWidget(self.stats_label)
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table)
+
+        self.setLayout(layout)
+
+    def refresh(self):
+        store = get_job_store()
+        stats = store.stats()
+        states = ", ".join(f"{count} {state}" for state, count in sorted(stats["states"].items())) or "no jobs yet"
+        stages = ", ".join(f"{stage} {_format_seconds(seconds)}"
+                           for stage, seconds in stats["mean_stage_seconds"].items())
+        text = f"{states}<br>{stats['done_last_day']} done in the last 24 hours ({stats['per_hour']:.1f} per hour)"
+        if stages:
+            text += f"<br>Mean time per stage: {stages}"
+        self.stats_label.setText(text)
+
+        jobs = store.history()
+        self.table.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            values = [
+                time.strftime("%Y-%m-%d %H:%M", time.localtime(job["created"])),
+                job["kind"],
+                job["name"],
+                job["state"],
+                job["stage"] or "",
+                str(job["attempts"]),
+                _format_seconds(sum(job["timings"].values())),
+                job["error"] or "",
+            ]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
@@ -0,0 +1,88 @@
+from PyQt6.QtWidgets import (QVBoxLayout, QDialog, QLabel, QTableWidget, QTableWidgetItem, QHeaderView,
+                             QAbstractItemView)
+from PyQt6.QtCore import QTimer
+
+from pipeline_metrics import get_metrics
+from settings_window.settings_IO import load_settings
+from cache_handler import METRICS_FILE
+
+from .jobs_window import REFRESH_INTERVAL, _format_seconds
+
+STAGE_COLUMNS = ["Stage", "Runs", "Failed", "Mean", "Total", "Data", "Audio"]
+
+def _format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+class MetricsDialog(QDialog):
+    """Where the time of the lectures goes: time per pipeline stage, cache hit rates and queue waits."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Pipeline Metrics")
+        self.resize(700, 400)
+        self.init_ui()
+        self.refresh()
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(REFRESH_INTERVAL)
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        self.table = QTableWidget(0, len(STAGE_COLUMNS))
+        self.table.setHorizontalHeaderLabels(STAGE_COLUMNS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table)
+
+        self.stats_label = QLabel()
+        self.stats_label.setWordWrap(True)
+        layout.addWidget(self.stats_label)
+
+        # Where to scrape them from
+        port = load_settings().get("metrics_port", 0)
+        export = f"Prometheus metrics in {METRICS_FILE}"
+        if port:
+            export += f" and on http://127.0.0.1:{port}/metrics"
+        export_label = QLabel(export)
+        export_label.setWordWrap(True)
+        layout.addWidget(export_label)
+
+        self.setLayout(layout)
+
+    def refresh(self):
+        summary = get_metrics().summary()
+        stages = sorted(summary["stages"].items())
+        self.table.setRowCount(len(stages))
+        for row, (stage, totals) in enumerate(stages):
+            values = [
+                stage,
+                str(totals["count"]),
+                str(totals["failures"]),
+                _format_seconds(totals["seconds"] / totals["count"]),
+                _format_seconds(totals["seconds"]),
+                _format_bytes(totals["bytes"]) if totals["bytes"] else "",
+                _format_seconds(totals["audio_seconds"]) if totals["audio_seconds"] else "",
+            ]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+
+        lines = []
+        speeds = ", ".join(f"{model} {audio / seconds:.1f}x real time"
+                           for model, (seconds, audio) in sorted(summary["models"].items()) if seconds)
+        if speeds:
+            lines.append(f"Transcription speed: {speeds}")
+        caches = ", ".join(f"{cache} {hits / (hits + misses):.0%} of {hits + misses}"
+                           for cache, (hits, misses) in sorted(summary["caches"].items()))
+        if caches:
+            lines.append(f"Cache hits: {caches}")
+        queues = ", ".join(f"{queue} {_format_seconds(seconds / count)}"
+                           for queue, (count, seconds) in sorted(summary["queues"].items()))
+        if queues:
+            lines.append(f"Mean wait in queue: {queues}")
+        self.stats_label.setText("<br>".join(lines) or "Nothing recorded yet")
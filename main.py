@@ -1,15 +1,31 @@
 import sys, os
 
-from cache_handler import *
-from video_selection import *
-from video_transcriber import *
-from help_window import *
-from settings_window import *
+from startup_profiler import *
+
+# Each package is timed when it is first imported, the ones it pulls in are counted in it
+with profile_phase("import cache_handler"):
+    from cache_handler import *
+with profile_phase("import video_selection"):
+    from video_selection import *
+with profile_phase("import video_transcriber"):
+    from video_transcriber import *
+with profile_phase("import video_downloader"):
+    from video_downloader import *
+with profile_phase("import help_window"):
+    from help_window import *
+with profile_phase("import settings_window"):
+    from settings_window import *
+with profile_phase("import job_scheduler"):
+    from job_scheduler import *
+with profile_phase("import jobs_window"):
+    from jobs_window import *
+with profile_phase("import pipeline_metrics"):
+    from pipeline_metrics import *
 
 from PyQt6.QtWidgets import (QApplication, QWidget, QStackedWidget, QVBoxLayout, QListWidget, QListWidgetItem, QLabel,
-                             QMainWindow, QDialog)
+                             QMainWindow, QDialog, QMessageBox)
 from PyQt6.QtGui import QIcon
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, QTimer
 
 # --- New Widget for Home Page with Recent Videos --- #
 class HomeWidget(QWidget):
@@ -33,17 +49,29 @@ class HomeWidget(QWidget):
         layout_horizontal.addWidget(help_window, 0, Qt.AlignmentFlag.AlignRight)
         layout.addLayout(layout_horizontal)
 
-        # Populate recent videos by scanning the cache/videos folder.
-        self.populate_recent_videos()
+        # Thumbnails are generated in the background, the list shows placeholders until then.
+        self.placeholder_icon = QIcon("default_thumbnail.png")
+        self.recent_items = {}
+        icon_size = self.recent_list.iconSize()
+        self.thumbnail_service = ThumbnailService(icon_size.width(), icon_size.height(), self)
+        self.thumbnail_service.thumbnail_ready.connect(self.set_thumbnail)
+
+        # Populate recent videos once the event loop runs, so the window appears immediately.
+        QTimer.singleShot(0, self.populate_recent_videos)
         self.recent_list.itemClicked.connect(self.handle_item_clicked)
         layout.addWidget(self.recent_list)
 
         # Optionally, add the existing video selection widget below the recent videos.
         layout.addWidget(QLabel("RSS Feeds"))
-        self.selection_widget = VideoSelectionWidget(self.on_video_selected)
+        with profile_phase("feed list"):
+            self.selection_widget = VideoSelectionWidget(self.on_video_selected)
         layout.addWidget(self.selection_widget)
 
     def populate_recent_videos(self):
+        with profile_phase("recent video scan"):
+            self.add_recent_videos()
+
+    def add_recent_videos(self):
         # Construct the videos directory path.
         videos_dir = os.path.join(get_cache_video_path(), "videos")
         if not os.path.exists(videos_dir):
@@ -51,24 +79,25 @@ class HomeWidget(QWidget):
             return
 
         # List video files with common extensions.
-        video_files = [f for f in os.listdir(videos_dir)
-                       if os.path.isfile(os.path.join(videos_dir, f)) and
-                       f.lower().endswith((".mp4", ".avi", ".mkv", ".mov"))]
+        with os.scandir(videos_dir) as entries:
+            video_files = [e.name for e in entries
+                           if e.is_file() and e.name.lower().endswith((".mp4", ".avi", ".mkv", ".mov"))]
 
         for video in video_files:
             video_path = os.path.join(videos_dir, video)
-            # Try to load a thumbnail with the same base name and .png extension.
-            thumbnail_path = os.path.splitext(video_path)[0] + ".png"
-            if not os.path.exists(thumbnail_path):
-                # Optionally, use a default thumbnail if one is not found.
-                thumbnail_path = "default_thumbnail.png"
-
             item = QListWidgetItem()
-            item.setIcon(QIcon(thumbnail_path))
+            item.setIcon(self.placeholder_icon)
             item.setText(video)
             # Store the full video path as the identifier.
             item.setData(Qt.ItemDataRole.UserRole, video_path)
             self.recent_list.addItem(item)
+            self.recent_items[video_path] = item
+            self.thumbnail_service.request(video_path)
+
+    def set_thumbnail(self, video_path, thumbnail_path):
+        item = self.recent_items.get(video_path)
+        if item is not None:
+            item.setIcon(QIcon(thumbnail_path))
 
     def handle_item_clicked(self, item):
         video_path = item.data(Qt.ItemDataRole.UserRole)
@@ -82,15 +111,29 @@ class HomeWidget(QWidget):
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.settings = load_settings()  # Load settings from file
+        with profile_phase("settings load"):
+            self.settings = load_settings()  # Load settings from file
+            apply_memory_settings(self.settings)
+            apply_metrics_settings(self.settings)
         self.setWindowTitle("Video Lectures Aggregator")
         self.stack = QStackedWidget()
         self.setCentralWidget(self.stack)
-        self.init_ui()
+        with profile_phase("main window ui"):
+            self.init_ui()
+
+        # Warm up the preferred model once the window is up
+        self.model_status = QLabel()
+        self.statusBar().addPermanentWidget(self.model_status)
+        self.model_preloader = ModelPreloader(self)
+        self.model_preloader.status_changed.connect(self.model_status.setText)
+        QTimer.singleShot(PRELOAD_DELAY, self.preload_model)
+        # Downloads and transcriptions interrupted by the last exit, once the window is up too
+        QTimer.singleShot(PRELOAD_DELAY, resume_jobs)
 
     def init_ui(self):
         # Create the home page that includes the recent videos list and video selection.
-        self.home_widget = HomeWidget(self.open_video_transcriber)
+        with profile_phase("home page"):
+            self.home_widget = HomeWidget(self.open_video_transcriber)
         self.stack.addWidget(self.home_widget)
         self.create_menu()
 
@@ -101,12 +144,47 @@ class MainWindow(QMainWindow):
         pref_action = QAction("Preferences", self)
         pref_action.triggered.connect(self.open_settings_dialog)
         settings_menu.addAction(pref_action)
+        jobs_action = QAction("Jobs", self)
+        jobs_action.triggered.connect(self.open_jobs_dialog)
+        settings_menu.addAction(jobs_action)
+        metrics_action = QAction("Pipeline Metrics", self)
+        metrics_action.triggered.connect(self.open_metrics_dialog)
+        settings_menu.addAction(metrics_action)
+        cpu_action = QAction("Estimated CPU Usage by Priority", self)
+        cpu_action.triggered.connect(self.show_cpu_report)
+        settings_menu.addAction(cpu_action)
+
+    def preload_model(self):
+        self.model_preloader.preload(self.settings.get("preferred_model", "tiny"))
+
+    def open_jobs_dialog(self):
+        dialog = JobsDialog(self)
+        dialog.exec()
+
+    def open_metrics_dialog(self):
+        dialog = MetricsDialog(self)
+        dialog.exec()
+
+    def show_cpu_report(self):
+        report = get_priority_scheduler().cpu_report()
+        text = "\n".join(f"{name}: {seconds:.1f} s" for name, seconds in report.items())
+        text += "\n\nThe CPU time of the process is split evenly between the jobs running each second."
+        QMessageBox.information(self, "Estimated CPU Usage by Priority", text)
 
     def open_settings_dialog(self):
+        # The pages save some settings themselves, e.g. the audio only toggle of the transcriber
+        self.settings = load_settings()
         dialog = SettingsDialog(self.settings, self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
+            previous_model = self.settings.get("preferred_model", "tiny")
             self.settings = dialog.get_settings()
             save_settings(self.settings)  # Save settings to file
+            apply_download_settings(self.settings)
+            apply_auto_pipeline_settings(self.settings)
+            apply_memory_settings(self.settings)
+            apply_metrics_settings(self.settings)
+            if self.settings.get("preferred_model", "tiny") != previous_model:
+                self.preload_model()
             # If the current page is the transcriber, update its settings.
             current_widget = self.stack.currentWidget()
             if hasattr(current_widget, "apply_settings"):
@@ -126,6 +204,11 @@ class MainWindow(QMainWindow):
     def go_back_to_selection(self):
         self.stack.setCurrentWidget(self.home_widget)
 
+    def closeEvent(self, event):
+        # No ffmpeg left running after the window, nor signals to deleted widgets
+        self.home_widget.thumbnail_service.shutdown()
+        super().closeEvent(event)
+
 if __name__ == '__main__':
     # Create the cache directory starting the program the first time
     try:
@@ -137,8 +220,13 @@ if __name__ == '__main__':
     os.makedirs(VIDEO_DIR, exist_ok=True)  # Ensure the cache directory existss
     os.makedirs(TRANSCRIPT_DIR, exist_ok=True)  # Ensure the cache directory existss
 
-    app = QApplication(sys.argv)
-    window = MainWindow()
+    with profile_phase("QApplication"):
+        app = QApplication(sys.argv)
+    with profile_phase("MainWindow.__init__"):
+        window = MainWindow()
     window.resize(900, 600)
-    window.show()
+    with profile_phase("show window"):
+        window.show()
+    # Runs after the recent video scan and the RSS refresh scheduled during the construction
+    QTimer.singleShot(0, report_startup)
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,316 @@
+import os, json, time, atexit, threading
+
+from contextlib import contextmanager
+
+from cache_handler import *
+from job_scheduler.cancellation import JobCancelled
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows, the processes append to the log without locking it
+
+MAX_LOG_BYTES = 2 * 1024 * 1024  # The log is rolled over past this size, one older log is kept
+FLUSH_INTERVAL = 5.0  # Seconds the events wait in memory, they are written a batch at a time
+METRIC_PREFIX = "video_to_text"
+DEFAULT_METRICS_PORT = 0  # Port of the localhost endpoint, 0 for none
+
+class _Totals:
+    """Totals over logged events."""
+    def __init__(self):
+        self.stages = {}  # stage -> {"count", "seconds", "failures", "bytes", "audio_seconds"}
+        self.models = {}  # model -> [transcription seconds, audio seconds], for the real time factor
+        self.caches = {}  # cache -> [hits, misses]
+        self.queues = {}  # queue -> [count, seconds]
+
+    def add(self, event):
+        kind = event.get("type")
+        if kind == "stage":
+            totals = self.stages.setdefault(event["stage"], {"count": 0, "seconds": 0.0, "failures": 0,
+                                                             "bytes": 0, "audio_seconds": 0.0})
+            totals["count"] += 1
+            totals["seconds"] += event["seconds"]
+            totals["failures"] += event["outcome"] == "failed"
+            totals["bytes"] += event.get("bytes") or 0
+            totals["audio_seconds"] += event.get("audio_seconds") or 0
+            if event["stage"] == "transcribe" and event["outcome"] == "ok" and event.get("audio_seconds"):
+                model = self.models.setdefault(event.get("model") or "unknown", [0.0, 0.0])
+                model[0] += event["seconds"]
+                model[1] += event["audio_seconds"]
+        elif kind == "cache":
+            self.caches.setdefault(event["cache"], [0, 0])[0 if event["hit"] else 1] += 1
+        elif kind == "queue":
+            totals = self.queues.setdefault(event["queue"], [0, 0.0])
+            totals[0] += 1
+            totals[1] += event["seconds"]
+
+    def merge(self, other):
+        for name, totals in other.stages.items():
+            mine = self.stages.setdefault(name, dict.fromkeys(totals, 0))
+            for key, value in totals.items():
+                mine[key] += value
+        for table, other_table in ((self.models, other.models), (self.caches, other.caches),
+                                   (self.queues, other.queues)):
+            for name, values in other_table.items():
+                mine = table.setdefault(name, [0] * len(values))
+                for i, value in enumerate(values):
+                    mine[i] += value
+
+@contextmanager
+def _locked(path):
+    """Exclusive lock on path, held across the processes sharing the cache (GUI, daemon, batch workers)."""
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield  # Released when the file is closed
+
+class PipelineMetrics:
+    """
+    Where the time of the lectures goes. Each timed stage (download, audio extraction, model
+    load, transcription...), cache lookup and queue wait is an event appended as a JSON line
+    to METRICS_LOG, which every process of the application writes to. The events are kept in
+    memory and written a batch at a time, FLUSH_INTERVAL after the first of them, so that
+    recording one never waits for the disk.
+
+    The totals are those of the log, whichever process wrote the events. Each flush takes a
+    lock on the log, appends the batch, reads what the other processes appended since the
+    last flush and writes the totals in the Prometheus text format to METRICS_FILE, for the
+    textfile collector of node_exporter. start_metrics_server() serves them on localhost.
+
+    The log is rolled over to METRICS_LOG.1 past MAX_LOG_BYTES, the totals cover the two of
+    them, a rolling window of the recent lectures.
+    """
+    def __init__(self, log_path=METRICS_LOG, export_path=METRICS_FILE):
+        self.log_path = log_path
+        self.export_path = export_path
+        self.lock = threading.Lock()
+        self.pending = []  # Events not written yet
+        self.timer = None  # Flushes them
+        self.files = {}  # inode -> (bytes read, _Totals), for the log and the rolled over log
+        self.totals = _Totals()
+
+    # --- Recording --- #
+    @contextmanager
+    def stage(self, name, job=None, **fields):
+        """
+        Time a stage of job, e.g. a lecture key or a video path. The yielded dict is recorded
+        with the event, the stage adds what it measured to it: "bytes" transferred or written,
+        "audio_seconds" processed, "model"... It is recorded as failed if it raises.
+        """
+        record = dict(fields)
+        start = time.monotonic()
+        outcome = "ok"
+        try:
+            yield record
+        except JobCancelled:
+            outcome = "cancelled"
+            raise
+        except BaseException:
+            outcome = "failed"
+            raise
+        finally:
+            self.record({"type": "stage", "stage": name, "job": job, "seconds": time.monotonic() - start,
+                         "outcome": record.pop("outcome", outcome), **record})
+
+    def cache_lookup(self, cache, hit):
+        """Record a lookup in a cache (transcript, video, model...), returns hit."""
+        self.record({"type": "cache", "cache": cache, "hit": bool(hit)})
+        return hit
+
+    def queue_wait(self, queue, seconds):
+        """Record how long a job waited in queue before it started."""
+        self.record({"type": "queue", "queue": queue, "seconds": seconds})
+
+    def record(self, event):
+        event = {"time": time.time(), **event}
+        with self.lock:
+            self.pending.append(event)
+            if self.timer is None:
+                self.timer = threading.Timer(FLUSH_INTERVAL, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        """Write the pending events and the export now, e.g. before the process exits."""
+        with self.lock:
+            self._sync()
+
+    # --- Log --- #
+    def _sync(self):
+        # Called with the lock held: writes the pending events, reads those of the other processes
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        events, self.pending = self.pending, []
+        try:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            with _locked(f"{self.log_path}.lock"):
+                if events:
+                    self._append(events)
+                self._read_logs()
+                if events:
+                    self._export()
+        except OSError as e:
+            print(f"Could not write the pipeline metrics: {e}")
+
+    def _append(self, events):
+        # Called with both locks held
+        try:
+            if os.path.getsize(self.log_path) > MAX_LOG_BYTES:
+                os.replace(self.log_path, f"{self.log_path}.1")
+        except FileNotFoundError:
+            pass
+        with open(self.log_path, "a") as f:
+            f.write("".join(json.dumps(event) + "\n" for event in events))
+
+    def _read_logs(self):
+        # Called with both locks held. The files are found by inode and read from where the
+        # last read stopped, a log rolled over by any process carries on as the .1 file
+        files = {}
+        totals = _Totals()
+        for path in (f"{self.log_path}.1", self.log_path):
+            try:
+                with open(path, "rb") as f:
+                    stat = os.fstat(f.fileno())
+                    offset, file_totals = self.files.get(stat.st_ino, (0, None))
+                    if file_totals is None or stat.st_size < offset:
+                        offset, file_totals = 0, _Totals()  # New file, or a reused inode
+                    f.seek(offset)
+                    data = f.read()
+            except OSError:
+                continue
+            end = data.rfind(b"\n") + 1  # An unfinished line is read with the rest of it next time
+            for line in data[:end].splitlines():
+                try:
+                    file_totals.add(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    pass  # Cut by a crash
+            files[stat.st_ino] = (offset + end, file_totals)
+            totals.merge(file_totals)
+        self.files, self.totals = files, totals
+
+    def _export(self):
+        # Called with both locks held, the file is replaced atomically for the collectors reading it
+        tmp_path = f"{self.export_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self._prometheus_text())
+        os.replace(tmp_path, self.export_path)
+
+    # --- Totals --- #
+    def summary(self):
+        """Copy of the totals, for the statistics dialog."""
+        with self.lock:
+            self._sync()
+            return {
+                "stages": {name: dict(totals) for name, totals in self.totals.stages.items()},
+                "models": {name: list(totals) for name, totals in self.totals.models.items()},
+                "caches": {name: list(totals) for name, totals in self.totals.caches.items()},
+                "queues": {name: list(totals) for name, totals in self.totals.queues.items()},
+            }
+
+    def prometheus_text(self):
+        with self.lock:
+            self._sync()
+            return self._prometheus_text()
+
+    def _prometheus_text(self):
+        # Called with the lock held
+        lines = []
+        def metric(name, kind, help_text, samples):
+            name = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+                value = int(value) if float(value).is_integer() else value  # Byte counts in full
+                lines.append(f"{name}{suffix}{{{label_text}}} {value}" if label_text else f"{name}{suffix} {value}")
+
+        stages = sorted(self.totals.stages.items())
+        metric("stage_seconds", "summary", "Time spent in the pipeline stages.",
+               [sample for stage, totals in stages for sample in (
+                   ("_count", {"stage": stage}, totals["count"]), ("_sum", {"stage": stage}, totals["seconds"]))])
+        metric("stage_failures_total", "counter", "Pipeline stages that failed.",
+               [("", {"stage": stage}, totals["failures"]) for stage, totals in stages])
+        metric("bytes_total", "counter", "Bytes transferred or written by the pipeline stages.",
+               [("", {"stage": stage}, totals["bytes"]) for stage, totals in stages if totals["bytes"]])
+        metric("audio_seconds_total", "counter", "Seconds of audio processed by the pipeline stages.",
+               [("", {"stage": stage}, totals["audio_seconds"]) for stage, totals in stages if totals["audio_seconds"]])
+        metric("realtime_factor", "gauge", "Transcription time over audio duration, by model.",
+               [("", {"model": model}, seconds / audio) for model, (seconds, audio) in sorted(self.totals.models.items())])
+        metric("cache_lookups_total", "counter", "Cache lookups by cache and result.",
+               [("", {"cache": cache, "result": result}, count) for cache, (hits, misses) in sorted(self.totals.caches.items())
+                for result, count in (("hit", hits), ("miss", misses))])
+        metric("queue_wait_seconds", "summary", "Time jobs waited in queue before they started.",
+               [sample for queue, (count, seconds) in sorted(self.totals.queues.items()) for sample in (
+                   ("_count", {"queue": queue}, count), ("_sum", {"queue": queue}, seconds))])
+        return "\n".join(lines) + "\n"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def file_size(path):
+    """Size of path in bytes, 0 if it isn't there, for the "bytes" of a stage."""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+def get_metrics():
+    """Pipeline metrics shared by the whole application."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = PipelineMetrics()
+            atexit.register(_metrics.flush)  # The last batch
+        return _metrics
+
+# --- Localhost endpoint --- #
+_server = None
+
+def start_metrics_server(port):
+    """Serve the metrics on http://127.0.0.1:port/metrics, replacing the server already running."""
+    global _server
+    stop_metrics_server()
+    # Imported here, most sessions never start the endpoint
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = get_metrics().prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scraped every few seconds, not worth a line each time
+
+    try:
+        _server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    except OSError as e:
+        print(f"Could not serve the metrics on port {port}: {e}")
+        return None
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    print(f"Serving the pipeline metrics on http://127.0.0.1:{port}/metrics")
+    return _server
+
+def stop_metrics_server():
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
+
+def apply_metrics_settings(settings):
+    port = settings.get("metrics_port", DEFAULT_METRICS_PORT)
+    if not port:
+        stop_metrics_server()
+    elif _server is None or _server.server_address[1] != port:
+        start_metrics_server(port)
@@ -1,4 +1,5 @@
-from PyQt6.QtWidgets import (QVBoxLayout,QPushButton, QLabel, QHBoxLayout, QComboBox, QSpinBox, QDialog)
+from PyQt6.QtWidgets import (QVBoxLayout,QPushButton, QLabel, QHBoxLayout, QComboBox, QSpinBox, QDialog,
+                             QCheckBox)
 
 # --- Settings Dialog --- #
 class SettingsDialog(QDialog):
@@ -29,6 +30,128 @@ class SettingsDialog(QDialog):
         model_layout.addWidget(self.model_combo)
         layout.addLayout(model_layout)
 
+        # Concurrent downloads setting
+        downloads_layout = QHBoxLayout()
+        downloads_label = QLabel("Concurrent Downloads:")
+        self.downloads_spin = QSpinBox()
+        self.downloads_spin.setRange(1, 8)
+        self.downloads_spin.setValue(self.current_settings.get("max_concurrent_downloads", 2))
+        downloads_layout.addWidget(downloads_label)
+        downloads_layout.addWidget(self.downloads_spin)
+        layout.addLayout(downloads_layout)
+
+        # Bandwidth limit setting, shared by all downloads
+        bandwidth_layout = QHBoxLayout()
+        bandwidth_label = QLabel("Bandwidth Limit (Mbit/s):")
+        self.bandwidth_spin = QSpinBox()
+        self.bandwidth_spin.setRange(0, 10000)
+        self.bandwidth_spin.setSpecialValueText("Unlimited")  # Shown for 0
+        self.bandwidth_spin.setValue(self.current_settings.get("bandwidth_limit", 0))
+        bandwidth_layout.addWidget(bandwidth_label)
+        bandwidth_layout.addWidget(self.bandwidth_spin)
+        layout.addLayout(bandwidth_layout)
+
+        # Acquisition mode setting
+        acquisition_layout = QHBoxLayout()
+        acquisition_label = QLabel("Download:")
+        self.acquisition_combo = QComboBox()
+        self.acquisition_combo.addItem("Video", "video")
+        self.acquisition_combo.addItem("Audio only", "audio")
+        self.acquisition_combo.setCurrentIndex(self.acquisition_combo.findData(
+            self.current_settings.get("acquisition_mode", "video")))
+        acquisition_layout.addWidget(acquisition_label)
+        acquisition_layout.addWidget(self.acquisition_combo)
+        layout.addLayout(acquisition_layout)
+
+        # Streaming pipeline setting
+        self.streaming_check = QCheckBox("Transcribe while downloading")
+        self.streaming_check.setChecked(self.current_settings.get("streaming_pipeline", True))
+        layout.addWidget(self.streaming_check)
+
+        # Lightweight copies of the videos, quicker to seek in on slow machines
+        self.proxy_check = QCheckBox("Play lightweight copies of the videos (made in the background)")
+        self.proxy_check.setChecked(self.current_settings.get("proxy_playback", False))
+        layout.addWidget(self.proxy_check)
+
+        # Automatic transcription of new lectures
+        self.auto_check = QCheckBox("Transcribe new lectures automatically")
+        self.auto_check.setChecked(self.current_settings.get("auto_transcribe", False))
+        layout.addWidget(self.auto_check)
+
+        auto_workers_layout = QHBoxLayout()
+        auto_workers_label = QLabel("Concurrent Transcriptions:")
+        self.auto_workers_spin = QSpinBox()
+        self.auto_workers_spin.setRange(1, 4)
+        self.auto_workers_spin.setValue(self.current_settings.get("auto_transcribe_workers", 1))
+        auto_workers_layout.addWidget(auto_workers_label)
+        auto_workers_layout.addWidget(self.auto_workers_spin)
+        layout.addLayout(auto_workers_layout)
+
+        # No automatic transcription starts between these hours, same hours to disable
+        quiet_layout = QHBoxLayout()
+        quiet_label = QLabel("Quiet Hours:")
+        self.quiet_start_spin = QSpinBox()
+        self.quiet_start_spin.setRange(0, 23)
+        self.quiet_start_spin.setSuffix(":00")
+        self.quiet_start_spin.setValue(self.current_settings.get("quiet_hours_start", 0))
+        self.quiet_end_spin = QSpinBox()
+        self.quiet_end_spin.setRange(0, 23)
+        self.quiet_end_spin.setSuffix(":00")
+        self.quiet_end_spin.setValue(self.current_settings.get("quiet_hours_end", 0))
+        quiet_layout.addWidget(quiet_label)
+        quiet_layout.addWidget(self.quiet_start_spin)
+        quiet_layout.addWidget(QLabel("to"))
+        quiet_layout.addWidget(self.quiet_end_spin)
+        layout.addLayout(quiet_layout)
+
+        # Memory the transcriptions may use together, 0 for 75% of the physical memory
+        memory_layout = QHBoxLayout()
+        memory_label = QLabel("Transcription Memory Budget (GB):")
+        self.memory_spin = QSpinBox()
+        self.memory_spin.setRange(0, 1024)
+        self.memory_spin.setSpecialValueText("Automatic")  # Shown for 0
+        self.memory_spin.setValue(self.current_settings.get("memory_budget", 0))
+        memory_layout.addWidget(memory_label)
+        memory_layout.addWidget(self.memory_spin)
+        layout.addLayout(memory_layout)
+
+        self.downgrade_check = QCheckBox("Use a smaller model when memory is short")
+        self.downgrade_check.setChecked(self.current_settings.get("allow_model_downgrade", False))
+        layout.addWidget(self.downgrade_check)
+
+        # Lectures following the one opened that are downloaded and transcribed in advance
+        prefetch_layout = QHBoxLayout()
+        prefetch_label = QLabel("Prefetch Next Lectures:")
+        self.prefetch_spin = QSpinBox()
+        self.prefetch_spin.setRange(0, 10)
+        self.prefetch_spin.setSpecialValueText("Off")  # Shown for 0
+        self.prefetch_spin.setValue(self.current_settings.get("prefetch_count", 2))
+        prefetch_layout.addWidget(prefetch_label)
+        prefetch_layout.addWidget(self.prefetch_spin)
+        layout.addLayout(prefetch_layout)
+
+        # Size of the cached lectures past which nothing more is prefetched
+        cache_layout = QHBoxLayout()
+        cache_label = QLabel("Cache Budget for Prefetch (GB):")
+        self.cache_spin = QSpinBox()
+        self.cache_spin.setRange(0, 10000)
+        self.cache_spin.setSpecialValueText("Unlimited")  # Shown for 0
+        self.cache_spin.setValue(self.current_settings.get("cache_budget", 20))
+        cache_layout.addWidget(cache_label)
+        cache_layout.addWidget(self.cache_spin)
+        layout.addLayout(cache_layout)
+
+        # Localhost endpoint of the pipeline metrics, for Prometheus
+        metrics_layout = QHBoxLayout()
+        metrics_label = QLabel("Metrics Endpoint Port:")
+        self.metrics_spin = QSpinBox()
+        self.metrics_spin.setRange(0, 65535)
+        self.metrics_spin.setSpecialValueText("Off")  # Shown for 0
+        self.metrics_spin.setValue(self.current_settings.get("metrics_port", 0))
+        metrics_layout.addWidget(metrics_label)
+        metrics_layout.addWidget(self.metrics_spin)
+        layout.addLayout(metrics_layout)
+
         # OK and Cancel buttons
         buttons_layout = QHBoxLayout()
         ok_button = QPushButton("OK")
@@ -40,8 +163,25 @@ class SettingsDialog(QDialog):
         layout.addLayout(buttons_layout)
     
     def get_settings(self):
-        return {
+        # Keep the settings that aren't edited in this dialog
+        settings = dict(self.current_settings)
+        settings.update({
             "font_size": self.font_spin.value(),
-            "preferred_model": self.model_combo.currentText()
-        }
+            "preferred_model": self.model_combo.currentText(),
+            "max_concurrent_downloads": self.downloads_spin.value(),
+            "bandwidth_limit": self.bandwidth_spin.value(),
+            "streaming_pipeline": self.streaming_check.isChecked(),
+            "proxy_playback": self.proxy_check.isChecked(),
+            "acquisition_mode": self.acquisition_combo.currentData(),
+            "auto_transcribe": self.auto_check.isChecked(),
+            "auto_transcribe_workers": self.auto_workers_spin.value(),
+            "quiet_hours_start": self.quiet_start_spin.value(),
+            "quiet_hours_end": self.quiet_end_spin.value(),
+            "memory_budget": self.memory_spin.value(),
+            "allow_model_downgrade": self.downgrade_check.isChecked(),
+            "prefetch_count": self.prefetch_spin.value(),
+            "cache_budget": self.cache_spin.value(),
+            "metrics_port": self.metrics_spin.value()
+        })
+        return settings
     
\ No newline at end of file
@@ -11,7 +11,12 @@ def load_settings():
                 # If the config file is corrupted, return default settings.
                 pass
     # Default settings
-    return {"font_size": 12, "preferred_model": "tiny"}
+    return {"font_size": 12, "preferred_model": "tiny", "max_concurrent_downloads": 2, "bandwidth_limit": 0,
+            "streaming_pipeline": True, "acquisition_mode": "video", "auto_transcribe": False,
+            "auto_transcribe_workers": 1, "quiet_hours_start": 0, "quiet_hours_end": 0, "memory_budget": 0,
+            "allow_model_downgrade": False, "prefetch_count": 2, "cache_budget": 20,
+            "proxy_playback": False, "audio_only_playback": False,
+            "metrics_port": 0}
 
 def save_settings(settings):
     with open(CONFIG_FILE, "w") as f:
@@ -0,0 +1,48 @@
+import time
+
+from contextlib import contextmanager
+
+class StartupProfiler:
+    """
+    Records how long each phase of the startup takes, from the first import to the first
+    iteration of the event loop, and prints a breakdown once the window is up.
+    Phases recorded after the report, e.g. a later RSS refresh, are ignored.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = []  # (start, name, seconds, depth)
+        self.depth = 0
+        self.reported = False
+
+    @contextmanager
+    def phase(self, name):
+        if self.reported:
+            yield
+            return
+        depth = self.depth
+        self.depth += 1
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            self.phases.append((begin, name, time.perf_counter() - begin, depth))
+
+    def report(self):
+        if self.reported:
+            return
+        self.reported = True
+        total = time.perf_counter() - self.start
+        print(f"Startup took {total * 1000:.0f} ms:")
+        # Phases are recorded when they end, sort them by start so nested ones follow their parent
+        for _, name, seconds, depth in sorted(self.phases):
+            print(f"  {'  ' * depth}{name:<{40 - 2 * depth}} {seconds * 1000:8.1f} ms")
+
+_profiler = StartupProfiler()
+
+def profile_phase(name):
+    """Context manager timing a startup phase, usable from any module."""
+    return _profiler.phase(name)
+
+def report_startup():
+    _profiler.report()
@@ -0,0 +1,7 @@
+import os, sys, tempfile
+
+# The packages import each other from the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the caches (metrics, job store...) the modules write to out of the user's
+os.environ["XDG_CACHE_HOME"] = tempfile.mkdtemp(prefix="video-to-text-tests-")
@@ -0,0 +1,91 @@
+import os, time, multiprocessing
+
+import pytest
+
+import batch_transcriber.job_queue as job_queue
+
+JOBS = 20
+
+def use_queue_dir(queue_dir):
+    # The directories are module constants, also set in the worker processes
+    for name in ("PENDING", "CLAIMED", "DONE", "FAILED", "CANCELLED"):
+        setattr(job_queue, f"{name}_DIR", os.path.join(queue_dir, name.lower(), ""))
+    job_queue.QUEUE_DIR = os.path.join(queue_dir, "")
+
+def claim_all(queue_dir, worker_id, results):
+    use_queue_dir(queue_dir)
+    claimed = []
+    while (job := job_queue.claim_job(worker_id)) is not None:
+        claimed.append(job[1]["id"])
+    results.put(claimed)
+
+def reclaim(queue_dir, results):
+    use_queue_dir(queue_dir)
+    results.put(job_queue.reclaim_stale_jobs(lease_seconds=60))
+
+@pytest.fixture
+def queue_dir(tmp_path, monkeypatch):
+    for name in ("QUEUE_DIR", "PENDING_DIR", "CLAIMED_DIR", "DONE_DIR", "FAILED_DIR", "CANCELLED_DIR"):
+        monkeypatch.setattr(job_queue, name, getattr(job_queue, name))  # Restored after the test
+    use_queue_dir(str(tmp_path))
+    job_queue._make_queue_dirs()
+    items = [{"name": f"lecture{i}", "video_path": str(tmp_path / f"lecture{i}.mp4"), "url": None}
+             for i in range(JOBS)]
+    assert job_queue.enqueue_items(items, "tiny") == JOBS
+    return str(tmp_path)
+
+def run_processes(target, args_list):
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=target, args=(*args, results)) for args in args_list]
+    for process in processes:
+        process.start()
+    outcomes = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join()
+    return outcomes
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+def test_each_job_is_claimed_once(queue_dir):
+    claimed = run_processes(claim_all, [(queue_dir, f"host-{i}") for i in range(4)])
+    ids = [job_id for worker in claimed for job_id in worker]
+    assert len(ids) == JOBS and len(set(ids)) == JOBS
+    assert job_queue.queue_status()["claimed"] == JOBS
+
+def test_expired_leases_are_reclaimed_once(queue_dir):
+    claim_all(queue_dir, "host-1", multiprocessing.Queue())
+    claimed = sorted(os.listdir(job_queue.CLAIMED_DIR))
+    for fname in claimed[:5]:
+        age(os.path.join(job_queue.CLAIMED_DIR, fname), 120)  # Worker stopped sending heartbeats
+
+    reclaimed = run_processes(reclaim, [(queue_dir,) for _ in range(4)])
+    assert sum(reclaimed) == 5
+    assert job_queue.queue_status()["pending"] == 5
+    assert job_queue.queue_status()["claimed"] == JOBS - 5
+
+    # Back in the queue for the next worker
+    job = job_queue.claim_job("host-2")
+    assert job is not None and job[0].endswith("--host-2.json")
+
+def test_heartbeat_during_reclaim_keeps_the_job(queue_dir, monkeypatch):
+    job = job_queue.claim_job("host-1")
+    claimed_path = job[0]
+    # The lease looked expired, then the worker's heartbeat came before the rename
+    monkeypatch.setattr(job_queue.os.path, "getmtime", lambda path: 0)
+    assert job_queue.reclaim_stale_jobs(lease_seconds=60) == 0
+    assert os.path.exists(claimed_path)
+    assert job_queue.queue_status()["pending"] == JOBS - 1
+
+def test_cached_videos_are_found_in_the_cache_of_the_worker(queue_dir, tmp_path, monkeypatch):
+    video_path = os.path.join(job_queue.CACHE_DIR, "videos", "LECTURE_1-2-2024.mp4")
+    assert job_queue.enqueue_items([{"name": "LECTURE", "video_path": video_path, "url": None}], "tiny") == 1
+    while (job := job_queue.claim_job("host-1")[1])["name"] != "LECTURE":
+        pass
+    assert job["video_path"] == os.path.join("videos", "LECTURE_1-2-2024.mp4")
+
+    # Another host mounts the cache somewhere else
+    other_cache = os.path.join(str(tmp_path), "elsewhere", "")
+    monkeypatch.setattr(job_queue, "CACHE_DIR", other_cache)
+    assert job_queue._local_video_path(job) == os.path.join(other_cache, "videos", "LECTURE_1-2-2024.mp4")
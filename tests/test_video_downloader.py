@@ -0,0 +1,180 @@
+import os, json, time, random, threading
+
+import pytest
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import video_downloader.video_downloader as downloader
+from video_downloader import download_video, DownloadError, DownloadManager, RateLimiter
+from job_scheduler.cancellation import CancellationToken, JobCancelled
+
+SIZE = 100 * 1024
+
+class FileServer:
+    """Serves one file with an ETag, honouring Range and If-Range, and logs the requests."""
+    def __init__(self):
+        self.set_content(random.Random(1).randbytes(SIZE), '"v1"')
+        self.requests = []  # Headers of each request
+        self.chunk_delay = 0  # Seconds between two 4 KB writes, to slow the transfers down
+        self.fail_at = None  # Answer 500 to the ranges starting there
+        self.status = None  # Error answered to every request
+        self.change_after = None  # (content, etag) served from the second request on
+
+    def set_content(self, content, etag):
+        self.content = content
+        self.etag = etag
+
+    def handle(self, handler):
+        self.requests.append(dict(handler.headers))
+        if self.status:
+            handler.send_error(self.status)
+            return
+        if self.change_after and len(self.requests) > 1:
+            self.set_content(*self.change_after)
+        start, end = 0, len(self.content) - 1
+        partial = False
+        range_header = handler.headers.get("Range")
+        if_range = handler.headers.get("If-Range")
+        if range_header and (if_range is None or if_range == self.etag):
+            first, _, last = range_header.removeprefix("bytes=").partition("-")
+            start, end = int(first), int(last) if last else end
+            partial = True
+        if partial and start == self.fail_at:
+            handler.send_error(500)
+            return
+        handler.send_response(206 if partial else 200)
+        handler.send_header("ETag", self.etag)
+        handler.send_header("Accept-Ranges", "bytes")
+        handler.send_header("Content-Length", str(end - start + 1))
+        if partial:
+            handler.send_header("Content-Range", f"bytes {start}-{end}/{len(self.content)}")
+        handler.end_headers()
+        body = self.content[start:end + 1]
+        try:
+            for offset in range(0, len(body), 4096):
+                handler.wfile.write(body[offset:offset + 4096])
+                if self.chunk_delay:
+                    time.sleep(self.chunk_delay)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up on this connection
+
+@pytest.fixture
+def server():
+    files = FileServer()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            files.handle(self)
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    files.url = f"http://127.0.0.1:{httpd.server_address[1]}/lecture.mp4"
+    yield files
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture(autouse=True)
+def small_segments(monkeypatch):
+    # Segments and chunks sized for a 100 KB file
+    monkeypatch.setattr(downloader, "CHUNK_SIZE", 4096)
+    monkeypatch.setattr(downloader, "MIN_SEGMENT_SIZE", 16 * 1024)
+    monkeypatch.setattr(downloader, "STATE_SAVE_INTERVAL", 16 * 1024)
+
+def ranges_requested(server):
+    # The first request is the probe of the first byte
+    return [headers.get("Range") for headers in server.requests[1:]]
+
+def test_segmented_download(server, tmp_path):
+    output = tmp_path / "lecture.mp4"
+    download_video(server.url, str(output), connections=4, session=downloader.requests.Session())
+    assert output.read_bytes() == server.content
+    assert sorted(ranges_requested(server)) == ["bytes=0-25599", "bytes=25600-51199",
+                                                "bytes=51200-76799", "bytes=76800-102399"]
+    assert not os.path.exists(f"{output}.part") and not os.path.exists(f"{output}.part.json")
+
+def test_resume_from_part(server, tmp_path):
+    output = tmp_path / "lecture.mp4"
+    part_path = f"{output}.part"
+    half = SIZE // 2
+    # What an interrupted download leaves behind
+    with open(part_path, "wb") as f:
+        f.write(server.content[:half])
+        f.truncate(SIZE)
+    with open(f"{part_path}.json", "w") as f:
+        json.dump({"url": server.url, "size": SIZE, "ranges": True, "validator": '"v1"',
+                   "segments": [[0, SIZE - 1, half]]}, f)
+
+    download_video(server.url, str(output), session=downloader.requests.Session())
+    assert output.read_bytes() == server.content
+    assert ranges_requested(server) == [f"bytes={half}-{SIZE - 1}"]
+    assert server.requests[1]["If-Range"] == '"v1"'
+
+def test_changed_file_is_not_mixed(server, tmp_path):
+    output = tmp_path / "lecture.mp4"
+    part_path = f"{output}.part"
+    half = SIZE // 2
+    with open(part_path, "wb") as f:
+        f.write(server.content[:half])
+        f.truncate(SIZE)
+    with open(f"{part_path}.json", "w") as f:
+        json.dump({"url": server.url, "size": SIZE, "ranges": True, "validator": '"v1"',
+                   "segments": [[0, SIZE - 1, half]]}, f)
+    # Replaced on the server between the probe and the range request
+    changed = random.Random(2).randbytes(SIZE)
+    server.change_after = (changed, '"v2"')
+
+    with pytest.raises(DownloadError):
+        download_video(server.url, str(output), session=downloader.requests.Session())
+    assert not output.exists()
+
+    # The next attempt sees the new validator and starts over
+    download_video(server.url, str(output), session=downloader.requests.Session())
+    assert output.read_bytes() == changed
+
+def test_failed_segment_aborts_the_others(server, tmp_path):
+    server.chunk_delay = 0.2  # About 1.2 s per segment
+    server.fail_at = 76800  # The last of the four segments
+    output = tmp_path / "lecture.mp4"
+    start = time.monotonic()
+    with pytest.raises(DownloadError):
+        download_video(server.url, str(output), connections=4, session=downloader.requests.Session())
+    assert time.monotonic() - start < 1.0
+    assert not output.exists()
+
+def test_rate_limiter(server, tmp_path):
+    rate = 40 * 1024
+    output = tmp_path / "lecture.mp4"
+    start = time.monotonic()
+    download_video(server.url, str(output), connections=4, session=downloader.requests.Session(),
+                   rate_limiter=RateLimiter(rate))
+    elapsed = time.monotonic() - start
+    assert output.read_bytes() == server.content
+    # One second of burst, then the rate
+    assert elapsed >= (SIZE - rate) / rate * 0.9
+
+def test_refused_download_is_not_retried(server, tmp_path):
+    server.status = 404
+    future = DownloadManager().submit(server.url, str(tmp_path / "lecture.mp4"))
+    with pytest.raises(downloader.requests.HTTPError):  # From the probe, not wrapped
+        future.result(timeout=10)
+    assert len(server.requests) == 1
+
+def test_cancel_ends_the_retry_backoff(server, tmp_path):
+    server.status = 503
+    token = CancellationToken()
+    future = DownloadManager().submit(server.url, str(tmp_path / "lecture.mp4"), token=token)
+    while not server.requests:
+        time.sleep(0.01)
+    time.sleep(0.2)  # Waiting RETRY_BACKOFF before the second attempt
+    start = time.monotonic()
+    token.cancel()
+    with pytest.raises(JobCancelled):
+        future.result(timeout=10)
+    assert time.monotonic() - start < 1.0
+    assert len(server.requests) == 1
@@ -0,0 +1,2 @@
+from .daemon import *
+from .client import *
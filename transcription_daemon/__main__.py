@@ -0,0 +1,31 @@
+import os, sys, signal, argparse
+
+from cache_handler import *
+
+from job_scheduler import get_memory_scheduler
+
+from .daemon import TranscriptionDaemon
+from .client import find_daemon
+
+parser = argparse.ArgumentParser(prog="python -m transcription_daemon",
+                                 description="Serve transcriptions to the local applications with shared models.")
+parser.add_argument("--workers", type=int, default=1, help="transcriptions run at the same time (default 1)")
+parser.add_argument("--port", type=int, default=0, help="port on 127.0.0.1, a free one by default")
+parser.add_argument("--memory-budget", type=float, default=0,
+                    help="GB of memory the transcriptions may use, 75%% of the physical memory by default")
+parser.add_argument("--allow-downgrade", action="store_true",
+                    help="use a smaller model rather than wait when the memory is short")
+args = parser.parse_args()
+
+if find_daemon():
+    parser.exit(1, f"A transcription daemon is already running, see {DAEMON_FILE}\n")
+os.makedirs(VIDEO_DIR, exist_ok=True)
+os.makedirs(TRANSCRIPT_DIR, exist_ok=True)
+get_memory_scheduler().configure(int(args.memory_budget * (1 << 30)), args.allow_downgrade)
+daemon = TranscriptionDaemon(args.workers, args.port)
+# Stopped by a service manager, the daemon file is removed on the way out
+signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+try:
+    daemon.serve_forever()
+except KeyboardInterrupt:
+    pass
@@ -0,0 +1,67 @@
+import os, json, time, requests
+
+from cache_handler import *
+
+from .daemon import TOKEN_HEADER, JOB_DONE, JOB_FAILED, JOB_CANCELLED
+
+CONNECT_TIMEOUT = 1  # Seconds, the daemon runs on this machine
+POLL_INTERVAL = 1.0
+
+class DaemonError(Exception):
+    pass
+
+class DaemonClient:
+    """Client of a running transcription daemon, see find_daemon()."""
+    def __init__(self, port, token):
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.headers = {TOKEN_HEADER: token}
+
+    def _request(self, method, path, **kwargs):
+        try:
+            response = requests.request(method, self.base_url + path, headers=self.headers,
+                                        timeout=(CONNECT_TIMEOUT, 30), **kwargs)
+        except requests.RequestException as e:
+            raise DaemonError(f"Transcription daemon unreachable: {e}") from e
+        data = response.json()
+        if response.status_code != 200:
+            raise DaemonError(data.get("error", f"HTTP {response.status_code}"))
+        return data
+
+    def status(self):
+        return self._request("GET", "/status")
+
+    def submit(self, source, model_name, video_path=None):
+        """Queue a transcription, returns the job. video_path is where a URL is downloaded."""
+        if video_path:
+            video_path = os.path.abspath(video_path)  # The daemon has its own working directory
+        return self._request("POST", "/jobs", json={"source": source, "model": model_name, "video_path": video_path})
+
+    def job(self, job_id):
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def cancel(self, job_id):
+        return self._request("DELETE", f"/jobs/{job_id}")
+
+    def result(self, job_id):
+        return self._request("GET", f"/jobs/{job_id}/result")
+
+    def wait(self, job_id, poll_interval=POLL_INTERVAL):
+        """Block until the job is over, returns the transcript."""
+        while True:
+            job = self.job(job_id)
+            if job["status"] == JOB_DONE:
+                return self.result(job_id)
+            if job["status"] in (JOB_FAILED, JOB_CANCELLED):
+                raise DaemonError(f"Transcription {job['status']}: {job['error'] or job['source']}")
+            time.sleep(poll_interval)
+
+def find_daemon():
+    """Client of the transcription daemon if one is running for this cache, None otherwise."""
+    try:
+        with open(DAEMON_FILE, "r") as f:
+            info = json.load(f)
+        client = DaemonClient(info["port"], info["token"])
+        client.status()
+        return client
+    except (OSError, ValueError, KeyError, DaemonError):
+        return None  # Not running, or a stale file left by a daemon that was killed
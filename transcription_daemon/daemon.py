@@ -0,0 +1,234 @@
+import os, json, time, uuid, secrets, threading
+
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from cache_handler import *
+from batch_transcriber.batch_transcriber import transcribe_item
+from job_scheduler.cancellation import CancellationToken, JobCancelled
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+TOKEN_HEADER = "X-Daemon-Token"
+FINISHED_JOB_TTL = 3600  # Seconds a finished job can still be looked up by its clients
+
+class TranscriptionDaemon:
+    """
+    Owns the loaded Whisper models and a queue of transcription jobs, served to the local
+    clients over HTTP on 127.0.0.1. Results are written to the transcript cache, and a job
+    for a transcript that is cached or already queued is not transcribed again.
+
+    The port and an access token are published in DAEMON_FILE, readable by the user only.
+    Finished jobs are forgotten after FINISHED_JOB_TTL.
+    """
+    def __init__(self, workers=1, port=0):
+        self.jobs = {}  # id -> job dict
+        self.jobs_by_cache = {}  # transcript cache file -> id of its queued or running job
+        self.pending = deque()
+        self.tokens = {}  # id -> CancellationToken of the running jobs
+        self.condition = threading.Condition()
+        self.model_locks = {}  # Models are shared, one transcription at a time for each
+        self.token = secrets.token_hex(16)
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), _make_handler(self))
+        self.workers = [threading.Thread(target=self._work, daemon=True) for _ in range(max(1, workers))]
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    # --- Jobs --- #
+    def submit(self, source, model_name, video_path=None):
+        """Queue the transcription of source (a path or a URL downloaded to video_path)."""
+        is_url = source.startswith("http")
+        video_path = video_path or (os.path.join(VIDEO_DIR, os.path.basename(source)) if is_url else source)
+        cache_file = get_cache_path(video_path, model_name)
+        with self.condition:
+            job_id = self.jobs_by_cache.get(cache_file)
+            if job_id:
+                return dict(self.jobs[job_id])
+            job = {
+                "id": uuid.uuid4().hex[:12],
+                "source": source,
+                "model": model_name,
+                "video_path": video_path,
+                "cache_file": cache_file,
+                "status": JOB_QUEUED,
+                "reason": None,  # Why a running job is waiting, or was downgraded
+                "error": None,
+                "finished": None,  # time.time() once done, failed or cancelled
+            }
+            self._prune()
+            self.jobs[job["id"]] = job
+            if os.path.exists(cache_file):
+                job["status"], job["finished"] = JOB_DONE, time.time()
+                return dict(job)
+            self.jobs_by_cache[cache_file] = job["id"]
+            self.pending.append(job)
+            self.condition.notify()
+            return dict(job)
+
+    def get_job(self, job_id):
+        with self.condition:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def cancel(self, job_id):
+        """Cancel a queued job, or stop a running one at its next download chunk or Whisper window."""
+        with self.condition:
+            job = self.jobs.get(job_id)
+            if job is None or job["status"] not in (JOB_QUEUED, JOB_RUNNING):
+                return False
+            if job["status"] == JOB_QUEUED:
+                self.pending.remove(job)
+                job["finished"] = time.time()
+            # Running ones too, submitting it again starts a new job while this one stops
+            if self.jobs_by_cache.get(job["cache_file"]) == job_id:
+                del self.jobs_by_cache[job["cache_file"]]
+            job["status"] = JOB_CANCELLED
+            token = self.tokens.get(job_id)
+        if token is not None:
+            token.cancel()
+        return True
+
+    def status(self):
+        with self.condition:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return {"pid": os.getpid(), "jobs": counts, "queued": len(self.pending)}
+
+    def _prune(self):
+        # Called with the lock held
+        expired = time.time() - FINISHED_JOB_TTL
+        for job_id, job in list(self.jobs.items()):
+            if job["finished"] and job["finished"] < expired:
+                del self.jobs[job_id]
+
+    def _work(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                job = self.pending.popleft()
+                job["status"] = JOB_RUNNING
+                token = self.tokens[job["id"]] = CancellationToken()
+                self.model_locks.setdefault(job["model"], threading.Lock())
+                cache_file = job["cache_file"]  # Its key in jobs_by_cache, even if downgraded
+            item = {"name": job["id"], "video_path": job["video_path"],
+                    "url": job["source"] if job["source"].startswith("http") else None}
+
+            def on_wait(reason):
+                # Shown by the clients, the job stays running while it waits for memory
+                with self.condition:
+                    job["reason"] = reason
+            try:
+                with self.model_locks[job["model"]]:
+                    seconds, model_name = transcribe_item(item, job["model"], on_wait, token)
+                print(f"Job {job['id']} done in {seconds:.1f}s with {model_name}: {job['source']}")
+                status, error = JOB_DONE, None
+                with self.condition:
+                    # Downgraded for lack of memory, the transcript is cached under the smaller model
+                    job["model"] = model_name
+                    job["cache_file"] = get_cache_path(job["video_path"], model_name)
+            except JobCancelled:
+                print(f"Job {job['id']} cancelled")
+                status, error = JOB_CANCELLED, None
+            except Exception as e:
+                print(f"Job {job['id']} failed: {e}")
+                status, error = JOB_FAILED, str(e)
+            with self.condition:
+                self.tokens.pop(job["id"], None)
+                if self.jobs_by_cache.get(cache_file) == job["id"]:
+                    del self.jobs_by_cache[cache_file]
+                if job["status"] != JOB_CANCELLED:
+                    job["status"], job["error"] = status, error
+                job["finished"] = time.time()
+
+    # --- Server --- #
+    def serve_forever(self):
+        for worker in self.workers:
+            worker.start()
+        fd = os.open(DAEMON_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"port": self.port, "pid": os.getpid(), "token": self.token}, f)
+        print(f"Transcription daemon listening on 127.0.0.1:{self.port}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if os.path.exists(DAEMON_FILE):
+                os.remove(DAEMON_FILE)
+
+    def shutdown(self):
+        self.server.shutdown()
+
+def _make_handler(daemon):
+    class Handler(BaseHTTPRequestHandler):
+        """
+        GET /status, POST /jobs {"source", "model", "video_path"}, GET /jobs/<id>,
+        GET /jobs/<id>/result and DELETE /jobs/<id>.
+        """
+        def log_message(self, format, *args):
+            pass  # Jobs are logged by the daemon
+
+        def send_json(self, code, data):
+            body = json.dumps(data).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def authorized(self):
+            if secrets.compare_digest(self.headers.get(TOKEN_HEADER, ""), daemon.token):
+                return True
+            self.send_json(403, {"error": "invalid token"})
+            return False
+
+        def job_path(self):
+            parts = self.path.strip("/").split("/")
+            if len(parts) in (2, 3) and parts[0] == "jobs":
+                return parts[1], parts[2] if len(parts) == 3 else None
+            return None, None
+
+        def do_GET(self):
+            if not self.authorized():
+                return
+            if self.path == "/status":
+                return self.send_json(200, daemon.status())
+            job_id, action = self.job_path()
+            job = daemon.get_job(job_id) if job_id else None
+            if job is None or action not in (None, "result"):
+                return self.send_json(404, {"error": "no such job"})
+            if action is None:
+                return self.send_json(200, job)
+            if job["status"] != JOB_DONE:
+                return self.send_json(409, {"error": f"job is {job['status']}"})
+            with open(job["cache_file"], "r") as f:
+                self.send_json(200, json.load(f))
+
+        def do_POST(self):
+            if not self.authorized():
+                return
+            if self.path != "/jobs":
+                return self.send_json(404, {"error": "not found"})
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                job = daemon.submit(request["source"], request["model"], request.get("video_path"))
+            except (ValueError, KeyError, TypeError) as e:
+                return self.send_json(400, {"error": f"invalid job: {e}"})
+            self.send_json(200, job)
+
+        def do_DELETE(self):
+            if not self.authorized():
+                return
+            job_id, action = self.job_path()
+            if job_id is None or action is not None or not daemon.cancel(job_id):
+                return self.send_json(404, {"error": "no job to cancel"})
+            self.send_json(200, daemon.get_job(job_id))
+    return Handler
@@ -1 +1,3 @@
-from .video_downloader import download_video
\ No newline at end of file
+from .video_downloader import download_video, get_session, DownloadError
+from .download_manager import DownloadManager, RateLimiter, get_download_manager, apply_download_settings
+from .audio_downloader import download_audio
\ No newline at end of file
@@ -0,0 +1,45 @@
+import os, ffmpeg
+
+from job_scheduler.cancellation import JobCancelled, wait_process
+from pipeline_metrics import get_metrics, file_size
+
+# Bitrate used when the audio track can't be copied as is
+AUDIO_BITRATE = "64k"
+
+def _run(stream, token):
+    # Like stream.run(quiet=True), but the process follows the token
+    process = stream.run_async(pipe_stdout=True, pipe_stderr=True, overwrite_output=True)
+    stdout, stderr = wait_process(process, token)
+    if process.returncode != 0:
+        raise ffmpeg.Error("ffmpeg", stdout, stderr)
+
+def download_audio(url, audio_path, token=None):
+    """
+    Fetch only the audio track of a remote video into audio_path (.m4a).
+
+    ffmpeg reads the URL itself and keeps only the audio. With adaptive streams
+    (HLS/DASH) only the audio rendition is transferred; with a progressive MP4 the video
+    bytes still go over the network but are never written to disk. The track is copied
+    without re-encoding when the codec fits in an .m4a, and re-encoded to AAC otherwise.
+    ffmpeg is killed if token is cancelled, and stopped while it is paused.
+    """
+    tmp_path = audio_path + ".part"
+    stream = ffmpeg.input(url, reconnect=1, reconnect_streamed=1, reconnect_delay_max=5).audio
+    try:
+        with get_metrics().stage("download_audio", job=os.path.basename(audio_path)) as record:
+            try:
+                _run(stream.output(tmp_path, format="ipod", acodec="copy"), token)
+            except ffmpeg.Error:
+                print("Audio track can't be copied, re-encoding it...")
+                _run(stream.output(tmp_path, format="ipod", acodec="aac", audio_bitrate=AUDIO_BITRATE), token)
+            record["bytes"] = file_size(tmp_path)  # Written, what went over the network is unknown
+    except JobCancelled:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    except ffmpeg.Error as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise RuntimeError(f"Error downloading audio of {url}: {e.stderr.decode(errors='replace')}") from e
+    os.replace(tmp_path, audio_path)
+    print(f"Audio downloaded successfully: {audio_path}")
@@ -0,0 +1,228 @@
+import time, threading, requests
+
+from collections import deque
+from concurrent.futures import Future
+
+from job_scheduler.cancellation import CancellationToken, JobCancelled
+from job_scheduler.job_store import get_job_store, STATE_FAILED, STATE_CANCELLED
+from pipeline_metrics import get_metrics
+
+from .video_downloader import download_video
+
+DEFAULT_MAX_CONCURRENT = 2
+DEFAULT_MAX_RETRIES = 3
+RETRY_BACKOFF = 2.0  # Seconds before the first retry, doubled at every attempt
+
+def _retryable(error):
+    """False for the errors another attempt can't fix: a cancellation, or the server refusing the URL."""
+    if isinstance(error, JobCancelled):
+        return False
+    # download_video raises DownloadError from the requests error
+    cause = error if isinstance(error, requests.HTTPError) else error.__cause__
+    if isinstance(cause, requests.HTTPError) and cause.response is not None:
+        status = cause.response.status_code
+        return not 400 <= status < 500 or status in (408, 429)  # Timeout and rate limit pass
+    return True
+
+class RateLimiter:
+    """Token bucket shared by every download, rate in bytes per second (0 = unlimited)."""
+    def __init__(self, rate=0):
+        self.rate = rate
+        self.tokens = 0.0
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def set_rate(self, rate):
+        with self.lock:
+            self.rate = rate
+            self.tokens = 0.0
+
+    def consume(self, amount):
+        while True:
+            with self.lock:
+                if self.rate <= 0:
+                    return
+                now = time.monotonic()
+                # Allow at most one second of burst
+                self.tokens = min(self.rate, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= amount or self.tokens >= self.rate:
+                    self.tokens -= amount  # Chunks larger than the burst go into debt
+                    return
+                wait = (min(amount, self.rate) - self.tokens) / self.rate
+            time.sleep(wait)
+
+class _DownloadJob:
+    def __init__(self, url, output_path, token=None, job_id=None):
+        self.url = url
+        self.output_path = output_path
+        self.job_id = job_id  # In the job store
+        self.token = token or CancellationToken()
+        self.future = Future()
+        self.listeners = []
+        self.downloaded = 0
+        self.total = None
+        self.queued = time.monotonic()
+
+class DownloadManager:
+    """
+    Queues downloads and runs at most max_concurrent of them at a time, retrying with
+    exponential backoff unless the server refused the URL (4xx). Requests for a URL already
+    queued or downloading share the same job.
+
+    Listeners are called as listener(url, downloaded_bytes, total_bytes) from the download
+    threads, one that raises is removed; completion is reported through the returned
+    concurrent.futures.Future.
+    Running downloads can be paused, resumed and cancelled, a cancelled one fails with JobCancelled.
+    """
+    def __init__(self, max_concurrent=DEFAULT_MAX_CONCURRENT, bandwidth_limit=0, max_retries=DEFAULT_MAX_RETRIES):
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter(bandwidth_limit)
+        self.jobs = {}  # url -> _DownloadJob, queued or running
+        self.pending = deque()
+        self.active = 0
+        self.lock = threading.Lock()
+
+    def configure(self, max_concurrent=None, bandwidth_limit=None):
+        """bandwidth_limit is in bytes per second, 0 means unlimited."""
+        with self.lock:
+            if max_concurrent is not None:
+                self.max_concurrent = max(1, max_concurrent)
+            if bandwidth_limit is not None:
+                self.rate_limiter.set_rate(bandwidth_limit)
+            self._dispatch()
+
+    def submit(self, url, output_path, listener=None, token=None, job_id=None):
+        """
+        Queue a download, cancelling token (if given) cancels it even if it is shared.
+        job_id is the job store record of the download, ignored if url is in flight already.
+        """
+        with self.lock:
+            job = self.jobs.get(url)
+            if job is None:
+                job = _DownloadJob(url, output_path, token, job_id)
+                self.jobs[url] = job
+                self.pending.append(job)
+            if listener:
+                job.listeners.append(listener)
+            self._dispatch()
+        if token is not None:
+            token.on_cancel(lambda: self.cancel(url))
+        return job.future
+
+    def add_listener(self, url, listener):
+        """Follow a download started elsewhere, returns its future or None if it isn't in flight."""
+        with self.lock:
+            job = self.jobs.get(url)
+            if job is None:
+                return None
+            job.listeners.append(listener)
+            return job.future
+
+    def progress(self, url):
+        """(downloaded_bytes, total_bytes) of a download in flight, or None."""
+        with self.lock:
+            job = self.jobs.get(url)
+            return (job.downloaded, job.total) if job else None
+
+    def cancel(self, url):
+        """Cancel a queued download, or stop a running one and remove its partial file."""
+        with self.lock:
+            job = self.jobs.get(url)
+            if job is None:
+                return False
+            if job.future.cancel():
+                self.pending.remove(job)
+                del self.jobs[url]
+                get_job_store().finish(job.job_id, STATE_CANCELLED)
+                return True
+        job.token.cancel()  # Outside of the lock, it calls back the other tokens of the job
+        return True
+
+    def pause(self, url):
+        with self.lock:
+            job = self.jobs.get(url)
+        if job is not None:
+            job.token.pause()
+        return job is not None
+
+    def resume(self, url):
+        with self.lock:
+            job = self.jobs.get(url)
+        if job is not None:
+            job.token.resume()
+        return job is not None
+
+    def _dispatch(self):
+        # Called with the lock held
+        while self.pending and self.active < self.max_concurrent:
+            job = self.pending.popleft()
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            self.active += 1
+            threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def _run(self, job):
+        def on_progress(downloaded, total):
+            job.downloaded, job.total = downloaded, total
+            for listener in list(job.listeners):
+                # A listener failing, e.g. of a closed dialog, must not fail the transfer
+                try:
+                    listener(job.url, downloaded, total)
+                except Exception as e:
+                    print(f"Progress listener of {job.url} failed, removed: {e}")
+                    with self.lock:
+                        if listener in job.listeners:
+                            job.listeners.remove(listener)
+
+        store = get_job_store()
+        store.start(job.job_id)
+        get_metrics().queue_wait("downloads", time.monotonic() - job.queued)
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    with store.stage(job.job_id, "download"):
+                        download_video(job.url, job.output_path, progress_callback=on_progress,
+                                       rate_limiter=self.rate_limiter, token=job.token)
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries or not _retryable(e):
+                        raise
+                    delay = RETRY_BACKOFF * 2 ** attempt
+                    print(f"Download of {job.url} failed ({e}), retrying in {delay:.0f}s...")
+                    # The .part file is kept, the next attempt resumes from it. Cancelling ends the wait
+                    job.token.sleep(delay)
+        except Exception as e:
+            store.finish(job.job_id, STATE_CANCELLED if isinstance(e, JobCancelled) else STATE_FAILED, str(e))
+            job.future.set_exception(e)
+        else:
+            store.finish(job.job_id)
+            job.future.set_result(job.output_path)
+        finally:
+            with self.lock:
+                self.active -= 1
+                self.jobs.pop(job.url, None)
+                self._dispatch()
+
+_download_manager = None
+_download_manager_lock = threading.Lock()
+
+def get_download_manager():
+    """Download manager shared by the whole application, configured from the settings."""
+    global _download_manager
+    with _download_manager_lock:
+        if _download_manager is None:
+            # Imported here, the downloader is also used by the headless batch mode without Qt
+            from settings_window.settings_IO import load_settings
+            _download_manager = DownloadManager()
+            apply_download_settings(load_settings())
+        return _download_manager
+
+def apply_download_settings(settings):
+    manager = _download_manager
+    if manager is None:
+        return  # Settings are read when the manager is created
+    bandwidth_limit = settings.get("bandwidth_limit", 0)  # Mbit/s
+    manager.configure(settings.get("max_concurrent_downloads", DEFAULT_MAX_CONCURRENT),
+                      int(bandwidth_limit * 125000))
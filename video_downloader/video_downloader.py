@@ -1,9 +1,214 @@
-import requests
-
-def download_video(url, output_path):
-    """Downloads video using requests instead of wget."""
-    response = requests.get(url, stream=True)
-    with open(output_path, "wb") as file:
-        for chunk in response.iter_content(chunk_size=1024):
-            if chunk:
-                file.write(chunk)
\ No newline at end of file
+import os, json, threading, requests
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from job_scheduler.cancellation import JobCancelled, check_token
+from pipeline_metrics import get_metrics
+
+CHUNK_SIZE = 1024 * 1024  # Bytes read from the socket and written to disk at a time
+STATE_SAVE_INTERVAL = 16 * CHUNK_SIZE  # Bytes downloaded between two saves of the resume state
+MIN_SEGMENT_SIZE = 8 * CHUNK_SIZE  # Smaller files are not worth splitting
+DEFAULT_CONNECTIONS = 4
+TIMEOUT = (10, 60)  # (connect, read) in seconds
+
+class DownloadError(Exception):
+    pass
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Shared session, so that connections are pooled across downloads."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            retries = Retry(connect=3, read=0, backoff_factor=0.5)
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retries)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            # Content-Length must match the bytes written to disk
+            _session.headers["Accept-Encoding"] = "identity"
+        return _session
+
+def probe_download(url, session=None):
+    """
+    Ask the server for the first byte of the file.
+    Returns (size, accepts_ranges, validator); size is None when the server doesn't tell.
+    """
+    session = session or get_session()
+    with session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=TIMEOUT) as response:
+        response.raise_for_status()
+        validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+        if response.status_code == 206:
+            # Content-Range: bytes 0-0/<size>
+            total = response.headers.get("Content-Range", "").rpartition("/")[2]
+            return (int(total) if total.isdigit() else None), True, validator
+        length = response.headers.get("Content-Length")
+        return (int(length) if length and length.isdigit() else None), False, validator
+
+def _load_state(state_path):
+    try:
+        with open(state_path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def _save_state(state_path, state):
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+def _split_segments(size, connections):
+    """Split [0, size) into [start, end, done] segments, end inclusive."""
+    count = max(1, min(connections, size // MIN_SEGMENT_SIZE))
+    step = -(-size // count)
+    return [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+
+class _Download:
+    def __init__(self, url, part_path, state, session, progress_callback, rate_limiter, token):
+        self.url = url
+        self.part_path = part_path
+        self.state_path = part_path + ".json"
+        self.state = state
+        self.session = session
+        self.progress_callback = progress_callback
+        self.rate_limiter = rate_limiter
+        self.token = token
+        self.lock = threading.Lock()
+        self.abort = threading.Event()
+        self.unsaved = 0
+
+    def downloaded(self):
+        return sum(segment[2] for segment in self.state["segments"])
+
+    def run(self):
+        segments = [s for s in self.state["segments"] if s[1] is None or s[2] < s[1] - s[0] + 1]
+        if not segments:
+            return
+        if len(segments) == 1:
+            self.fetch_segment(segments[0])
+            return
+        with ThreadPoolExecutor(max_workers=len(segments)) as pool:
+            futures = [pool.submit(self.fetch_segment, segment) for segment in segments]
+            errors = []
+            # In completion order, the first failure stops the others at their next chunk
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    self.abort.set()  # Stop the other connections, progress is kept in the state
+                    errors.append(e)
+            if errors:
+                raise errors[0]
+
+    def fetch_segment(self, segment):
+        start, end, done = segment
+        headers = {}
+        if self.state["ranges"]:
+            headers["Range"] = f"bytes={start + done}-" + ("" if end is None else str(end))
+            if self.state["validator"]:
+                # Get the whole file instead of a mismatching range if it changed on the server
+                headers["If-Range"] = self.state["validator"]
+
+        with self.session.get(self.url, headers=headers, stream=True, timeout=TIMEOUT) as response:
+            response.raise_for_status()
+            if headers.get("Range") and response.status_code != 206:
+                raise DownloadError(f"Server ignored the range request for {self.url}")
+
+            # Chunks are large already, writing them unbuffered keeps the resume state
+            # consistent with what reached the file
+            with open(self.part_path, "r+b", buffering=0) as file:
+                file.seek(start + done)
+                try:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        if self.abort.is_set():
+                            break
+                        check_token(self.token)  # Blocks while paused
+                        if not chunk:
+                            continue
+                        if end is not None:
+                            chunk = chunk[:end - start + 1 - segment[2]]
+                        if self.rate_limiter:
+                            self.rate_limiter.consume(len(chunk))
+                        file.write(chunk)
+                        self.add_progress(segment, len(chunk))
+                        if end is not None and segment[2] >= end - start + 1:
+                            break
+                finally:
+                    with self.lock:
+                        _save_state(self.state_path, self.state)
+
+    def add_progress(self, segment, length):
+        with self.lock:
+            segment[2] += length
+            self.unsaved += length
+            if self.unsaved >= STATE_SAVE_INTERVAL:
+                _save_state(self.state_path, self.state)
+                self.unsaved = 0
+            downloaded = self.downloaded()
+        if self.progress_callback:
+            self.progress_callback(downloaded, self.state["size"])
+
+def download_video(url, output_path, connections=DEFAULT_CONNECTIONS, session=None, progress_callback=None,
+                   rate_limiter=None, token=None):
+    """
+    Download url to output_path.
+
+    The file is fetched into output_path + ".part" next to a small JSON resume state, so an
+    interrupted download continues where it stopped. When the server accepts range requests,
+    the file is split in segments fetched in parallel over pooled connections.
+    progress_callback(downloaded_bytes, total_bytes) is called from the download threads.
+    rate_limiter, if given, is shared by all connections to cap the bandwidth.
+    token (a CancellationToken) is checked at every chunk, a cancelled download removes its
+    partial file instead of keeping it for a resume.
+    """
+    session = session or get_session()
+    part_path = output_path + ".part"
+    state_path = part_path + ".json"
+
+    size, ranges, validator = probe_download(url, session)
+
+    state = _load_state(state_path)
+    resumable = (state is not None and os.path.exists(part_path) and ranges
+                 and state.get("url") == url and state.get("size") == size
+                 and state.get("validator") == validator)
+    if not resumable:
+        if ranges and size:
+            segments = _split_segments(size, connections)
+        else:
+            segments = [[0, None if size is None else size - 1, 0]]
+        state = {"url": url, "size": size, "ranges": ranges, "validator": validator, "segments": segments}
+        with open(part_path, "wb") as file:
+            if ranges and size:
+                file.truncate(size)  # Preallocate, segments write at their own offset
+        _save_state(state_path, state)
+    else:
+        print(f"Resuming download of {url}")
+
+    download = _Download(url, part_path, state, session, progress_callback, rate_limiter, token)
+    resumed = download.downloaded()
+    try:
+        with get_metrics().stage("download", job=os.path.basename(output_path)) as record:
+            try:
+                download.run()
+            finally:
+                record["bytes"] = download.downloaded() - resumed  # Transferred by this run
+    except requests.RequestException as e:
+        raise DownloadError(f"Download of {url} interrupted: {e}") from e
+    except JobCancelled:
+        for path in (part_path, state_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    # Integrity check against Content-Length
+    downloaded = download.downloaded()
+    if size is not None and (downloaded != size or os.path.getsize(part_path) != size):
+        raise DownloadError(f"Incomplete download of {url}: {downloaded} of {size} bytes")
+
+    os.replace(part_path, output_path)
+    os.remove(state_path)
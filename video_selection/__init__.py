@@ -1 +1,4 @@
-from .video_selection import *
\ No newline at end of file
+from .video_selection import *
+from .thumbnail_service import *
+from .rss_refresher import *
+from .feed_model import *
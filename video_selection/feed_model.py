@@ -0,0 +1,227 @@
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex
+from PyQt6.QtGui import QColor
+
+from cache_handler import *
+
+# Roles, UserRole and UserRole + 1 match the ones of the former list items
+URL_ROLE = Qt.ItemDataRole.UserRole
+KEY_ROLE = Qt.ItemDataRole.UserRole + 1
+STATUS_ROLE = Qt.ItemDataRole.UserRole + 2
+ENTRY_ROLE = Qt.ItemDataRole.UserRole + 3
+
+STATUS_COLORS = {
+    STATUS_TRANSCRIBED: "white",
+    STATUS_DOWNLOADED: "grey",
+    STATUS_AUDIO_ONLY: "lightblue",
+    STATUS_MISSING: "red",
+}
+
+SORT_DATE_DESC = "date_desc"
+SORT_DATE_ASC = "date_asc"
+SORT_TITLE = "title"
+SORT_STATUS = "status"
+
+# Rows handed to the view at a time, the rest is fetched while scrolling
+FETCH_BATCH = 200
+
+_STATUS_ORDER = [STATUS_MISSING, STATUS_DOWNLOADED, STATUS_AUDIO_ONLY, STATUS_TRANSCRIBED]
+
+class FeedEntryModel(QAbstractListModel):
+    """
+    Lectures of a feed entry index, checkable, with their cache status and download progress.
+
+    Filtering and sorting are done here on the whole index, the view only receives the rows
+    it scrolls to. Status and progress changes are emitted for the affected rows only, unless
+    a status change moves rows under the status filter or sort.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.entries = []
+        self.statuses = {}  # key -> cache status
+        self.progress = {}  # url -> progress text
+        self.checked = set()  # entry ids
+        self.order = []  # entry positions after filtering and sorting
+        self.rows = {}  # entry position -> row in order
+        self.url_positions = {}  # url -> entry positions, entries may share a URL
+        self.loaded = 0
+        self.filter_text = ""
+        self.filter_status = None
+        self.sort_mode = SORT_DATE_DESC
+
+    # --- Entries --- #
+    def set_entries(self, entries):
+        """Show a new entry index, check marks and progress of the remaining entries are kept."""
+        ids = {entry["id"] for entry in entries}
+        self.beginResetModel()
+        self.entries = [entry for entry in entries if entry["url"]]
+        self.statuses = get_cache_statuses(entry["key"] for entry in self.entries)
+        self.checked &= ids
+        self.url_positions = {}
+        for i, entry in enumerate(self.entries):
+            self.url_positions.setdefault(entry["url"], []).append(i)
+        self._update_order()
+        self.endResetModel()
+
+    def set_filter(self, text=None, status=None):
+        self.beginResetModel()
+        self.filter_text = (text or "").lower()
+        self.filter_status = status
+        self._update_order()
+        self.endResetModel()
+
+    def set_sort(self, sort_mode):
+        self.beginResetModel()
+        self.sort_mode = sort_mode
+        self._update_order()
+        self.endResetModel()
+
+    def _update_order(self):
+        self.order = self._sorted_order()
+        self.rows = {position: row for row, position in enumerate(self.order)}
+        self.loaded = min(FETCH_BATCH, len(self.order))
+
+    def _sorted_order(self):
+        order = [i for i, entry in enumerate(self.entries) if self._accepts(entry)]
+        if self.sort_mode in (SORT_DATE_DESC, SORT_DATE_ASC):
+            order.sort(key=lambda i: self.entries[i]["date"] or [0, 0, 0], reverse=self.sort_mode == SORT_DATE_DESC)
+        elif self.sort_mode == SORT_TITLE:
+            order.sort(key=lambda i: self.entries[i]["title"].lower())
+        elif self.sort_mode == SORT_STATUS:
+            order.sort(key=lambda i: _STATUS_ORDER.index(self.statuses[self.entries[i]["key"]]))
+        return order
+
+    def _accepts(self, entry):
+        if self.filter_status and self.statuses[entry["key"]] != self.filter_status:
+            return False
+        if self.filter_text:
+            return self.filter_text in entry["title"].lower() or self.filter_text in entry["key"].lower()
+        return True
+
+    # --- Lazy fetching --- #
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.loaded < len(self.order)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(FETCH_BATCH, len(self.order) - self.loaded)
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    # --- Item data --- #
+    def entry(self, row):
+        return self.entries[self.order[row]]
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= self.loaded:
+            return None
+        entry = self.entry(index.row())
+        if role == Qt.ItemDataRole.DisplayRole:
+            progress = self.progress.get(entry["url"])
+            return f"{entry['key']}  {progress}" if progress else entry["key"]
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return entry["title"]
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return QColor(STATUS_COLORS[self.statuses[entry["key"]]])
+        if role == Qt.ItemDataRole.CheckStateRole:
+            return Qt.CheckState.Checked if entry["id"] in self.checked else Qt.CheckState.Unchecked
+        if role == URL_ROLE:
+            return entry["url"]
+        if role == KEY_ROLE:
+            return entry["key"]
+        if role == STATUS_ROLE:
+            return self.statuses[entry["key"]]
+        if role == ENTRY_ROLE:
+            return entry
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.CheckStateRole or not index.isValid():
+            return False
+        entry_id = self.entry(index.row())["id"]
+        if Qt.CheckState(value) == Qt.CheckState.Checked:
+            self.checked.add(entry_id)
+        else:
+            self.checked.discard(entry_id)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
+        return True
+
+    def flags(self, index):
+        # Not user checkable: the view toggles the check mark on click, see toggle_checked
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    # --- Check marks --- #
+    def toggle_checked(self, index):
+        state = self.data(index, Qt.ItemDataRole.CheckStateRole)
+        new_state = Qt.CheckState.Unchecked if state == Qt.CheckState.Checked else Qt.CheckState.Checked
+        self.setData(index, new_state, Qt.ItemDataRole.CheckStateRole)
+
+    def checked_entries(self):
+        return [entry for entry in self.entries if entry["id"] in self.checked]
+
+    def set_all_checked(self, checked):
+        """Check or uncheck every entry passing the filter, loaded in the view or not."""
+        ids = {self.entries[position]["id"] for position in self.order}
+        if checked:
+            self.checked |= ids
+        else:
+            self.checked -= ids
+        if self.loaded:
+            self.dataChanged.emit(self.index(0), self.index(self.loaded - 1), [Qt.ItemDataRole.CheckStateRole])
+
+    def all_checked(self):
+        return all(self.entries[position]["id"] in self.checked for position in self.order)
+
+    # --- Targeted updates --- #
+    def _emit_entry_changed(self, position, roles):
+        row = self.rows.get(position)
+        if row is not None and row < self.loaded:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, roles)
+
+    def set_progress(self, url, text):
+        """Show text (or nothing if None) next to the lecture of url."""
+        if text is None:
+            self.progress.pop(url, None)
+        else:
+            self.progress[url] = text
+        for position in self.url_positions.get(url, []):
+            self._emit_entry_changed(position, [Qt.ItemDataRole.DisplayRole])
+
+    def update_status(self, url):
+        """Recompute the cache status of the lectures of url."""
+        changed = []
+        for position in self.url_positions.get(url, []):
+            key = self.entries[position]["key"]
+            status = get_cache_status(key)
+            if status != self.statuses[key]:
+                self.statuses[key] = status
+                changed.append(position)
+        self._statuses_changed(changed)
+
+    def refresh_statuses(self):
+        """Recompute the cache status of every lecture, after a batch operation."""
+        statuses = get_cache_statuses(self.statuses)
+        changed = [position for position, entry in enumerate(self.entries)
+                   if statuses[entry["key"]] != self.statuses[entry["key"]]]
+        self.statuses = statuses
+        self._statuses_changed(changed)
+
+    def _statuses_changed(self, positions):
+        if not positions:
+            return
+        order = self._sorted_order()
+        if order == self.order:
+            for position in positions:
+                self._emit_entry_changed(position, [Qt.ItemDataRole.ForegroundRole, STATUS_ROLE])
+            return
+        # Rows entered or left the status filter, or moved in the status sort
+        loaded = self.loaded
+        self.beginResetModel()
+        self._update_order()
+        self.loaded = min(max(loaded, self.loaded), len(self.order))  # Keep what was scrolled to
+        self.endResetModel()
@@ -0,0 +1,110 @@
+import os
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from cache_handler import *
+from video_downloader import get_session
+
+MAX_REFRESH_WORKERS = 4
+FEED_TIMEOUT = (10, 30)  # (connect, read) in seconds, a slow server must not hold the refresh
+
+def refresh_feed(name):
+    """
+    Download the subscribed feed stored under name in the url cache, sending the stored
+    ETag/Last-Modified so that an unchanged feed costs a single 304 response, unless its
+    index is missing from the cache.
+    Returns the title under which the feed was cached and the entries that weren't in the
+    cached index, or None if the feed didn't change.
+    """
+    feed_url = get_rss_url_cache(name)
+    if not feed_url:
+        return None
+
+    # Without a cached index (deleted) a 304 would leave the feed unlisted for good
+    validators = get_rss_validators(name) if os.path.exists(os.path.join(RSS_DIR, name + ".json")) else {}
+    headers = {"Accept-Encoding": "gzip, deflate"}  # The shared session asks for identity, meant for videos
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    response = get_session().get(feed_url, headers=headers, timeout=FEED_TIMEOUT)
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+
+    import feedparser  # Only needed once a feed changed, keep it out of the startup
+    # feedparser looks the headers up in lower case
+    response_headers = {k.lower(): v for k, v in response.headers.items()}
+    feed = feedparser.parse(response.content, response_headers=response_headers)
+    if feed.bozo:
+        print("Error parsing RSS feed:", feed.bozo_exception)
+        return None
+
+    title = feed.feed.get('title', "No channel title found")
+    title = ''.join([c for c in title if c.isupper()]) # Use only upper cases
+    # Without a cached index every entry is new, the back catalog isn't reported
+    known_feed = os.path.exists(os.path.join(RSS_DIR, title + ".json"))
+    new_entries = set_rss_cache(feed, title)
+    set_rss_validators(name, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    return title, new_entries if known_feed else []
+
+class RefreshSignals(QObject):
+    feed_updated = pyqtSignal(str)  # title of the cached feed
+    new_entries = pyqtSignal(str, object)  # title, entries that weren't in the cached index
+    feed_done = pyqtSignal()
+
+class RefreshTask(QRunnable):
+    def __init__(self, name, signals):
+        super().__init__()
+        self.name = name
+        self.signals = signals
+
+    def run(self):
+        try:
+            updated = refresh_feed(self.name)
+            if updated:
+                title, new_entries = updated
+                self.signals.feed_updated.emit(title)
+                if new_entries:
+                    self.signals.new_entries.emit(title, new_entries)
+        except Exception as e:
+            # Also corrupt cache files, PyQt aborts the application if run() raises
+            print(f"Error refreshing feed {self.name}: {e}")
+        finally:
+            self.signals.feed_done.emit()
+
+class RSSRefresher(QObject):
+    """
+    Refreshes every subscribed feed concurrently in a background pool.
+    feed_updated is emitted, in the GUI thread, for each feed whose cache changed, and
+    new_entries with the lectures that appeared since the previous refresh.
+    """
+    feed_updated = pyqtSignal(str)
+    new_entries = pyqtSignal(str, object)
+    finished = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.running = 0
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(MAX_REFRESH_WORKERS)
+        self.signals = RefreshSignals()
+        self.signals.feed_updated.connect(self.feed_updated)
+        self.signals.new_entries.connect(self.new_entries)
+        self.signals.feed_done.connect(self.on_feed_done)
+
+    def refresh_all(self):
+        if self.running or not os.path.exists(URL_DIR):
+            return  # A refresh is already in progress
+        names = [os.path.splitext(f)[0] for f in os.listdir(URL_DIR) if f.endswith(".json")]
+        self.running = len(names)
+        for name in names:
+            self.pool.start(RefreshTask(name, self.signals))
+        if not names:
+            self.finished.emit()
+
+    def on_feed_done(self):
+        self.running -= 1
+        if self.running == 0:
+            self.finished.emit()
@@ -0,0 +1,68 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from cache_handler import *
+
+# ffmpeg is mostly I/O and decoder bound, a couple of workers are enough and
+# keep the machine responsive while the home page is shown.
+MAX_THUMBNAIL_WORKERS = 2
+
+class ThumbnailSignals(QObject):
+    # video_path, thumbnail_path or "" if it couldn't be generated
+    finished = pyqtSignal(str, str)
+
+class ThumbnailTask(QRunnable):
+    def __init__(self, video_path, width, height, signals):
+        super().__init__()
+        self.video_path = video_path
+        self.width = width
+        self.height = height
+        self.signals = signals
+
+    def run(self):
+        thumbnail_path = None
+        try:
+            thumbnail_path = generate_thumbnail(self.video_path, self.width, self.height)
+        except OSError as e:
+            print(f"Error generating thumbnail for {self.video_path}: {e}")  # e.g. deleted meanwhile
+        finally:
+            # Signals emitted from the worker thread are delivered in the GUI thread
+            self.signals.finished.emit(self.video_path, thumbnail_path or "")
+
+class ThumbnailService(QObject):
+    """
+    Generates video thumbnails in a bounded background pool.
+    Connect to thumbnail_ready to swap the placeholder icons once a thumbnail is available.
+    """
+    thumbnail_ready = pyqtSignal(str, str)
+
+    def __init__(self, width, height, parent=None):
+        super().__init__(parent)
+        self.width = width
+        self.height = height
+        self.pending = set()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(MAX_THUMBNAIL_WORKERS)
+        self.signals = ThumbnailSignals()
+        self.signals.finished.connect(self.on_thumbnail_finished)
+
+    def request(self, video_path):
+        """
+        Queue a thumbnail for the video, requests already in flight are ignored. A failed
+        thumbnail is tried again at the next request.
+        """
+        if video_path in self.pending:
+            return
+        self.pending.add(video_path)
+        self.pool.start(ThumbnailTask(video_path, self.width, self.height, self.signals))
+
+    def on_thumbnail_finished(self, video_path, thumbnail_path):
+        try:
+            if thumbnail_path:
+                self.thumbnail_ready.emit(video_path, thumbnail_path)
+        finally:
+            self.pending.discard(video_path)
+
+    def shutdown(self):
+        """Called on exit, drops the thumbnails that didn't start and waits for the others."""
+        self.pool.clear()
+        self.pool.waitForDone()
@@ -1,32 +1,133 @@
-import os, json, ffmpeg, whisper, feedparser, shutil
+import os, json, shutil
 
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QPushButton, QListWidget, QDialog, QLineEdit,
-    QLabel, QCheckBox, QFileDialog, QHBoxLayout, QListWidgetItem, QProgressBar
+    QLabel, QCheckBox, QFileDialog, QHBoxLayout, QListWidgetItem, QProgressBar, QListView, QComboBox, QMenu
 )
 from PyQt6.QtGui import QAction, QColor
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
 
 from cache_handler import *
 from video_downloader import *
 from settings_window import *
 from video_transcriber import *
+from video_visualizer import get_waveform_path, get_slides_path, get_sprites_dir
+
+from startup_profiler import profile_phase
+from transcription_daemon.client import find_daemon
+from job_scheduler import get_priority_scheduler, PRIORITY_USER
+from job_scheduler.cancellation import CancellationToken, JobCancelled
+from job_scheduler.job_store import *
+from pipeline_metrics import get_metrics
+
+from .rss_refresher import RSSRefresher
+from .feed_model import *
 
 # Supported Whisper models
 MODELS = ["tiny", "base", "small", "medium", "large", "turbo"]
 
+STATUS_FILTERS = [
+    ("All lectures", None),
+    ("Not downloaded", STATUS_MISSING),
+    ("Downloaded", STATUS_DOWNLOADED),
+    ("Transcribed", STATUS_TRANSCRIBED),
+    ("Audio only", STATUS_AUDIO_ONLY),
+]
+
+SORT_MODES = [
+    ("Newest first", SORT_DATE_DESC),
+    ("Oldest first", SORT_DATE_ASC),
+    ("Title", SORT_TITLE),
+    ("Status", SORT_STATUS),
+]
+
+class DownloadSignals(QObject):
+    """Bridges download manager callbacks, called from the download threads, to the GUI thread."""
+    progress = pyqtSignal(str, object, object)  # url, downloaded bytes, total bytes or None
+    finished = pyqtSignal(str, str)  # url, error message or "" on success
+
+_audio_only_tokens = {}  # url -> CancellationToken of the queued and running audio only tasks
+
+class AudioOnlyTask(QRunnable):
+    """
+    Audio only acquisition: fetch the audio track of a lecture and transcribe it.
+    Recorded in the job store, signals is None when it is resumed at launch.
+    """
+    def __init__(self, url, key, model_name, signals, job_id=None):
+        super().__init__()
+        self.url = url
+        self.key = key
+        self.model_name = model_name
+        self.signals = signals
+        self.token = _audio_only_tokens[url] = CancellationToken()
+        self.job_id = job_id or get_job_store().add(JOB_AUDIO_ONLY, key, url=url, key=key, model=model_name)
+
+    def run(self):
+        store = get_job_store()
+        try:
+            self.token.check()  # Cancelled while queued
+            store.start(self.job_id)
+            with get_priority_scheduler().job(PRIORITY_USER):
+                process_lecture(self.url, self.key, self.model_name, audio_only=True, token=self.token,
+                                job_id=self.job_id)
+            store.finish(self.job_id)
+            error = ""
+        except JobCancelled:
+            store.finish(self.job_id, STATE_CANCELLED)
+            error = "cancelled"
+        except Exception as e:
+            store.finish(self.job_id, STATE_FAILED, str(e))
+            error = str(e)
+        finally:
+            _audio_only_tokens.pop(self.url, None)
+        if self.signals is not None:
+            self.signals.finished.emit(self.url, error)
+
+_audio_only_pool = None
+
+def get_audio_only_pool():
+    # Shared by every feed list, transcriptions are heavy enough to run one at a time
+    global _audio_only_pool
+    if _audio_only_pool is None:
+        _audio_only_pool = QThreadPool()
+        _audio_only_pool.setMaxThreadCount(1)
+    return _audio_only_pool
+
+def resume_jobs():
+    """Start again the downloads and transcriptions left unfinished when the application stopped."""
+    def resume_download(job):
+        get_download_manager().submit(job["params"]["url"], job["params"]["video_path"], job_id=job["id"])
+
+    def resume_audio_only(job):
+        params = job["params"]
+        get_audio_only_pool().start(AudioOnlyTask(params["url"], params["key"], params["model"], None, job["id"]))
+
+    def resume_lecture(job):
+        get_auto_pipeline().enqueue([dict(job["params"], job_id=job["id"])])
+
+    return get_job_store().resume({JOB_DOWNLOAD: resume_download, JOB_AUDIO_ONLY: resume_audio_only,
+                                   JOB_LECTURE: resume_lecture})
+
 class RSSVideoSelectionWidget(QWidget):
     """
     Shows a checkable, multi-select list of videos from cached RSS feeds,
     with batch actions and color-coding:
       - White: transcript exists
       - Grey: downloaded but not transcribed
+      - Light blue: transcribed, video not cached (audio only)
       - Red: not downloaded
+    Downloads run in the background and show their progress next to the lecture name, the
+    context menu of a lecture pauses, resumes or cancels them. The list is a view over a
+    FeedEntryModel, which filters, sorts and only updates changed rows.
     """
     def __init__(self, filename, switch_to_transcriber_callback, parent=None):
         super().__init__()
         self.filename = filename
         self.switch_to_transcriber_callback = switch_to_transcriber_callback
+        self.followed_urls = set()
+        self.download_signals = DownloadSignals()
+        self.download_signals.progress.connect(self.on_download_progress)
+        self.download_signals.finished.connect(self.on_download_finished)
         self.init_ui()
         self.populate_list()
 
@@ -43,132 +144,199 @@ class RSSVideoSelectionWidget(QWidget):
         btn_layout.addWidget(self.select_all_btn)
         layout.addLayout(btn_layout)
 
+        # Filtering and sorting
+        filter_layout = QHBoxLayout()
+        self.filter_entry = QLineEdit()
+        self.filter_entry.setPlaceholderText("Filter lectures")
+        self.status_combo = QComboBox()
+        for label, status in STATUS_FILTERS:
+            self.status_combo.addItem(label, status)
+        self.sort_combo = QComboBox()
+        for label, sort_mode in SORT_MODES:
+            self.sort_combo.addItem(label, sort_mode)
+        filter_layout.addWidget(self.filter_entry, 1)
+        filter_layout.addWidget(self.status_combo)
+        filter_layout.addWidget(self.sort_combo)
+        layout.addLayout(filter_layout)
+
         # Video list
-        self.video_list = QListWidget()
-        self.video_list.setSelectionMode(QListWidget.SelectionMode.NoSelection)
+        self.model = FeedEntryModel(self)
+        self.video_list = QListView()
+        self.video_list.setModel(self.model)
+        self.video_list.setUniformItemSizes(True)
+        self.video_list.setSelectionMode(QListView.SelectionMode.NoSelection)
+        self.video_list.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         layout.addWidget(self.video_list)
-        # self.populate_list()
 
         # Connect signals
         self.download_btn.clicked.connect(self.download_selected)
         self.delete_btn.clicked.connect(self.delete_selected)
         self.select_all_btn.clicked.connect(self.select_all)
-        self.video_list.itemClicked.connect(self.on_item_clicked)
-        self.video_list.itemDoubleClicked.connect(self.on_item_double_clicked)
+        self.filter_entry.textChanged.connect(self.apply_filter)
+        self.status_combo.currentIndexChanged.connect(self.apply_filter)
+        self.sort_combo.currentIndexChanged.connect(lambda: self.model.set_sort(self.sort_combo.currentData()))
+        self.video_list.clicked.connect(self.on_item_clicked)
+        self.video_list.doubleClicked.connect(self.on_item_double_clicked)
+        self.video_list.customContextMenuRequested.connect(self.show_job_menu)
 
         self.setLayout(layout)
 
     def populate_list(self):
-        self.video_list.clear()
-        if not os.path.exists(self.filename):
-            return
+        # The index is parsed once and kept in memory, the status of every lecture
+        # is computed with a single listing of the cache directories.
+        entries = load_entry_index(self.filename)["entries"] if os.path.exists(self.filename) else []
+        self.model.set_entries(entries)
 
-        with open(self.filename, "r", encoding="utf-8") as f:
-            feed_data = json.load(f)
+        # Show the progress of downloads started before the list was (re)built
+        for entry in self.model.entries:
+            self.follow_download(entry["url"])
 
-        for entry in feed_data.get("entries", []):
-            title = entry.get("title", "Missing title")
-            date = entry.get("published_parsed")
-            date_str = f"_{date[2]}-{date[1]}-{date[0]}" if date else ""
-            key = ''.join(c for c in title if c.isupper()) + date_str
-            url = entry.get("link")
-            if not url:
-                continue
+    def apply_filter(self):
+        self.model.set_filter(self.filter_entry.text(), self.status_combo.currentData())
 
-            item = QListWidgetItem(key)
-            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable | Qt.ItemFlag.ItemIsSelectable)
-            item.setCheckState(Qt.CheckState.Unchecked)
-            item.setData(Qt.ItemDataRole.UserRole, url)
+    def follow_download(self, url, video_path=None):
+        """Start downloading url to video_path, or follow it if it's already in flight."""
+        if url in self.followed_urls:
+            return
+        manager = get_download_manager()
+        listener = self.download_signals.progress.emit
+        if video_path:
+            job_id = None
+            if manager.progress(url) is None:
+                name = os.path.splitext(os.path.basename(video_path))[0]
+                job_id = get_job_store().add(JOB_DOWNLOAD, name, url=url, video_path=video_path)
+            future = manager.submit(url, video_path, listener, job_id=job_id)
+        else:
+            future = manager.add_listener(url, listener)
+        if future is None:
+            return
+        self.followed_urls.add(url)
+        self.model.set_progress(url, "(queued)")
 
-            # Paths
-            video_path = os.path.join(VIDEO_DIR, f"{key}.mp4")
-            # Look for any transcript file matching key_model.json
-            transcript_exists = False
-            if os.path.isdir(TRANSCRIPT_DIR):
-                for fname in os.listdir(TRANSCRIPT_DIR):
-                    base, ext = os.path.splitext(fname)
-                    if ext.lower() == ".json" and base.startswith(f"{key}_"):
-                        # Check suffix matches model
-                        suffix = base[len(key) + 1:]
-                        if suffix in MODELS:
-                            transcript_exists = True
-                            break
-
-            # Color based on status
-            if os.path.exists(video_path) and transcript_exists:
-                item.setForeground(QColor("white"))
-            elif os.path.exists(video_path):
-                item.setForeground(QColor("grey"))
+        def on_done(future):
+            if future.cancelled() or isinstance(future.exception(), JobCancelled):
+                error = "cancelled"
             else:
-                item.setForeground(QColor("red"))
+                error = str(future.exception() or "")
+            self.download_signals.finished.emit(url, error)
+        future.add_done_callback(on_done)
 
-            self.video_list.addItem(item)
+    def on_download_progress(self, url, downloaded, total):
+        if total:
+            self.model.set_progress(url, f"{downloaded * 100 // total}%")
+        else:
+            self.model.set_progress(url, f"{downloaded / 1e6:.0f} MB")
+
+    def on_download_finished(self, url, error):
+        self.followed_urls.discard(url)
+        self.model.update_status(url)
+        if error == "cancelled":
+            self.model.set_progress(url, None)  # Its partial files are gone already
+        elif error:
+            print(f"Error fetching {url}: {error}")
+            self.model.set_progress(url, "(failed)")
+        else:
+            self.model.set_progress(url, None)
+
+    def show_job_menu(self, pos):
+        index = self.video_list.indexAt(pos)
+        if not index.isValid():
+            return
+        url = index.data(URL_ROLE)
+        key = index.data(KEY_ROLE)
+        menu = QMenu(self)
+        for label, action in (("Pause", "pause"), ("Resume", "resume"), ("Cancel", "cancel")):
+            menu.addAction(label, lambda action=action: self.control_job(url, key, action))
+        menu.exec(self.video_list.viewport().mapToGlobal(pos))
+
+    def control_job(self, url, key, action):
+        """Pause, resume or cancel what runs for a lecture: its download, audio only or automatic transcription."""
+        found = getattr(get_download_manager(), action)(url)
+        found = getattr(get_auto_pipeline(), action)(key) or found
+        token = _audio_only_tokens.get(url)
+        if token is not None:
+            getattr(token, action)()
+            found = True
+        if found and action == "pause":
+            self.model.set_progress(url, "(paused)")
+        elif found and action == "resume":
+            self.model.set_progress(url, "(resuming)")
 
     def uncheck_all(self):
-        for i in range(self.video_list.count()):
-            self.video_list.item(i).setCheckState(Qt.CheckState.Unchecked)
+        self.model.set_all_checked(False)
 
     def select_all(self):
-        count = self.video_list.count()
-        all_checked = all(
-            self.video_list.item(i).checkState() == Qt.CheckState.Checked
-            for i in range(count)
-        )
-        new_state = Qt.CheckState.Unchecked if all_checked else Qt.CheckState.Checked
-        for i in range(count):
-            self.video_list.item(i).setCheckState(new_state)
+        self.model.set_all_checked(not self.model.all_checked())
 
     def download_selected(self):
-        for i in range(self.video_list.count()):
-            item = self.video_list.item(i)
-            if item.checkState() == Qt.CheckState.Checked:
-                url = item.data(Qt.ItemDataRole.UserRole)
-                key = item.text()
-                video_path = os.path.join(VIDEO_DIR, f"{key}.mp4")
-                if not os.path.exists(video_path):
-                    download_video(url, video_path)
+        # Downloads are queued in the download manager, the list is updated as they progress
+        settings = load_settings()
+        audio_only = settings.get("acquisition_mode", "video") == "audio"
+        for entry in self.model.checked_entries():
+            url = entry["url"]
+            key = entry["key"]
+            video_path = os.path.join(VIDEO_DIR, f"{key}.mp4")
+            if os.path.exists(video_path):
+                continue
+            if audio_only:
+                self.start_audio_only(url, key, settings.get("preferred_model", "tiny"))
+            else:
+                self.follow_download(url, video_path)
         self.uncheck_all()
-        self.populate_list()
+
+    def start_audio_only(self, url, key, model_name):
+        """Fetch only the audio track and transcribe it in the background."""
+        if url in self.followed_urls:
+            return
+        self.followed_urls.add(url)
+        self.model.set_progress(url, "(audio only, queued)")
+        get_audio_only_pool().start(AudioOnlyTask(url, key, model_name, self.download_signals))
 
     def delete_selected(self):
-        for i in range(self.video_list.count()):
-            item = self.video_list.item(i)
-            if item.checkState() == Qt.CheckState.Checked:
-                key = item.text()
-                video_path = os.path.join(VIDEO_DIR, f"{key}.mp4")
-                # Eliminate video
-                if os.path.exists(video_path):
-                    os.remove(video_path)
-
-                # Eliminate transcript
-                for fname in os.listdir(TRANSCRIPT_DIR):
-                    base, ext = os.path.splitext(fname)
-                    if ext.lower() == ".json" and base.startswith(f"{key}_"):
-                        # Check suffix matches model
-                        suffix = base[len(key) + 1:]
-                        if suffix in MODELS:
-                            os.remove(TRANSCRIPT_DIR + key + "_" + suffix + ".json")
+        for entry in self.model.checked_entries():
+            key = entry["key"]
+            video_path = os.path.join(VIDEO_DIR, f"{key}.mp4")
+            # Eliminate video
+            if os.path.exists(video_path):
+                os.remove(video_path)
+            audio_path = get_cache_audio_path(video_path)
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
+            for analysis_path in (get_waveform_path(video_path), get_slides_path(video_path)):
+                if os.path.exists(analysis_path):
+                    os.remove(analysis_path)
+            shutil.rmtree(get_sprites_dir(video_path), ignore_errors=True)
+            proxy_path = get_proxy_path(video_path)
+            if os.path.exists(proxy_path):
+                os.remove(proxy_path)
+
+            # Eliminate transcript
+            for model in MODELS:
+                transcript_path = os.path.join(TRANSCRIPT_DIR, f"{key}_{model}.json")
+                if os.path.exists(transcript_path):
+                    os.remove(transcript_path)
         self.uncheck_all()
-        self.populate_list()
+        self.model.refresh_statuses()
 
-    def on_item_clicked(self, item: QListWidgetItem):
+    def on_item_clicked(self, index):
         """Single-click: toggle checkbox"""
-        # invert check state
-        new_state = Qt.CheckState.Unchecked if item.checkState() == Qt.CheckState.Checked else Qt.CheckState.Checked
-        item.setCheckState(new_state)
+        self.model.toggle_checked(index)
 
-    def on_item_double_clicked(self, item: QListWidgetItem):
-        """Double-click: open video if it's downloaded"""
+    def on_item_double_clicked(self, index):
+        """Double-click: open the lecture if it's downloaded, or its audio or transcript cached"""
         # Retrieve the video URL from the clicked item.
-        name_entry = item.data(Qt.ItemDataRole.UserRole + 1)
-        video_url = item.data(Qt.ItemDataRole.UserRole)
-        key = item.text()
+        video_url = index.data(URL_ROLE)
+        key = index.data(KEY_ROLE)
         video_path = os.path.join(VIDEO_DIR, f"{key}.mp4")
-        if os.path.exists(video_path):
-            self.switch_to_transcriber_callback(video_path)
+        # Lectures are mostly watched in order, have the next ones ready in the background
+        get_auto_pipeline().prefetch(self.model.entries, key)
+        cached = (os.path.exists(video_path) or os.path.exists(get_cache_audio_path(video_path))
+                  or any(os.path.exists(get_cache_path(video_path, model)) for model in MODELS))
+        if cached:
+            self.switch_to_transcriber_callback(video_path)  # Plays the cached audio if there is no video
         else :
             dialog = AddVideoDialog()
-            dialog.name_entry.setText(name_entry)
+            dialog.name_entry.setText(key)
             dialog.url_entry.setText(video_url)
             dialog.exec()
 
@@ -198,6 +366,7 @@ class AddRSSDialog(QDialog):
 
     # Save RSS    
     def on_confirm(self):
+        import feedparser  # Only needed when subscribing, keep it out of the startup
         feed = feedparser.parse(self.url_rss.text())
         
         title = feed.feed.get('title', "No channel title found")
@@ -206,6 +375,7 @@ class AddRSSDialog(QDialog):
             print("Error parsing RSS feed:", feed.bozo_exception)
             return
         set_rss_cache(feed, title)
+        self.title = title
         
         # Save feed's url for future updates
         set_rss_url_cache(self.url_rss.text(), title)
@@ -258,6 +428,12 @@ class AddVideoDialog(QDialog):
         self.transcribe_checkbox = QCheckBox("Transcribe Immediately")
         self.transcribe_checkbox.setChecked(True)
         layout.addWidget(self.transcribe_checkbox)
+
+        # Checkbox to keep only the audio track of online videos
+        self.audio_only_checkbox = QCheckBox("Audio only (don't keep the video)")
+        self.audio_only_checkbox.setChecked(load_settings().get("acquisition_mode", "video") == "audio")
+        self.audio_only_checkbox.hide()
+        layout.addWidget(self.audio_only_checkbox)
         
         # Confirm button - calls our custom on_confirm method
         self.confirm_button = QPushButton("Save Video")
@@ -284,6 +460,7 @@ class AddVideoDialog(QDialog):
         else:
             self.name_label.hide()
             self.name_entry.hide()
+        self.audio_only_checkbox.setVisible(text.startswith("http"))
     
     def get_video_data(self):
         # video_path = self.video_path_cache
@@ -319,6 +496,37 @@ class AddVideoDialog(QDialog):
         audio_path = AUDIO_DIR + "audio.wav"
         self.video_path_cache = video_path
 
+        cache_file = get_cache_path(video_path, model_name)
+        get_metrics().cache_lookup("transcript", os.path.exists(cache_file))
+        if url_or_path.startswith("http") and self.audio_only_checkbox.isChecked():
+            # Keep only the audio track in the audio cache, the transcript is named after the video
+            cached_audio_path = get_cache_audio_path(video_path)
+            if not os.path.exists(cached_audio_path):
+                print("Downloading audio...")
+                download_audio(url_or_path, cached_audio_path)
+            if transcribe == 1 and not os.path.exists(cache_file):
+                print("Transcribing audio...")
+                _ = self.transcribe_audio(cached_audio_path, video_path, model_name)
+                print("Transcription complete!")
+            return
+
+        daemon = find_daemon() if transcribe == 1 and not os.path.exists(cache_file) else None
+        if daemon:
+            # Queued in the daemon, the transcriber page waits for the same job when it opens
+            if not url_or_path.startswith("http"):
+                shutil.copyfile(url_or_path, VIDEO_DIR + video_name)
+            daemon.submit(url_or_path, model_name, video_path)
+            print("Transcription queued in the transcription daemon")
+            return
+
+        streaming = load_settings().get("streaming_pipeline", True)
+        if url_or_path.startswith("http") and transcribe == 1 and streaming and not os.path.exists(cache_file):
+            # Download, audio extraction and transcription run at the same time
+            print("Downloading and transcribing video...")
+            _ = stream_transcribe(url_or_path, video_path, model_name)
+            print("Transcription complete!")
+            return
+
         if url_or_path.startswith("http"):
             # Check if the file already exists before downloading.
             if not os.path.exists(video_path):
@@ -330,7 +538,6 @@ class AddVideoDialog(QDialog):
             # Copy local file in cache
             shutil.copyfile(url_or_path, VIDEO_DIR + video_name)
 
-        cache_file = get_cache_path(video_path, model_name)
         if transcribe == 1:
             if os.path.exists(cache_file):
                 print(f"Loading cached transcription: {cache_file}")
@@ -345,26 +552,13 @@ class AddVideoDialog(QDialog):
     
     @staticmethod
     def extract_audio(video_path, audio_path):
-        try:
-            (
-                ffmpeg
-                .input(video_path)
-                .output(audio_path, format='mp3', acodec='libmp3lame', audio_bitrate='192k')
-                .run(overwrite_output=True)
-            )
-            print(f"Audio extracted successfully: {audio_path}")
-        except ffmpeg.Error as e:
-            print(f"Error extracting audio: {e.stderr.decode()}")
+        # The shared one is timed in the pipeline metrics
+        extract_audio(video_path, audio_path)
     
     @staticmethod
     def transcribe_audio(audio_path, video_path, model_name):
-        cache_file = get_cache_path(video_path, model_name)
-        print("Running Whisper AI...")
-        model = whisper.load_model(model_name)
-        result = model.transcribe(audio_path)
-        with open(cache_file, "w") as f:
-            json.dump(result, f)
-        return result
+        # The shared one waits for memory before loading the model
+        return transcribe_audio(audio_path, video_path, model_name)
 
 # --- Lecture Selection Interface --- #
 class VideoSelectionWidget(QWidget):
@@ -373,9 +567,20 @@ class VideoSelectionWidget(QWidget):
         self.switch_to_transcriber_callback = switch_to_transcriber_callback
         self.rss_widget_open = 0
         self.rss_widget_store = ''
-        self.refresh_rss_list()
+        self.feed_items = {}  # cached feed file path -> list item
         self.init_ui()
 
+        # Show the cached feeds right away, refresh them in the background.
+        self.rss_refresher = RSSRefresher(self)
+        self.rss_refresher.feed_updated.connect(self.on_feed_updated)
+        self.rss_refresher.new_entries.connect(self.on_new_entries)
+        QTimer.singleShot(0, self.refresh_rss_list)
+
+        # New lectures are transcribed in the background when auto transcription is enabled
+        self.pipeline_signals = DownloadSignals()
+        self.pipeline_signals.finished.connect(self.on_lecture_processed)
+        get_auto_pipeline().add_listener(self.pipeline_signals.finished.emit)
+
     def init_ui(self):
         self.layout = QVBoxLayout()
         layout_horizontal = QHBoxLayout()
@@ -387,23 +592,7 @@ class VideoSelectionWidget(QWidget):
         # Loop through all cached RSS JSON files.
         for filename in os.listdir(RSS_DIR):
             if filename.endswith(".json"):
-                file_path = os.path.join(RSS_DIR, filename)
-                with open(file_path, "r", encoding="utf-8") as f:
-                    feed_data = json.load(f)
-                    # Get the list of entries
-                    feed_entries = feed_data.get('entries', [])
-                    if feed_entries:
-                        # Access the first entry and extract its title
-                        title = feed_entries[0].get('title', "Missing title")
-                    else:
-                        title = "Missing title"
-
-                    # TODO: Add number of how many videos are not cached
-
-                    
-                    item = QListWidgetItem(title)
-                    item.setData(Qt.ItemDataRole.UserRole, file_path)
-                    self.video_list.addItem(item)
+                self.set_feed_item(os.path.join(RSS_DIR, filename))
 
         self.layout.addWidget(self.video_list)
         self.video_list.itemClicked.connect(self.feed_clicked)
@@ -423,34 +612,58 @@ class VideoSelectionWidget(QWidget):
         self.layout.addLayout(layout_horizontal)
         self.setLayout(self.layout)
         self.setWindowTitle("Lecture Videos")   
+
+    def set_feed_item(self, file_path):
+        """Add the cached feed to the list, or update its item if it's already listed."""
+        try:
+            feed_entries = load_entry_index(file_path)["entries"]
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error loading feed {file_path}: {e}")
+            return
+        if feed_entries:
+            # Access the first entry and extract its title
+            title = feed_entries[0].get('title', "Missing title")
+        else:
+            title = "Missing title"
+
+        # TODO: Add number of how many videos are not cached
+
+        item = self.feed_items.get(file_path)
+        if item is None:
+            item = QListWidgetItem(title)
+            item.setData(Qt.ItemDataRole.UserRole, file_path)
+            self.video_list.addItem(item)
+            self.feed_items[file_path] = item
+        else:
+            item.setText(title)
     
     def refresh_rss_list(self):
-        if not os.path.exists(URL_DIR):
-            return
-        
-        # Use feedparser to update the rss
-        for filename in os.listdir(URL_DIR):
-            if filename.endswith(".json"):
-                file_path = os.path.join(URL_DIR, filename)
-                try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        feed_url = json.load(f)
-                    feed = feedparser.parse(feed_url)
-                    
-                except Exception as e:
-                    print(f"Error reading {file_path}: {e}")
-                    title = "Error loading feed"
-                
-                title = feed.feed.get('title', "No channel title found")
-                title = ''.join([c for c in title if c.isupper()]) # Use only upper cases
-                if feed.bozo:
-                    print("Error parsing RSS feed:", feed.bozo_exception)
-                    return
-                set_rss_cache(feed, title)
+        # Feeds are fetched concurrently, on_feed_updated is called for the ones that changed
+        with profile_phase("RSS refresh"):
+            self.rss_refresher.refresh_all()
+
+    def on_feed_updated(self, title):
+        file_path = os.path.join(RSS_DIR, title + ".json")
+        self.set_feed_item(file_path)
+        # Reload the lectures if the updated feed is the one being shown
+        if self.rss_widget_open == 1 and self.rss_widget_store.filename == file_path:
+            self.rss_widget_store.populate_list()
+
+    def on_new_entries(self, title, entries):
+        if load_settings().get("auto_transcribe", False):
+            get_auto_pipeline().enqueue(entries)
+
+    def on_lecture_processed(self, url, error):
+        if self.rss_widget_open == 1:
+            rss_widget = self.rss_widget_store
+            rss_widget.model.update_status(url)
+            if url not in rss_widget.followed_urls:
+                rss_widget.model.set_progress(url, None)  # e.g. "(paused)"
 
     def open_add_RSS_dialog(self):
         dialog = AddRSSDialog()
-        dialog.exec()
+        if dialog.exec():
+            self.on_feed_updated(dialog.title)
         
     def open_add_video_dialog(self):
         dialog = AddVideoDialog()
@@ -458,15 +671,17 @@ class VideoSelectionWidget(QWidget):
             video_path, transcribe_now, _ = dialog.get_video_data()
             if video_path:
                 self.video_list.addItem(video_path)  # Add to the list
-                if transcribe_now:
+                if transcribe_now and dialog.audio_only_checkbox.isChecked():
+                    # Only the audio was kept, the transcriber plays it from the cache
+                    self.switch_to_transcriber_callback(dialog.video_path_cache)
+                elif transcribe_now:
                     self.switch_to_transcriber_callback(video_path)
 
     def feed_clicked(self, item):
         """When a feed is clicked, load its lessons and display them below."""
         file_path = item.data(Qt.ItemDataRole.UserRole)
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                feed_data = json.load(f)
+            load_entry_index(file_path)
         except Exception as e:
             print(f"Error loading feed {file_path}: {e}")
             return
@@ -1 +1,6 @@
-from .video_transcriber import *
\ No newline at end of file
+from .video_transcriber import *
+from .streaming_pipeline import *
+from .auto_pipeline import *
+from .model_cache import *
+from .model_preloader import *
+from .proxy import *
\ No newline at end of file
@@ -0,0 +1,257 @@
+import os, time, datetime, threading
+
+from collections import deque
+from concurrent.futures import CancelledError
+
+from cache_handler import *
+from video_downloader import get_download_manager, download_audio
+from settings_window.settings_IO import load_settings
+from job_scheduler import get_priority_scheduler, PRIORITY_USER, PRIORITY_BACKGROUND
+from job_scheduler.cancellation import CancellationToken, JobCancelled
+from job_scheduler.job_store import *
+from video_visualizer.sprites import get_sprite_sheets
+from pipeline_metrics import get_metrics
+
+from .video_transcriber import extract_audio, transcribe_audio
+from .proxy import make_proxy
+
+DEFAULT_AUTO_WORKERS = 1
+DEFAULT_PREFETCH_COUNT = 2  # Lectures following the one opened that are prepared in advance
+QUIET_HOURS_POLL = 60  # Seconds between two checks of the quiet hours
+
+def in_quiet_hours(settings, now=None):
+    """
+    True if now falls in the quiet hours of the settings, [quiet_hours_start, quiet_hours_end)
+    in hours of the day. The range may wrap around midnight, equal bounds disable it.
+    """
+    start = settings.get("quiet_hours_start", 0)
+    end = settings.get("quiet_hours_end", 0)
+    if start == end:
+        return False
+    hour = (now or datetime.datetime.now()).hour
+    if start < end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+class AutoPipeline:
+    """
+    Downloads and transcribes new lectures of the subscribed feeds in the background,
+    with the preferred model, so their transcripts are cached before anyone opens them.
+
+    Only the entries handed to enqueue() are processed, the feed refresh passes the ones
+    that weren't in the stored index. Lectures are processed by at most max_workers threads,
+    as background jobs of the priority scheduler, and none is started during the quiet hours.
+    Listeners are called as listener(url, error) from the worker threads once a lecture is
+    done, error is "" on success. Lectures can be paused, resumed and cancelled by key.
+    Each lecture is recorded in the job store, and resumed by the next launch if it wasn't done.
+
+    The lectures following the one opened are prefetched the same way, see prefetch(), as long
+    as the cache budget leaves room for them.
+    """
+    def __init__(self, max_workers=DEFAULT_AUTO_WORKERS):
+        self.max_workers = max_workers
+        self.pending = deque()
+        self.queued = set()  # keys queued or in progress
+        self.tokens = {}  # key -> CancellationToken of the lectures in progress
+        self.listeners = []
+        self.active = 0
+        self.lock = threading.Lock()
+
+    def configure(self, max_workers):
+        with self.lock:
+            self.max_workers = max(1, max_workers)
+            self._dispatch()
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def enqueue(self, entries, prefetch=False):
+        """
+        Queue feed index entries, the ones already transcribed or queued are skipped.
+        Entries resumed from the job store carry the id of their job as "job_id".
+        """
+        model_name = load_settings().get("preferred_model", "tiny")
+        store = get_job_store()
+        with self.lock:
+            for entry in entries:
+                key = entry["key"]
+                video_path = os.path.join(VIDEO_DIR, f"{key}.mp4")
+                if not entry.get("url") or key in self.queued:
+                    continue
+                if os.path.exists(get_cache_path(video_path, model_name)):
+                    store.finish(entry.get("job_id"))  # Done meanwhile
+                    continue
+                entry_prefetch = entry.get("prefetch", prefetch)
+                job_id = entry.get("job_id") or store.add(JOB_LECTURE, key, key=key, url=entry["url"],
+                                                          prefetch=entry_prefetch)
+                self.queued.add(key)
+                self.pending.append({"key": key, "url": entry["url"], "job_id": job_id, "prefetch": entry_prefetch,
+                                     "queued": time.monotonic()})
+                print(f"Queued {key} for {'prefetch' if entry_prefetch else 'automatic transcription'}")
+            self._dispatch()
+
+    def prefetch(self, entries, key, count=None):
+        """
+        Queue the count lectures following key in chronological order, entries being the index
+        of its feed, unless the cache budget is already reached. Each one is checked against
+        the budget again, with the mean size of the cached videos, before it is started.
+        """
+        settings = load_settings()
+        count = settings.get("prefetch_count", DEFAULT_PREFETCH_COUNT) if count is None else count
+        ordered = sorted(entries, key=lambda e: e["date"] or [0, 0, 0])
+        keys = [e["key"] for e in ordered]
+        if count <= 0 or key not in keys:
+            return
+        if not fits_cache_budget(settings.get("cache_budget", DEFAULT_CACHE_BUDGET), estimate_lecture_size()):
+            print("Cache budget reached, nothing prefetched")
+            return
+        position = keys.index(key)
+        self.enqueue(ordered[position + 1:position + 1 + count], prefetch=True)
+
+    def cancel(self, key):
+        """Drop a queued lecture or stop one in progress, returns False if it isn't there."""
+        with self.lock:
+            for entry in self.pending:
+                if entry["key"] == key:
+                    self.pending.remove(entry)
+                    self.queued.discard(key)
+                    get_job_store().finish(entry["job_id"], STATE_CANCELLED)
+                    return True
+            token = self.tokens.get(key)
+        if token is not None:
+            token.cancel()
+        return token is not None
+
+    def pause(self, key):
+        with self.lock:
+            token = self.tokens.get(key)
+        if token is not None:
+            token.pause()
+        return token is not None
+
+    def resume(self, key):
+        with self.lock:
+            token = self.tokens.get(key)
+        if token is not None:
+            token.resume()
+        return token is not None
+
+    def _dispatch(self):
+        # Called with the lock held
+        while self.pending and self.active < self.max_workers:
+            entry = self.pending.popleft()
+            self.active += 1
+            self.tokens[entry["key"]] = CancellationToken()
+            threading.Thread(target=self._run, args=(entry, self.tokens[entry["key"]]), daemon=True).start()
+
+    def _run(self, entry, token):
+        error = ""
+        store = get_job_store()
+        store.start(entry["job_id"])
+        get_metrics().queue_wait("lectures", time.monotonic() - entry["queued"])
+        try:
+            settings = load_settings()
+            while in_quiet_hours(settings):
+                token.sleep(QUIET_HOURS_POLL)
+                settings = load_settings()
+            if entry["prefetch"] and not fits_cache_budget(settings.get("cache_budget", DEFAULT_CACHE_BUDGET),
+                                                           estimate_lecture_size()):
+                error = "cache budget reached"
+                print(f"Not prefetching {entry['key']}, the cache budget is reached")
+                store.finish(entry["job_id"], STATE_CANCELLED, error)
+            else:
+                # A thread per lecture, its lowered priority goes away with it
+                with get_priority_scheduler().job(PRIORITY_BACKGROUND):
+                    process_lecture(entry["url"], entry["key"], settings.get("preferred_model", "tiny"),
+                                    settings.get("acquisition_mode", "video") == "audio", PRIORITY_BACKGROUND,
+                                    token, entry["job_id"])
+                store.finish(entry["job_id"])
+        except JobCancelled:
+            error = "cancelled"
+            print(f"Cancelled {entry['key']}")
+            store.finish(entry["job_id"], STATE_CANCELLED)
+        except Exception as e:
+            error = str(e)
+            print(f"Error processing {entry['key']}: {e}")
+            store.finish(entry["job_id"], STATE_FAILED, error)
+        finally:
+            with self.lock:
+                self.active -= 1
+                self.queued.discard(entry["key"])
+                self.tokens.pop(entry["key"], None)
+                self._dispatch()
+        for listener in list(self.listeners):
+            listener(entry["url"], error)
+
+def process_lecture(url, key, model_name, audio_only=False, priority=PRIORITY_USER, token=None, job_id=None):
+    """
+    Download a lecture of a feed into the cache and transcribe it with model_name, videos
+    get the sprite sheets of their scrub previews too, and their playback proxy if enabled.
+    Background lectures wait between the steps while a video is playing. Every step follows
+    token, a cancelled lecture leaves no partial file behind. The steps are recorded as the
+    stages of job_id in the job store, the ones already done are skipped when it is resumed.
+    """
+    checkpoint = lambda: get_priority_scheduler().checkpoint(priority, token)
+    stage = lambda name: get_job_store().stage(job_id, name)
+    video_path = os.path.join(VIDEO_DIR, f"{key}.mp4")  # Transcripts are named after the video
+    metrics = get_metrics()
+    if metrics.cache_lookup("transcript", os.path.exists(get_cache_path(video_path, model_name))):
+        return
+    audio_path = get_cache_audio_path(video_path)
+    if audio_only:
+        if not metrics.cache_lookup("audio", os.path.exists(audio_path)):
+            with stage("download"):
+                download_audio(url, audio_path, token)
+        checkpoint()
+        with stage("transcribe"):
+            transcribe_audio(audio_path, video_path, model_name, token)
+        return
+
+    if not metrics.cache_lookup("video", os.path.exists(video_path)):
+        # Shared with the downloads started from the feed list
+        try:
+            with stage("download"):
+                get_download_manager().submit(url, video_path, token=token).result()
+        except CancelledError:
+            raise JobCancelled("Cancelled") from None  # While still queued
+    checkpoint()
+    try:
+        # Scrub previews of the position slider, keyframes only so it takes seconds
+        with stage("previews"):
+            get_sprite_sheets(video_path, token)
+    except RuntimeError as e:
+        print(f"No previews for {key}: {e}")  # Not worth failing the lecture
+    if load_settings().get("proxy_playback", False):
+        checkpoint()
+        try:
+            with stage("proxy"):
+                make_proxy(video_path, token)
+        except RuntimeError as e:
+            print(f"No playback proxy for {key}: {e}")  # The original plays instead
+    checkpoint()
+    audio_path = os.path.splitext(audio_path)[0] + ".mp3"
+    with stage("extract"):
+        extract_audio(video_path, audio_path, token)
+    if not os.path.exists(audio_path):
+        raise RuntimeError(f"Error extracting audio of {video_path}")
+    try:
+        checkpoint()
+        with stage("transcribe"):
+            transcribe_audio(audio_path, video_path, model_name, token)
+    finally:
+        os.remove(audio_path)
+
+_auto_pipeline = None
+_auto_pipeline_lock = threading.Lock()
+
+def get_auto_pipeline():
+    """Auto pipeline shared by the whole application, configured from the settings."""
+    global _auto_pipeline
+    with _auto_pipeline_lock:
+        if _auto_pipeline is None:
+            _auto_pipeline = AutoPipeline(load_settings().get("auto_transcribe_workers", DEFAULT_AUTO_WORKERS))
+        return _auto_pipeline
+
+def apply_auto_pipeline_settings(settings):
+    if _auto_pipeline is not None:
+        _auto_pipeline.configure(settings.get("auto_transcribe_workers", DEFAULT_AUTO_WORKERS))
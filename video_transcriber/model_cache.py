@@ -0,0 +1,94 @@
+import os, threading
+
+from contextlib import contextmanager
+
+from job_scheduler.memory_scheduler import get_memory_scheduler
+from job_scheduler.cancellation import make_cancellable, check_token
+from pipeline_metrics import get_metrics
+
+# Whisper pulls in torch, numba and tiktoken, it is only imported by the first transcription
+_models = {}  # model name -> loaded Whisper model
+_model_locks = {}
+_transcribe_locks = {}  # model name -> lock held while the model transcribes
+_users = {}  # model name -> transcriptions holding the model
+_release_when_idle = set()  # names of the models released while in use
+_lock = threading.Lock()
+TRANSCRIBE_LOCK_POLL = 0.5  # Seconds between two looks at the token while waiting for the model
+
+def _model_lock(model_name):
+    with _lock:
+        return _model_locks.setdefault(model_name, threading.Lock())
+
+def get_model(model_name):
+    """Whisper model model_name, loaded on first use and kept for the next transcriptions."""
+    # One lock per model, two transcriptions asking for it at once load it once
+    with _model_lock(model_name):
+        model = _models.get(model_name)
+        with _lock:
+            _release_when_idle.discard(model_name)  # Wanted again
+        if not get_metrics().cache_lookup("model", model is not None):
+            with get_metrics().stage("model_load", job=model_name, model=model_name):
+                import whisper
+                print(f"Loading Whisper model {model_name}...")
+                # Checks the cancellation token of the transcribing thread between windows
+                model = make_cancellable(whisper.load_model(model_name))
+            _models[model_name] = model
+            get_memory_scheduler().set_resident(model_name, True)
+        return model
+
+@contextmanager
+def using_model(model_name):
+    """
+    get_model() for a transcription, the model stays cached until it's done even if
+    release_model() is called meanwhile.
+    """
+    with _lock:
+        _users[model_name] = _users.get(model_name, 0) + 1
+    try:
+        yield get_model(model_name)
+    finally:
+        with _lock:
+            _users[model_name] -= 1
+            idle = not _users[model_name]
+            if idle:
+                del _users[model_name]
+            release = idle and model_name in _release_when_idle
+        if release:
+            release_model(model_name)
+
+@contextmanager
+def transcribing(model_name, token=None):
+    """
+    Hold the shared model model_name for a call to transcribe(). Whisper keeps the state of a
+    decoding on the model itself (the kv cache hooks of its decoder), two transcriptions on the
+    same instance at once would corrupt each other. token is checked while waiting for it.
+    """
+    with _lock:
+        lock = _transcribe_locks.setdefault(model_name, threading.Lock())
+    while not lock.acquire(timeout=TRANSCRIBE_LOCK_POLL):
+        check_token(token)
+    try:
+        yield
+    finally:
+        lock.release()
+
+def is_model_loaded(model_name):
+    return model_name in _models
+
+def release_model(model_name):
+    """Forget a loaded model, once no transcription uses it anymore, which frees its memory."""
+    with _lock:
+        if _users.get(model_name):
+            _release_when_idle.add(model_name)  # Released by the last one, see using_model()
+            return
+        _release_when_idle.discard(model_name)
+    with _model_lock(model_name):
+        if _models.pop(model_name, None) is not None:
+            get_memory_scheduler().set_resident(model_name, False)
+
+def has_memory_for(model_name):
+    """
+    True if model_name is loaded already or the memory scheduler would admit it now: within
+    the budget next to the reservations and the loaded models, and in the free memory.
+    """
+    return is_model_loaded(model_name) or get_memory_scheduler().can_load(model_name)
@@ -0,0 +1,66 @@
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from job_scheduler import get_priority_scheduler, PRIORITY_BACKGROUND
+
+from .model_cache import get_model, is_model_loaded, has_memory_for, release_model
+
+PRELOAD_DELAY = 2000  # ms after the window is shown, so the preload doesn't slow its first paint
+
+class PreloadSignals(QObject):
+    status = pyqtSignal(str, str)  # model name, status text
+
+class PreloadTask(QRunnable):
+    def __init__(self, model_name, signals):
+        super().__init__()
+        self.model_name = model_name
+        self.signals = signals
+
+    def run(self):
+        # Checked again here, memory may have been taken while the task was waiting
+        if not has_memory_for(self.model_name):
+            self.signals.status.emit(self.model_name, "not preloaded, low memory")
+            return
+        try:
+            # A background job, torch gets half of the cores while a video plays
+            with get_priority_scheduler().job(PRIORITY_BACKGROUND):
+                get_model(self.model_name)
+            self.signals.status.emit(self.model_name, "ready")
+        except Exception as e:
+            print(f"Error preloading model {self.model_name}: {e}")
+            self.signals.status.emit(self.model_name, "failed to load")
+
+class ModelPreloader(QObject):
+    """
+    Loads the preferred Whisper model as a background job, so the first transcription only
+    waits for the decoding. The model isn't loaded when the memory scheduler wouldn't admit
+    it, see has_memory_for(). status_changed(text) reports the state of the preferred model.
+    """
+    status_changed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.model_name = None
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = PreloadSignals()
+        self.signals.status.connect(self.on_status)
+
+    def preload(self, model_name):
+        previous = self.model_name
+        self.model_name = model_name
+        if previous and previous != model_name:
+            release_model(previous)  # Kept until the transcriptions using it are done
+        if is_model_loaded(model_name):
+            self.status_changed.emit(f"Model {model_name}: ready")
+            return
+        if not has_memory_for(model_name):
+            self.status_changed.emit(f"Model {model_name}: not preloaded, low memory")
+            return
+        self.status_changed.emit(f"Model {model_name}: loading...")
+        self.pool.start(PreloadTask(model_name, self.signals))
+
+    def on_status(self, model_name, text):
+        if model_name == self.model_name:
+            self.status_changed.emit(f"Model {model_name}: {text}")
+        else:
+            release_model(model_name)  # Replaced in the settings while it was loading
@@ -0,0 +1,57 @@
+import os, ffmpeg
+
+from pathlib import Path
+
+from cache_handler import *
+from job_scheduler.cancellation import JobCancelled, wait_process
+
+PROXY_HEIGHT = 360
+PROXY_CRF = 28  # x264 quality, slides stay readable at 360p
+PROXY_KEYFRAME_INTERVAL = 1  # Seconds, any seek lands close to a keyframe
+
+def get_proxy_path(video_path):
+    """Proxies are named after the video, like the transcripts."""
+    return os.path.join(PROXY_DIR, f"{Path(video_path).stem}.mp4")
+
+def find_proxy(video_path):
+    """Proxy of video_path, None if there is none or it is older than the video."""
+    proxy_path = get_proxy_path(video_path)
+    try:
+        if os.path.getmtime(proxy_path) >= os.path.getmtime(video_path):
+            return proxy_path
+    except OSError:
+        pass
+    return None
+
+def make_proxy(video_path, token=None):
+    """
+    Transcode video_path into a lightweight copy for playback: 360p with a keyframe every
+    second, cheap to decode and to seek in, also at 2x. Returns the proxy path.
+    """
+    proxy_path = find_proxy(video_path)
+    if proxy_path:
+        return proxy_path
+    os.makedirs(PROXY_DIR, exist_ok=True)
+    proxy_path = get_proxy_path(video_path)
+    tmp_path = f"{proxy_path}.tmp.mp4"
+    print(f"Making the playback proxy of {video_path}")
+    process = (
+        ffmpeg
+        .input(video_path)
+        .output(tmp_path, vf=f"scale=-2:{PROXY_HEIGHT}", vcodec="libx264", preset="veryfast", crf=PROXY_CRF,
+                force_key_frames=f"expr:gte(t,n_forced*{PROXY_KEYFRAME_INTERVAL})", acodec="aac",
+                audio_bitrate="96k", movflags="+faststart")
+        .run_async(pipe_stderr=True, overwrite_output=True)
+    )
+    try:
+        _, stderr = wait_process(process, token)
+    except JobCancelled:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)  # Partial
+        raise
+    if process.returncode != 0:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise RuntimeError(f"Error making the proxy of {video_path}: {stderr.decode(errors='replace')}")
+    os.replace(tmp_path, proxy_path)
+    return proxy_path
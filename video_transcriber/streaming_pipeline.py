@@ -0,0 +1,227 @@
+import os, json, subprocess, threading
+
+from contextlib import nullcontext
+
+from cache_handler import *
+from video_downloader import download_video, get_download_manager
+
+from job_scheduler import get_memory_scheduler
+from job_scheduler.cancellation import JobCancelled, cancellation_scope
+from job_scheduler.priority_scheduler import lower_child_priority
+from pipeline_metrics import get_metrics
+
+from .model_cache import release_model, transcribing, using_model
+
+SAMPLE_RATE = 16000  # whisper.audio.SAMPLE_RATE, Whisper itself is only imported when transcribing
+WINDOW_SECONDS = 30  # Audio handed to Whisper at a time, its native context length
+FEED_CHUNK_SIZE = 1024 * 1024
+PROMPT_LENGTH = 200  # Characters of the previous windows given as context to the next one
+
+class GrowingFile:
+    """
+    A file being downloaded sequentially, readable up to the bytes written so far.
+    The download reports its progress with update() and finish().
+    """
+    def __init__(self, part_path, final_path):
+        self.part_path = part_path
+        self.final_path = final_path
+        self.available = 0
+        self.done = False
+        self.condition = threading.Condition()
+
+    def update(self, downloaded, total):
+        with self.condition:
+            self.available = downloaded
+            self.condition.notify_all()
+
+    def finish(self):
+        with self.condition:
+            self.done = True
+            self.condition.notify_all()
+
+    def read_at(self, position, size):
+        # The .part file is renamed once complete, reopen it for every chunk
+        path = self.part_path if os.path.exists(self.part_path) else self.final_path
+        with open(path, "rb") as f:
+            f.seek(position)
+            return f.read(size)
+
+    def feed(self, pipe):
+        """Copy the file into pipe as it grows, close it when the download is over."""
+        position = 0
+        try:
+            while True:
+                with self.condition:
+                    while self.available <= position and not self.done:
+                        self.condition.wait()
+                    if self.available <= position:
+                        return
+                    size = min(self.available - position, FEED_CHUNK_SIZE)
+                pipe.write(self.read_at(position, size))
+                position += size
+        except (BrokenPipeError, OSError):
+            pass  # ffmpeg stopped reading, its exit status tells why
+        finally:
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+def _ffmpeg_decode_command(source):
+    """ffmpeg command decoding the audio of source ("-" for stdin) to 16 kHz mono PCM on stdout."""
+    command = ["ffmpeg", "-loglevel", "error"]
+    if source != "-":
+        command.append("-nostdin")
+    if source.startswith("http"):
+        command += ["-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5"]
+    return command + ["-i", source, "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "-"]
+
+def read_audio_windows(stdout, window_seconds=WINDOW_SECONDS):
+    """Yield float32 windows of window_seconds of audio from a PCM stream as they are decoded."""
+    import numpy as np
+    window_bytes = window_seconds * SAMPLE_RATE * 2
+    while True:
+        data = stdout.read(window_bytes)
+        if not data:
+            return
+        data = data[:len(data) - len(data) % 2]
+        yield np.frombuffer(data, np.int16).astype(np.float32) / 32768.0
+
+def transcribe_windows(model, windows, model_name=None, token=None):
+    """
+    Transcribe an iterator of audio windows, as they arrive, into a Whisper-like result.
+
+    The last segment of each window may be cut by the window boundary, so its audio is
+    carried over and transcribed again at the start of the next window. The shared model
+    model_name is only held while a window is transcribed, not while waiting for the next.
+    """
+    import numpy as np
+    segments = []
+    language = None
+    offset = 0.0  # Start of the pending audio in the whole recording, in seconds
+    pending = np.zeros(0, np.float32)
+
+    def transcribe_pending(final):
+        nonlocal language, offset, pending
+        prompt = "".join(s["text"] for s in segments)[-PROMPT_LENGTH:] or None
+        with transcribing(model_name, token) if model_name else nullcontext():
+            result = model.transcribe(pending, language=language, initial_prompt=prompt)
+        language = language or result.get("language")
+        window_segments = result["segments"]
+        if not final and len(window_segments) > 1:
+            last = window_segments.pop()
+            keep_from = int(last["start"] * SAMPLE_RATE)
+        else:
+            keep_from = len(pending)
+        for segment in window_segments:
+            segment = dict(segment, id=len(segments))
+            segment["start"] += offset
+            segment["end"] += offset
+            segments.append(segment)
+        pending = pending[keep_from:]
+        offset += keep_from / SAMPLE_RATE
+
+    for window in windows:
+        pending = np.concatenate([pending, window])
+        transcribe_pending(final=False)
+    if len(pending):
+        transcribe_pending(final=True)
+
+    return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": language}
+
+def stream_transcribe(url, video_path, model_name, window_seconds=WINDOW_SECONDS, token=None):
+    """
+    Download url to video_path, decode its audio and transcribe it at the same time.
+
+    ffmpeg reads the download as it grows, and the transcriber gets a window of audio as soon
+    as it is decoded, so the total time is close to the slowest stage instead of the sum.
+    When the container can't be decoded progressively (index at the end of the file) or the
+    download resumes a segmented .part file, ffmpeg reads the audio from the URL instead.
+    The transcript is saved in the cache like transcribe_audio does.
+
+    Cancelling token stops the download, ffmpeg and Whisper. Pausing it pauses Whisper,
+    the download then ffmpeg wait for it as soon as the pipes are full.
+    """
+    downloading = not os.path.exists(video_path)
+    errors = []
+    growing = GrowingFile(video_path + ".part", video_path)
+
+    def download():
+        try:
+            # A single connection, so the file grows from the start
+            download_video(url, video_path, connections=1, progress_callback=growing.update,
+                           rate_limiter=get_download_manager().rate_limiter, token=token)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            growing.finish()
+
+    if downloading:
+        segmented_part = os.path.exists(video_path + ".part.json")
+        download_thread = threading.Thread(target=download, daemon=True)
+        download_thread.start()
+        source = url if segmented_part else "-"
+    else:
+        source = video_path
+
+    def run(model, source):
+        process = subprocess.Popen(_ffmpeg_decode_command(source), stdin=subprocess.PIPE if source == "-" else None,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        lower_child_priority(process)
+        if token is not None:
+            token.on_cancel(process.kill)
+        if source == "-":
+            threading.Thread(target=growing.feed, args=(process.stdin,), daemon=True).start()
+        # Collect stderr in the background, a full pipe would block ffmpeg
+        stderr = []
+        stderr_thread = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+        stderr_thread.start()
+        decoded = []
+        def windows():
+            for window in read_audio_windows(process.stdout, window_seconds):
+                decoded.append(len(window))
+                print(f"Transcribing audio from {sum(decoded) / SAMPLE_RATE:.0f}s...")
+                yield window
+        with get_metrics().stage("transcribe", job=os.path.basename(video_path), model=model_name) as record:
+            try:
+                result = transcribe_windows(model, windows(), model_name, token)
+            except JobCancelled:
+                process.kill()
+                process.wait()
+                raise
+            finally:
+                record["audio_seconds"] = sum(decoded) / SAMPLE_RATE
+        process.wait()
+        stderr_thread.join()
+        return result, process.returncode, b"".join(stderr).decode(errors="replace"), sum(decoded)
+
+    # Waits until there is memory for the model, which may be downgraded if allowed
+    try:
+        # Loading the model overlaps with the beginning of the download
+        with get_memory_scheduler().reserve(model_name, token=token) as model_name, \
+                using_model(model_name) as model, cancellation_scope(token):
+            print("Streaming audio to Whisper...")
+            result, returncode, stderr, decoded = run(model, source)
+            if source == "-" and decoded == 0:
+                # Typically an MP4 with its index at the end, which can't be read from a pipe
+                print(f"Can't decode the download progressively: {stderr.strip()}")
+                completed = growing.done and not errors and os.path.exists(video_path)
+                result, returncode, stderr, decoded = run(model, video_path if completed else url)
+    except JobCancelled:
+        if downloading:
+            token.cancel()  # Cancelled while waiting for memory, stop the download too
+            download_thread.join()  # It removes its partial file
+        release_model(model_name)
+        raise
+
+    if downloading:
+        download_thread.join()
+        if errors:
+            raise errors[0]
+    if returncode != 0 or decoded == 0:
+        raise RuntimeError(f"Error decoding audio: {stderr}")
+
+    # Save the result in cache
+    with open(get_cache_path(video_path, model_name), "w") as f:
+        json.dump(result, f)
+    return result
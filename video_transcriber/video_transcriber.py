@@ -1,34 +1,65 @@
-import os, whisper, ffmpeg, json
+import os, ffmpeg, json
 
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QTextEdit, QComboBox, 
-                             QFileDialog, QHBoxLayout, QSlider)
+                             QFileDialog, QHBoxLayout, QCheckBox)
 from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
 from PyQt6.QtMultimediaWidgets import QVideoWidget
-from PyQt6.QtCore import QUrl, Qt, QTimer
+from PyQt6.QtCore import QUrl, Qt, QTimer, QObject, QRunnable, QThreadPool, pyqtSignal
 
 from cache_handler import *
 from video_downloader import *
 from settings_window import *
-
-def extract_audio(video_path, audio_path):
-    try:
-        (
+from transcription_daemon.client import find_daemon, DaemonError
+from video_visualizer import (WaveformTimeline, TimelineSlider, AnalysisSignals, start_background_analysis,
+                              get_slide_index, get_sprite_sheets)
+
+from .streaming_pipeline import stream_transcribe
+from .model_cache import release_model, transcribing, using_model
+from .proxy import find_proxy, make_proxy
+from job_scheduler import get_memory_scheduler, get_priority_scheduler, PRIORITY_USER
+from job_scheduler.cancellation import *
+from job_scheduler.job_store import *
+from pipeline_metrics import get_metrics, file_size
+
+def extract_audio(video_path, audio_path, token=None):
+    with get_metrics().stage("extract", job=os.path.basename(video_path)) as record:
+        process = (
             ffmpeg
             .input(video_path)
             .output(audio_path, format='mp3', acodec='libmp3lame', audio_bitrate='192k')
-            .run(overwrite_output=True)
+            .run_async(pipe_stderr=True, overwrite_output=True)
         )
-        print(f"Audio extracted successfully: {audio_path}")
-    except ffmpeg.Error as e:
-        print(f"Error: {e.stderr.decode()}")
+        try:
+            _, stderr = wait_process(process, token)
+        except JobCancelled:
+            if os.path.exists(audio_path):
+                os.remove(audio_path)  # Partial
+            raise
+        if process.returncode == 0:
+            record["bytes"] = file_size(audio_path)
+            print(f"Audio extracted successfully: {audio_path}")
+        else:
+            record["outcome"] = "failed"
+            print(f"Error: {stderr.decode()}")
 
-def transcribe_audio(audio_path, video_path,model_name):
+def transcribe_audio(audio_path, video_path,model_name, token=None):
     """Check cache before running Whisper AI and save transcription if not cached."""
+    # Waits until there is memory for the model, which may be downgraded if allowed
+    with get_memory_scheduler().reserve(model_name, token=token) as model_name, using_model(model_name) as model:
+        print("Running Whisper AI...")
+        try:
+            # Whisper checks the token before each 30 second window
+            with transcribing(model_name, token), \
+                    get_metrics().stage("transcribe", job=os.path.basename(video_path), model=model_name) as record:
+                with cancellation_scope(token):
+                    result = model.transcribe(audio_path)
+                # For the real time factor, the end of the speech when the duration is unknown
+                segments = result.get("segments") or [{"end": 0}]
+                record["audio_seconds"] = get_video_duration(audio_path) or segments[-1]["end"]
+        except JobCancelled:
+            release_model(model_name)  # Often a model picked by mistake, give its memory back
+            raise
     cache_file = get_cache_path(video_path, model_name)
-    
-    print("Running Whisper AI...")
-    model = whisper.load_model(model_name)
-    result = model.transcribe(audio_path)
 
     # Save the result in cache
     with open(cache_file, "w") as f:
@@ -36,14 +67,127 @@ def transcribe_audio(audio_path, video_path,model_name):
 
     return result
 
+def load_transcript(url_or_path, model_name, on_status, token=None, job_id=None):
+    """
+    Transcript of a video, from the cache or transcribed now, returns (transcript, video path).
+    on_status(text) tells what is going on, token pauses and cancels every step, and the
+    steps are recorded as stages of job_id in the job store.
+    """
+    stage = lambda name: get_job_store().stage(job_id, name)
+    video_path = "downloaded_video.mp4" if url_or_path.startswith("http") else url_or_path
+    audio_path = "audio.wav" # TODO: make this different
+    
+    # Check for cache
+    cache_file = get_cache_path(video_path, model_name)
+    print(cache_file)
+    cached = get_metrics().cache_lookup("transcript", os.path.exists(cache_file))
+    streaming = load_settings().get("streaming_pipeline", True)
+
+    daemon = find_daemon() if not cached else None
+    if daemon:
+        # The daemon downloads and transcribes with its shared model, into the same cache
+        on_status("Transcribing in the transcription daemon...")
+        job = daemon.submit(url_or_path, model_name, video_path)
+        if token is not None:
+            token.on_cancel(lambda: daemon.cancel(job["id"]))
+        try:
+            with stage("daemon"):
+                transcript = daemon.wait(job["id"])
+        except DaemonError:
+            check_token(token)  # Cancelled from here rather than failed
+            raise
+    elif url_or_path.startswith("http") and streaming and not cached:
+        # Download, audio extraction and transcription run at the same time
+        on_status("Downloading and transcribing video...")
+        with stage("stream"):
+            transcript = stream_transcribe(url_or_path, video_path, model_name, token=token)
+    else:
+        if url_or_path.startswith("http"):
+            on_status("Downloading video...")
+            with stage("download"):
+                download_video(url_or_path, video_path, token=token) # TODO: change with cached path
+
+        if os.path.exists(cache_file):
+            print(f"Loading cached transcription: {cache_file}")
+            with open(cache_file, "r") as f:
+                transcript = json.load(f)  # Load cached transcription
+        else : # If not cached, extract audio and transcribe
+            if not os.path.exists(video_path) and os.path.exists(get_cache_audio_path(video_path)):
+                audio_path = get_cache_audio_path(video_path)  # Acquired audio only
+            else:
+                on_status("Extracting audio...")
+                with stage("extract"):
+                    extract_audio(video_path, audio_path, token)
+
+            on_status("Transcribing audio...")
+            with stage("transcribe"):
+                transcript = transcribe_audio(audio_path, video_path, model_name, token)
+    return transcript, video_path
+
+class TranscriptionSignals(QObject):
+    status = pyqtSignal(str)
+    finished = pyqtSignal(object, str)  # transcript, video path
+    failed = pyqtSignal(str)  # message
+
+class TranscriptionTask(QRunnable):
+    """
+    Runs load_transcript() for the transcriber page, as a job of the user class. It is
+    recorded in the job store, but not resumed at the next launch: nobody waits for it then.
+    """
+    def __init__(self, url_or_path, model_name, signals, token):
+        super().__init__()
+        self.url_or_path = url_or_path
+        self.model_name = model_name
+        self.signals = signals
+        self.token = token
+
+    def run(self):
+        store = get_job_store()
+        job_id = store.add(JOB_TRANSCRIPTION, os.path.basename(self.url_or_path), source=self.url_or_path,
+                           model=self.model_name)
+        store.start(job_id)
+        try:
+            # Background jobs pause while the video plays
+            with get_priority_scheduler().job(PRIORITY_USER):
+                transcript, video_path = load_transcript(self.url_or_path, self.model_name,
+                                                         self.signals.status.emit, self.token, job_id)
+            if store.get(job_id)["timings"]:
+                store.finish(job_id)
+            else:
+                store.discard(job_id)  # Loaded from the cache, not worth a line in the history
+            self.signals.finished.emit(transcript, video_path)
+        except JobCancelled:
+            store.finish(job_id, STATE_CANCELLED)
+            self.signals.failed.emit("Transcription cancelled.")
+        except Exception as e:
+            store.finish(job_id, STATE_FAILED, str(e))
+            self.signals.failed.emit(f"Error: {str(e)}")
+
 class VideoTranscriber(QWidget):
     def __init__(self, video_identifier, switch_back_callback):
         super().__init__()
 
         self.switch_back_callback = switch_back_callback
         self.video_identifier = video_identifier  # Could be a URL, file path, or lecture title
+        self.token = None  # CancellationToken of the transcription in progress
+        self.video_path = None  # Of the lecture playing
+        self.pending_position = None  # Restored once a new source is loaded
+        self.slides = None  # SlideIndex of the lecture playing, once analysed
         
         self.init_ui()
+        self.slide_signals = AnalysisSignals()
+        self.slide_signals.ready.connect(self.on_slides_ready)
+        self.slide_signals.failed.connect(lambda path, message: print(f"No slides for {path}: {message}"))
+        self.sprite_signals = AnalysisSignals()
+        self.sprite_signals.ready.connect(self.on_sprites_ready)
+        self.sprite_signals.failed.connect(lambda path, message: print(f"No previews for {path}: {message}"))
+        self.proxy_signals = AnalysisSignals()
+        self.proxy_signals.ready.connect(self.on_proxy_ready)
+        self.proxy_signals.failed.connect(lambda path, message: print(f"No playback proxy for {path}: {message}"))
+        self.signals = TranscriptionSignals()
+        self.signals.status.connect(self.output_text.setText)
+        self.signals.finished.connect(self.on_transcription_finished)
+        self.signals.failed.connect(self.on_transcription_failed)
         self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
     
     def init_ui(self):
@@ -67,7 +211,11 @@ class VideoTranscriber(QWidget):
         self.media_player = QMediaPlayer()
         self.audio_output = QAudioOutput()
         self.media_player.setAudioOutput(self.audio_output)
-        self.media_player.setVideoOutput(self.video_widget)
+        self.media_player.mediaStatusChanged.connect(self.on_media_status_changed)
+        # Background jobs make way while this player plays
+        self.media_player.playbackStateChanged.connect(self.on_playback_state_changed)
+        player_id = id(self)
+        self.destroyed.connect(lambda: get_priority_scheduler().set_playing(player_id, False))
 
         # Right Section (Controls + Transcript)
         self.label = QLabel("Enter Video URL or PATH:")
@@ -82,12 +230,23 @@ class VideoTranscriber(QWidget):
         self.transcribe_button.clicked.connect(self.start_transcription)
         vertical_layout_1.addWidget(self.transcribe_button)
 
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.clicked.connect(self.toggle_pause)
+        self.pause_button.hide()
+        vertical_layout_1.addWidget(self.pause_button)
+
         # Add file selection button
         self.select_file_button = QPushButton("Select Video File")
         self.select_file_button.clicked.connect(self.select_video_file)
         vertical_layout_1.addWidget(self.select_file_button)
         
-        # Forward, pause and Backward buttons
+        # Slide, forward, pause and Backward buttons
+        self.previous_slide_button = QPushButton("⏮")
+        self.previous_slide_button.setToolTip("Previous slide (Page Up)")
+        self.previous_slide_button.setEnabled(False)  # Until the slides are found
+        self.previous_slide_button.clicked.connect(self.previous_slide)
+        horizontal_layout_2.addWidget(self.previous_slide_button, 0, Qt.AlignmentFlag.AlignLeft)
+
         self.backward_button = QPushButton("⏪")
         self.backward_button.clicked.connect(self.backward_10s)
         horizontal_layout_2.addWidget(self.backward_button, 0, Qt.AlignmentFlag.AlignLeft)
@@ -100,11 +259,23 @@ class VideoTranscriber(QWidget):
         self.forward_button.clicked.connect(self.forward_10s)
         horizontal_layout_2.addWidget(self.forward_button, 0, Qt.AlignmentFlag.AlignLeft)
 
-        # Slider for video position
-        self.position_slider = QSlider(Qt.Orientation.Horizontal)
+        self.next_slide_button = QPushButton("⏭")
+        self.next_slide_button.setToolTip("Next slide (Page Down)")
+        self.next_slide_button.setEnabled(False)
+        self.next_slide_button.clicked.connect(self.next_slide)
+        horizontal_layout_2.addWidget(self.next_slide_button, 0, Qt.AlignmentFlag.AlignLeft)
+
+        # Slider for video position, with the slide changes marked. Dragging it only shows
+        # previews, seeking on every move would keep the decoder busy on long lectures.
+        self.position_slider = TimelineSlider(Qt.Orientation.Horizontal)
         self.position_slider.setRange(0, 100)
-        self.position_slider.sliderMoved.connect(self.set_position)
+        self.position_slider.sliderReleased.connect(self.on_slider_released)
         horizontal_layout_2.addWidget(self.position_slider, 1)
+
+        # Waveform and speech regions under the slider, clicking it seeks
+        self.waveform_timeline = WaveformTimeline()
+        self.waveform_timeline.seek.connect(self.set_position)
+        vertical_layout_2.addWidget(self.waveform_timeline)
         
         self.output_text = QTextEdit()
         self.output_text.setReadOnly(True)
@@ -120,6 +291,17 @@ class VideoTranscriber(QWidget):
         self.speed_combo.addItems(["1.0x", "1.25x", "1.5x", "1.75x", "2.0x"])
         self.speed_combo.currentIndexChanged.connect(self.change_speed)
         horizontal_layout_3.addWidget(self.speed_combo)
+
+        # Jump over the long silent breaks found in the waveform
+        self.skip_silence_check = QCheckBox("Skip Silence")
+        horizontal_layout_3.addWidget(self.skip_silence_check)
+
+        # Listening only: no video is decoded nor drawn
+        self.audio_only_check = QCheckBox("Audio Only")
+        self.audio_only_check.setChecked(load_settings().get("audio_only_playback", False))
+        self.audio_only_check.toggled.connect(self.set_audio_only)
+        horizontal_layout_3.addWidget(self.audio_only_check)
+        self.set_video_output(not self.audio_only_check.isChecked())
         vertical_layout_1.addLayout(horizontal_layout_3)
 
         horizontal_layout_1.addLayout(vertical_layout_1, 1)
@@ -130,15 +312,21 @@ class VideoTranscriber(QWidget):
         # Update slider with video progress
         self.media_player.positionChanged.connect(self.update_transcription)
         self.media_player.positionChanged.connect(self.update_slider)
+        self.media_player.positionChanged.connect(self.waveform_timeline.set_position)
+        self.media_player.positionChanged.connect(self.skip_silence)
         self.media_player.durationChanged.connect(self.set_slider_range)
+        self.media_player.durationChanged.connect(self.waveform_timeline.set_duration)
     
     def start_transcription(self):
+        if self.token is not None:
+            self.token.cancel()  # The button reads "Cancel" while transcribing
+            self.transcribe_button.setEnabled(False)
+            return
         url = self.url_entry.text()
         if not url:
             self.output_text.setText("Please enter a video URL.")
             return
         
-        # threading.Thread(target=process_video, args=(url, self.output_text), daemon=True).start()
         selected_model = self.combo_box.currentText()
         self.process_video(url, selected_model)
 
@@ -149,36 +337,54 @@ class VideoTranscriber(QWidget):
             self.url_entry.setText(file_path)
 
     def process_video(self, url_or_path, model_name):
-        try:
-            video_path = "downloaded_video.mp4" if url_or_path.startswith("http") else url_or_path
-            audio_path = "audio.wav" # TODO: make this different
-            
-            if url_or_path.startswith("http"):
-                self.output_text.setText("Downloading video...")
-                download_video(url_or_path, video_path) # TODO: change with cached path
-            
-            # Check for cache
-            cache_file = get_cache_path(video_path, model_name)
-            print(cache_file)
-            if os.path.exists(cache_file):
-                print(f"Loading cached transcription: {cache_file}")
-                with open(cache_file, "r") as f:
-                    transcript = json.load(f)  # Load cached transcription
-            else : # If not cached, extract audio and transcribe
-                self.output_text.setText("Extracting audio...")
-                extract_audio(video_path, audio_path)
-                
-                self.output_text.setText("Transcribing audio...")
-                transcript = transcribe_audio(audio_path, video_path, model_name)
-            
-            self.output_text.setText("")
-            self.transcription_segments = transcript["segments"]
-            self.current_index = 0
-            self.media_player.setSource(QUrl.fromLocalFile(video_path))
-            self.media_player.play()
-            # self.update_transcription() # BUG: Causes crash we reloading the page
-        except Exception as e:
-            self.output_text.setText(f"Error: {str(e)}")
+        # In the background, so that it can be paused and cancelled from the buttons
+        self.token = CancellationToken()
+        self.transcribe_button.setText("Cancel")
+        self.pause_button.setText("Pause")
+        self.pause_button.show()
+        QThreadPool.globalInstance().start(TranscriptionTask(url_or_path, model_name, self.signals, self.token))
+
+    def toggle_pause(self):
+        if self.token is None:
+            return
+        if self.token.is_paused():
+            self.token.resume()
+            self.pause_button.setText("Pause")
+        else:
+            self.token.pause()
+            self.pause_button.setText("Resume")
+
+    def end_transcription(self):
+        self.token = None
+        self.transcribe_button.setText("Start Transcription")
+        self.transcribe_button.setEnabled(True)
+        self.pause_button.hide()
+
+    def on_transcription_finished(self, transcript, video_path):
+        self.end_transcription()
+        self.output_text.setText("")
+        self.transcription_segments = transcript["segments"]
+        self.current_index = 0
+        self.video_path = video_path
+        self.pending_position = None
+        self.media_player.setSource(QUrl.fromLocalFile(self.playback_source()))
+        self.media_player.play()
+        self.set_slides(None)
+        self.position_slider.set_sprites(None)
+        if not os.path.exists(video_path):
+            # Acquired audio only, the waveform comes from the cached audio and there is no picture
+            self.waveform_timeline.load(self.playback_source())
+            return
+        if load_settings().get("proxy_playback", False) and find_proxy(video_path) is None:
+            start_background_analysis(make_proxy, video_path, self.proxy_signals)
+        self.waveform_timeline.load(video_path)
+        start_background_analysis(get_slide_index, video_path, self.slide_signals)
+        start_background_analysis(get_sprite_sheets, video_path, self.sprite_signals)
+        # self.update_transcription() # BUG: Causes crash we reloading the page
+
+    def on_transcription_failed(self, message):
+        self.end_transcription()
+        self.output_text.setText(message)
 
     def update_transcription(self, position):
         """
@@ -317,12 +523,102 @@ class VideoTranscriber(QWidget):
     def set_position(self, position):
         self.media_player.setPosition(position)
     
+    def on_slider_released(self):
+        self.set_position(self.position_slider.value())
+
     def update_slider(self, position):
-        self.position_slider.setValue(position)
+        if not self.position_slider.isSliderDown():  # Leave the handle where the user drags it
+            self.position_slider.setValue(position)
     
     def set_slider_range(self, duration):
         self.position_slider.setRange(0, duration)
 
+    def set_slides(self, slides):
+        self.slides = slides
+        self.position_slider.set_slides(slides)
+        self.previous_slide_button.setEnabled(slides is not None)
+        self.next_slide_button.setEnabled(slides is not None)
+
+    def on_slides_ready(self, video_path, slides):
+        if video_path == self.video_path:  # Not replaced by another lecture meanwhile
+            self.set_slides(slides)
+
+    def playback_source(self):
+        """What to play for the lecture: its audio alone, its proxy or the video itself."""
+        audio_path = get_cache_audio_path(self.video_path)
+        if (self.audio_only_check.isChecked() or not os.path.exists(self.video_path)) and os.path.exists(audio_path):
+            return audio_path  # Cached by the audio only acquisition
+        if not self.audio_only_check.isChecked() and load_settings().get("proxy_playback", False):
+            # The lightweight proxy seeks and plays fast where the original is heavy to decode
+            return find_proxy(self.video_path) or self.video_path
+        return self.video_path  # Its video track is turned off in audio only
+
+    def on_proxy_ready(self, video_path, proxy_path):
+        if video_path == self.video_path and not self.audio_only_check.isChecked():
+            self.switch_source(proxy_path)
+
+    def set_video_output(self, enabled):
+        # Without a video output the player has no frames to render
+        self.media_player.setVideoOutput(self.video_widget if enabled else None)
+        self.video_widget.setVisible(enabled)
+
+    def set_audio_only(self, audio_only):
+        """Toggle audio only playback, mid lecture too, from the same position."""
+        settings = load_settings()
+        settings["audio_only_playback"] = audio_only
+        save_settings(settings)
+        self.set_video_output(not audio_only)
+        if self.video_path:
+            self.switch_source(self.playback_source())
+
+    def switch_source(self, path):
+        """Play path instead of the current source, from the same position and in the same state."""
+        state = self.media_player.playbackState()
+        self.pending_position = self.media_player.position()
+        self.media_player.setSource(QUrl.fromLocalFile(path))
+        if state == QMediaPlayer.PlaybackState.PlayingState:
+            self.media_player.play()
+        elif state == QMediaPlayer.PlaybackState.PausedState:
+            self.media_player.pause()
+
+    def on_media_status_changed(self, status):
+        if status != QMediaPlayer.MediaStatus.LoadedMedia and status != QMediaPlayer.MediaStatus.BufferedMedia:
+            return
+        if self.audio_only_check.isChecked() and self.media_player.activeVideoTrack() != -1:
+            self.media_player.setActiveVideoTrack(-1)  # Playing a video file, skip decoding its frames
+        # Seeking only works once the new source is loaded
+        if self.pending_position is not None:
+            self.media_player.setPosition(self.pending_position)
+            self.pending_position = None
+
+    def on_sprites_ready(self, video_path, sprites):
+        if video_path == self.video_path:
+            self.position_slider.set_sprites(sprites)
+
+    def next_slide(self):
+        if self.slides is not None:
+            target = self.slides.next_slide(self.media_player.position() / 1000)
+            if target is not None:
+                self.media_player.setPosition(int(target * 1000))
+
+    def previous_slide(self):
+        if self.slides is not None:
+            target = self.slides.previous_slide(self.media_player.position() / 1000)
+            self.media_player.setPosition(int(target * 1000))
+
+    def skip_silence(self, position):
+        waveform = self.waveform_timeline.waveform
+        if not self.skip_silence_check.isChecked() or waveform is None:
+            return
+        if self.media_player.playbackState() != QMediaPlayer.PlaybackState.PlayingState:
+            return  # Let the user look around a paused video
+        target = waveform.skip_target(position / 1000)
+        if target is not None:
+            self.media_player.setPosition(int(target * 1000))
+
+    def on_playback_state_changed(self, state):
+        get_priority_scheduler().set_playing(id(self), state == QMediaPlayer.PlaybackState.PlayingState)
+
     def toggle_playback(self):
         if self.media_player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
             self.media_player.pause()
@@ -344,5 +640,11 @@ class VideoTranscriber(QWidget):
         if event.key() == Qt.Key.Key_Space:
             self.toggle_playback()
             event.accept()
+        elif event.key() == Qt.Key.Key_PageDown:  # What presentation clickers send
+            self.next_slide()
+            event.accept()
+        elif event.key() == Qt.Key.Key_PageUp:
+            self.previous_slide()
+            event.accept()
         else:
             super().keyPressEvent(event)
\ No newline at end of file
@@ -1 +1,4 @@
-from .video_visualiser import *
\ No newline at end of file
+from .video_visualiser import *
+from .waveform import *
+from .slides import *
+from .sprites import *
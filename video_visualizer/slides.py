@@ -0,0 +1,151 @@
+import os, subprocess
+
+from pathlib import Path
+
+from cache_handler import *
+from job_scheduler.cancellation import check_token
+from job_scheduler.priority_scheduler import lower_child_priority
+
+from .waveform import media_stamp
+
+SLIDES_VERSION = 1
+SAMPLE_FPS = 1  # Frames analysed per second of video
+THUMBNAIL_WIDTH = 160  # Frames are decoded at this size, and kept as the slide thumbnails
+THUMBNAIL_HEIGHT = 90
+BATCH_FRAMES = 120  # Frames compared at a time
+
+# Slide changes
+PIXEL_THRESHOLD = 24  # Grey levels a pixel must change by to count as changed
+CHANGE_FRACTION = 0.06  # Of the pixels, a lecturer moving in a corner stays below
+STABLE_SECONDS = 2  # A change must still be there this much later, flashes and fades aren't slides
+MIN_SLIDE_SECONDS = 4  # Changes closer to the previous one are merged into a single slide
+PREVIOUS_GRACE = 2.0  # Seconds into a slide after which "previous" goes back to its start
+
+def get_slides_path(media_path):
+    return os.path.join(SLIDES_DIR, f"{Path(media_path).stem}.npz")
+
+class SlideIndex:
+    """Start times of the slides of a lecture, the first one at 0, and a thumbnail of each."""
+    def __init__(self, times, thumbnails):
+        self.times = times  # float32 seconds
+        self.thumbnails = thumbnails  # uint8 (n, THUMBNAIL_HEIGHT, THUMBNAIL_WIDTH, 3) RGB
+
+    def __len__(self):
+        return len(self.times)
+
+    def slide_at(self, position):
+        """Index of the slide shown at position seconds."""
+        import numpy as np
+        return max(0, int(np.searchsorted(self.times, position, side="right")) - 1)
+
+    def next_slide(self, position):
+        """Start of the slide after the one at position, None on the last slide."""
+        following = self.slide_at(position) + 1
+        return float(self.times[following]) if following < len(self.times) else None
+
+    def previous_slide(self, position):
+        """Start of the slide at position, or of the one before when it just started."""
+        current = self.slide_at(position)
+        if position - self.times[current] > PREVIOUS_GRACE or current == 0:
+            return float(self.times[current])
+        return float(self.times[current - 1])
+
+def _changed(before, after):
+    """For each pair of grey frames, whether enough pixels changed for a new slide."""
+    import numpy as np
+    difference = np.abs(before.astype(np.int16) - after.astype(np.int16)) > PIXEL_THRESHOLD
+    return difference.mean(axis=(1, 2)) > CHANGE_FRACTION
+
+def compute_slide_index(media_path, token=None):
+    """
+    Find the slide changes of a video. ffmpeg decodes SAMPLE_FPS frames per second already
+    downscaled to the thumbnail size, which runs at many times real time, and the frames
+    are compared BATCH_FRAMES at a time on half of that resolution in grey.
+    Only the frames around changes are kept in colour, for the thumbnails.
+    """
+    import numpy as np
+    command = ["ffmpeg", "-loglevel", "error", "-nostdin", "-i", media_path, "-an", "-sn",
+               "-vf", f"fps={SAMPLE_FPS},scale={THUMBNAIL_WIDTH}:{THUMBNAIL_HEIGHT}",
+               "-pix_fmt", "rgb24", "-f", "rawvideo", "-"]
+    frame_bytes = THUMBNAIL_WIDTH * THUMBNAIL_HEIGHT * 3
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    lower_child_priority(process)
+    greys, changes = [], []
+    kept = {}  # frame number -> colour frame, for the thumbnails
+    keep_next = False  # The first frame of the next batch follows a change, it shows the settled slide
+    count = 0
+    try:
+        while True:
+            check_token(token)
+            data = process.stdout.read(frame_bytes * BATCH_FRAMES)
+            frames_read = len(data) // frame_bytes
+            if not frames_read:
+                break
+            frames = np.frombuffer(data[:frames_read * frame_bytes], np.uint8).reshape(
+                frames_read, THUMBNAIL_HEIGHT, THUMBNAIL_WIDTH, 3)
+            grey = frames.reshape(frames_read, THUMBNAIL_HEIGHT // 2, 2, THUMBNAIL_WIDTH // 2, 2, 3)
+            grey = grey.mean(axis=(2, 4, 5)).astype(np.uint8)
+            previous = greys[-1][-1:] if greys else grey[:1]  # The first frame starts the first slide
+            changed = _changed(np.concatenate([previous, grey[:-1]]), grey)
+            wanted = changed | np.concatenate([[keep_next], changed[:-1]])
+            if not greys:
+                wanted[:2] = True  # The first slide
+            for i in np.flatnonzero(wanted):
+                kept[count + i] = frames[i].copy()
+            keep_next = bool(changed[-1])
+            greys.append(grey)
+            changes.append(changed)
+            count += frames_read
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+    if process.returncode != 0 or not count:
+        raise RuntimeError(f"Error decoding the frames of {media_path}")
+
+    grey = np.concatenate(greys)
+    candidates = np.flatnonzero(np.concatenate(changes))
+    candidates = candidates[candidates + STABLE_SECONDS * SAMPLE_FPS < count]  # Too late to tell
+    # Only changes still there STABLE_SECONDS later, compared with the frame before them, to
+    # a picture that stays put meanwhile: video clips and camera shots aren't slides
+    later = candidates + STABLE_SECONDS * SAMPLE_FPS
+    settled = ~_changed(grey[candidates + 1], grey[later])
+    candidates = candidates[_changed(grey[candidates - 1], grey[later]) & settled]
+    starts = [0]
+    for frame in candidates:
+        if frame - starts[-1] < MIN_SLIDE_SECONDS * SAMPLE_FPS and len(starts) > 1:
+            starts[-1] = int(frame)  # Transitions and builds, the slide starts once settled
+        elif frame - starts[-1] >= MIN_SLIDE_SECONDS * SAMPLE_FPS:
+            starts.append(int(frame))
+    thumbnails = np.stack([kept[min(frame + 1, count - 1)] for frame in starts])
+    return SlideIndex(np.array(starts, np.float32) / SAMPLE_FPS, thumbnails)
+
+def save_slide_index(index, media_path):
+    import numpy as np
+    os.makedirs(SLIDES_DIR, exist_ok=True)
+    path = get_slides_path(media_path)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez_compressed(tmp_path, version=SLIDES_VERSION, source=media_stamp(media_path), times=index.times,
+                        thumbnails=index.thumbnails)
+    os.replace(tmp_path, path)
+
+def load_slide_index(media_path):
+    """Cached slide index of media_path, None if missing or computed from another version of the file."""
+    import numpy as np
+    try:
+        with np.load(get_slides_path(media_path), allow_pickle=False) as data:
+            if int(data["version"]) != SLIDES_VERSION or list(data["source"]) != media_stamp(media_path):
+                return None
+            return SlideIndex(data["times"], data["thumbnails"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+def get_slide_index(media_path, token=None):
+    """Slide index of media_path, analysed and cached the first time."""
+    index = load_slide_index(media_path)
+    if index is None:
+        print(f"Looking for the slides of {media_path}")
+        index = compute_slide_index(media_path, token)
+        save_slide_index(index, media_path)
+    return index
@@ -0,0 +1,103 @@
+import os, json, shutil, ffmpeg
+
+from pathlib import Path
+
+from cache_handler import *
+from job_scheduler.cancellation import JobCancelled, wait_process
+
+from .waveform import media_stamp
+
+SPRITES_VERSION = 1
+SPRITE_INTERVAL = 10  # Seconds between two preview frames
+SPRITE_WIDTH = 160
+SPRITE_HEIGHT = 90
+SPRITE_COLUMNS = 10  # Frames per row of a sheet
+SPRITE_ROWS = 10  # Rows per sheet, a sheet covers 1000 s of video
+SPRITE_QUALITY = 5  # ffmpeg JPEG quality, 2 (best) to 31
+
+def get_sprites_dir(media_path):
+    return os.path.join(SPRITES_DIR, Path(media_path).stem)
+
+class SpriteSheets:
+    """
+    Preview frames of a video every SPRITE_INTERVAL seconds, packed row by row into a few
+    JPEG sheets of SPRITE_COLUMNS x SPRITE_ROWS frames.
+    """
+    def __init__(self, directory, index):
+        self.directory = directory
+        self.interval = index["interval"]
+        self.width = index["width"]
+        self.height = index["height"]
+        self.columns = index["columns"]
+        self.rows = index["rows"]
+        self.count = index["count"]
+        self.sheets = [os.path.join(directory, name) for name in index["sheets"]]
+
+    def locate(self, seconds):
+        """(sheet path, x, y) in its sheet of the last frame at or before seconds."""
+        frame = min(max(0, int(seconds // self.interval)), self.count - 1)
+        sheet, cell = divmod(frame, self.columns * self.rows)
+        row, column = divmod(cell, self.columns)
+        return self.sheets[sheet], column * self.width, row * self.height
+
+def compute_sprite_sheets(media_path, token=None):
+    """
+    Generate the sprite sheets of media_path with ffmpeg's tile filter. Only the keyframes
+    are decoded, previews don't need to be exact, so this runs at many times real time.
+    """
+    directory = get_sprites_dir(media_path)
+    tmp_dir = f"{directory}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    process = (
+        ffmpeg
+        .input(media_path, skip_frame="nokey")
+        .filter("fps", f"1/{SPRITE_INTERVAL}")
+        .filter("scale", SPRITE_WIDTH, SPRITE_HEIGHT, force_original_aspect_ratio="decrease")
+        .filter("pad", SPRITE_WIDTH, SPRITE_HEIGHT, "(ow-iw)/2", "(oh-ih)/2")
+        .filter("tile", f"{SPRITE_COLUMNS}x{SPRITE_ROWS}")
+        .output(os.path.join(tmp_dir, "sheet_%03d.jpg"), an=None, **{"q:v": SPRITE_QUALITY})
+        .run_async(pipe_stderr=True, overwrite_output=True)
+    )
+    try:
+        _, stderr = wait_process(process, token)
+    except JobCancelled:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    sheets = sorted(name for name in os.listdir(tmp_dir) if name.endswith(".jpg"))
+    if process.returncode != 0 or not sheets:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise RuntimeError(f"Error generating the previews of {media_path}: {stderr.decode(errors='replace')}")
+
+    # The last sheet is padded, the duration tells how many of its frames are real
+    capacity = len(sheets) * SPRITE_COLUMNS * SPRITE_ROWS
+    duration = get_video_duration(media_path)
+    count = min(capacity, int(duration // SPRITE_INTERVAL) + 1) if duration else capacity
+    index = {"version": SPRITES_VERSION, "source": media_stamp(media_path), "interval": SPRITE_INTERVAL,
+             "width": SPRITE_WIDTH, "height": SPRITE_HEIGHT, "columns": SPRITE_COLUMNS, "rows": SPRITE_ROWS,
+             "count": count, "sheets": sheets}
+    with open(os.path.join(tmp_dir, "index.json"), "w") as f:
+        json.dump(index, f)
+    shutil.rmtree(directory, ignore_errors=True)  # Of an older version of the file
+    os.replace(tmp_dir, directory)
+    return SpriteSheets(directory, index)
+
+def load_sprite_sheets(media_path):
+    """Cached sprite sheets of media_path, None if missing or generated from another version of the file."""
+    directory = get_sprites_dir(media_path)
+    try:
+        with open(os.path.join(directory, "index.json"), "r") as f:
+            index = json.load(f)
+        if index.get("version") != SPRITES_VERSION or index.get("source") != media_stamp(media_path):
+            return None
+        return SpriteSheets(directory, index)
+    except (OSError, ValueError):
+        return None
+
+def get_sprite_sheets(media_path, token=None):
+    """Sprite sheets of media_path, generated and cached the first time."""
+    sprites = load_sprite_sheets(media_path)
+    if sprites is None:
+        print(f"Generating the previews of {media_path}")
+        sprites = compute_sprite_sheets(media_path, token)
+    return sprites
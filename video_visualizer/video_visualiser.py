@@ -0,0 +1,328 @@
+import threading
+
+from PyQt6.QtWidgets import QWidget, QSlider, QLabel, QVBoxLayout, QStyle, QStyleOptionSlider
+from PyQt6.QtGui import QPainter, QColor, QPen, QImage, QPixmap
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QPoint, QRect, pyqtSignal
+
+from job_scheduler import get_priority_scheduler, PRIORITY_USER, PRIORITY_BACKGROUND
+
+from .waveform import get_waveform
+
+MIN_VIEW_SECONDS = 5  # Narrowest view the wheel zooms to
+ZOOM_STEP = 0.8  # View width factor per wheel step
+
+WAVEFORM_COLOR = QColor(170, 170, 170)
+SPEECH_COLOR = QColor(40, 90, 60)
+PLAYHEAD_COLOR = QColor(230, 60, 60)
+MARKER_COLOR = QColor(240, 200, 60)
+MARKER_HOVER_DISTANCE = 4  # Pixels from a slide marker its thumbnail is shown at
+
+def format_time(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}" if hours else f"{minutes}:{seconds:02}"
+
+def rgb_pixmap(frame):
+    """QPixmap of a (height, width, 3) uint8 RGB array."""
+    height, width = frame.shape[:2]
+    image = QImage(frame.tobytes(), width, height, 3 * width, QImage.Format.Format_RGB888)
+    return QPixmap.fromImage(image.copy())  # The copy owns its pixels
+
+class WaveformSignals(QObject):
+    ready = pyqtSignal(str, object)  # media path, Waveform
+    failed = pyqtSignal(str, str)  # media path, message
+
+class WaveformTask(QRunnable):
+    """Loads the waveform of a lecture, computing it the first time."""
+    def __init__(self, media_path, signals):
+        super().__init__()
+        self.media_path = media_path
+        self.signals = signals
+
+    def run(self):
+        try:
+            with get_priority_scheduler().job(PRIORITY_USER):
+                waveform = get_waveform(self.media_path)
+            self.signals.ready.emit(self.media_path, waveform)
+        except Exception as e:
+            self.signals.failed.emit(self.media_path, str(e))
+
+class WaveformTimeline(QWidget):
+    """
+    Audio waveform of the lecture under the position slider, with its speech regions shaded.
+    Clicking seeks, dragging previews the time under the pointer and seeks once released, the
+    wheel zooms around the pointer. Each paint takes one peak per pixel from the waveform
+    pyramid, whatever the zoom.
+    """
+    seek = pyqtSignal(int)  # ms
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.waveform = None
+        self.media_path = None
+        self.duration = 0  # ms, from the player
+        self.position = 0  # ms
+        self.drag_position = None  # ms under the pointer while dragging, sought on release
+        self.view = None  # (start, end) seconds when zoomed in, None for the whole lecture
+        self.signals = WaveformSignals()
+        self.signals.ready.connect(self.on_waveform_ready)
+        self.signals.failed.connect(self.on_waveform_failed)
+        self.setMinimumHeight(48)
+
+    # --- Data --- #
+    def load(self, media_path):
+        """Show the waveform of media_path once it is loaded, in the background."""
+        self.media_path = media_path
+        self.waveform = None
+        self.view = None
+        self.update()
+        QThreadPool.globalInstance().start(WaveformTask(media_path, self.signals))
+
+    def on_waveform_ready(self, media_path, waveform):
+        if media_path == self.media_path:  # Not replaced by another lecture meanwhile
+            self.waveform = waveform
+            self.update()
+
+    def on_waveform_failed(self, media_path, message):
+        print(f"No waveform for {media_path}: {message}")
+
+    def set_duration(self, duration):
+        self.duration = duration
+        self.update()
+
+    def set_position(self, position):
+        self.position = position
+        if self.view is not None:
+            # Follow the playhead when zoomed in
+            start, end = self.view
+            seconds = position / 1000
+            if not start <= seconds <= end:
+                self.view = self._clamp_view(seconds - (end - start) / 4, end - start)
+        self.update()
+
+    # --- Geometry --- #
+    def total_seconds(self):
+        if self.waveform is not None:
+            return max(self.waveform.duration, self.duration / 1000)
+        return self.duration / 1000
+
+    def visible_range(self):
+        return self.view or (0.0, self.total_seconds())
+
+    def _clamp_view(self, start, width):
+        total = self.total_seconds()
+        if width >= total:
+            return None
+        start = min(max(0.0, start), total - width)
+        return (start, start + width)
+
+    def time_at(self, x):
+        start, end = self.visible_range()
+        return start + (end - start) * min(max(x, 0), self.width()) / max(1, self.width())
+
+    def x_at(self, seconds):
+        start, end = self.visible_range()
+        return (seconds - start) * self.width() / max(end - start, 1e-9)
+
+    # --- Events --- #
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton and self.total_seconds():
+            self.drag_position = int(self.time_at(event.position().x()) * 1000)
+            self.update()
+
+    def mouseMoveEvent(self, event):
+        # Only previewed, seeking on every move would keep the decoder busy
+        if self.drag_position is not None:
+            self.drag_position = int(self.time_at(event.position().x()) * 1000)
+            self.update()
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton and self.drag_position is not None:
+            position, self.drag_position = self.drag_position, None
+            self.seek.emit(position)
+            self.update()
+
+    def wheelEvent(self, event):
+        if not self.total_seconds():
+            return
+        start, end = self.visible_range()
+        anchor = self.time_at(event.position().x())
+        factor = ZOOM_STEP if event.angleDelta().y() > 0 else 1 / ZOOM_STEP
+        width = max(MIN_VIEW_SECONDS, (end - start) * factor)
+        # Keep the time under the pointer where it is
+        self.view = self._clamp_view(anchor - (anchor - start) * width / (end - start), width)
+        self.update()
+        event.accept()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(25, 25, 25))
+        width, height = self.width(), self.height()
+        start, end = self.visible_range()
+        if self.waveform is None or end <= start:
+            painter.setPen(WAVEFORM_COLOR)
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter,
+                             "Computing waveform..." if self.media_path else "")
+            return
+
+        for speech_start, speech_end in self.waveform.speech_between(start, end):
+            x0, x1 = self.x_at(speech_start), self.x_at(speech_end)
+            painter.fillRect(int(x0), 0, max(1, int(x1 - x0)), height, SPEECH_COLOR)
+
+        painter.setPen(QPen(WAVEFORM_COLOR, 1))
+        middle = height / 2
+        for x, peak in enumerate(self.waveform.peaks(start, end, width)):
+            half = peak * middle
+            painter.drawLine(x, int(middle - half), x, int(middle + half))
+
+        painter.setPen(QPen(PLAYHEAD_COLOR, 2))
+        x = int(self.x_at(self.position / 1000))
+        painter.drawLine(x, 0, x, height)
+
+        if self.drag_position is not None:
+            painter.setPen(QPen(PLAYHEAD_COLOR, 1, Qt.PenStyle.DashLine))
+            x = int(self.x_at(self.drag_position / 1000))
+            painter.drawLine(x, 0, x, height)
+            caption = format_time(self.drag_position / 1000)
+            # Beside the line, on its left near the right edge
+            text_width = painter.fontMetrics().horizontalAdvance(caption)
+            text_x = x + 4 if x + 4 + text_width <= width else x - 4 - text_width
+            painter.setPen(Qt.GlobalColor.white)
+            painter.drawText(text_x, painter.fontMetrics().ascent() + 2, caption)
+
+class AnalysisSignals(QObject):
+    ready = pyqtSignal(str, object)  # media path, result
+    failed = pyqtSignal(str, str)  # media path, message
+
+def start_background_analysis(analysis, media_path, signals):
+    """
+    Run analysis(media_path), e.g. get_slide_index(), as a background job on a thread of
+    its own so that its lowered priority goes away with it. Analyses cache their result.
+    """
+    def run():
+        try:
+            with get_priority_scheduler().job(PRIORITY_BACKGROUND):
+                result = analysis(media_path)
+            signals.ready.emit(media_path, result)
+        except Exception as e:
+            signals.failed.emit(media_path, str(e))
+    threading.Thread(target=run, daemon=True).start()
+
+class HoverPreview(QWidget):
+    """Frame and caption floating above the position slider."""
+    def __init__(self, parent=None):
+        super().__init__(parent, Qt.WindowType.ToolTip)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(2, 2, 2, 2)
+        layout.setSpacing(2)
+        self.image_label = QLabel()
+        self.caption_label = QLabel()
+        self.caption_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.image_label)
+        layout.addWidget(self.caption_label)
+
+    def show_at(self, pixmap, caption, anchor):
+        """Show centered above anchor, a global position."""
+        self.image_label.setPixmap(pixmap)
+        self.caption_label.setText(caption)
+        self.adjustSize()
+        self.move(anchor.x() - self.width() // 2, anchor.y() - self.height() - 4)
+        self.show()
+
+class TimelineSlider(QSlider):
+    """
+    Position slider, in ms, with a marker at each slide change of the lecture. Hovering it
+    or dragging its handle previews the frame there from the sprite sheets, and the slide
+    thumbnail near a marker. The owner seeks once the handle is released.
+    """
+    def __init__(self, orientation, parent=None):
+        super().__init__(orientation, parent)
+        self.slides = None
+        self.slide_pixmaps = {}  # slide -> QPixmap of its thumbnail
+        self.sprites = None
+        self.sheet_pixmaps = {}  # sheet path -> QPixmap, decoded on first use
+        self.preview = HoverPreview(self)
+        self.setMouseTracking(True)
+
+    def set_slides(self, slides):
+        self.slides = slides
+        self.slide_pixmaps = {}
+        self.update()
+
+    def set_sprites(self, sprites):
+        self.sprites = sprites
+        self.sheet_pixmaps = {}
+
+    def _groove(self):
+        """(left end, span) of the positions the center of the handle takes."""
+        option = QStyleOptionSlider()
+        self.initStyleOption(option)
+        groove = self.style().subControlRect(QStyle.ComplexControl.CC_Slider, option,
+                                             QStyle.SubControl.SC_SliderGroove, self)
+        handle = self.style().subControlRect(QStyle.ComplexControl.CC_Slider, option,
+                                             QStyle.SubControl.SC_SliderHandle, self)
+        return groove.x() + handle.width() // 2, groove.width() - handle.width()
+
+    def x_at(self, value):
+        """Horizontal position of value on the groove."""
+        left, span = self._groove()
+        return left + QStyle.sliderPositionFromValue(self.minimum(), self.maximum(), value, span)
+
+    def value_at(self, x):
+        left, span = self._groove()
+        return QStyle.sliderValueFromPosition(self.minimum(), self.maximum(), x - left, span)
+
+    def marker_positions(self):
+        """(slide, x) of the slide changes within the range, the first slide has no marker."""
+        if self.slides is None or self.maximum() <= self.minimum():
+            return []
+        return [(slide, self.x_at(int(seconds * 1000))) for slide, seconds in enumerate(self.slides.times)
+                if slide and seconds * 1000 <= self.maximum()]
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        markers = self.marker_positions()
+        if not markers:
+            return
+        painter = QPainter(self)
+        painter.setPen(QPen(MARKER_COLOR, 2))
+        height = self.height()
+        for _, x in markers:
+            painter.drawLine(x, 0, x, 4)
+            painter.drawLine(x, height - 5, x, height - 1)
+
+    def mouseMoveEvent(self, event):
+        super().mouseMoveEvent(event)
+        if self.isSliderDown():
+            self.update_preview(self.x_at(self.value()), dragging=True)  # Follow the handle
+        else:
+            self.update_preview(int(event.position().x()))
+
+    def mouseReleaseEvent(self, event):
+        super().mouseReleaseEvent(event)
+        self.preview.hide()
+
+    def leaveEvent(self, event):
+        self.preview.hide()
+        super().leaveEvent(event)
+
+    def update_preview(self, x, dragging=False):
+        nearest = min(self.marker_positions(), key=lambda marker: abs(marker[1] - x), default=None)
+        if not dragging and nearest is not None and abs(nearest[1] - x) <= MARKER_HOVER_DISTANCE:
+            slide, marker_x = nearest
+            if slide not in self.slide_pixmaps:
+                self.slide_pixmaps[slide] = rgb_pixmap(self.slides.thumbnails[slide])
+            caption = f"Slide {slide + 1}, {format_time(self.slides.times[slide])}"
+            self.preview.show_at(self.slide_pixmaps[slide], caption, self.mapToGlobal(QPoint(marker_x, 0)))
+        elif self.sprites is not None and self.maximum() > self.minimum():
+            seconds = self.value_at(x) / 1000
+            self.preview.show_at(self.sprite_frame(seconds), format_time(seconds), self.mapToGlobal(QPoint(x, 0)))
+        else:
+            self.preview.hide()
+
+    def sprite_frame(self, seconds):
+        """Preview frame at seconds, cut out of its sprite sheet."""
+        sheet, x, y = self.sprites.locate(seconds)
+        if sheet not in self.sheet_pixmaps:
+            self.sheet_pixmaps[sheet] = QPixmap(sheet)
+        return self.sheet_pixmaps[sheet].copy(QRect(x, y, self.sprites.width, self.sprites.height))
@@ -0,0 +1,184 @@
+import os, subprocess
+
+from pathlib import Path
+
+from cache_handler import *
+from job_scheduler.cancellation import check_token
+from job_scheduler.priority_scheduler import lower_child_priority
+
+WAVEFORM_VERSION = 1
+WAVEFORM_RATE = 8000  # Hz the audio is decoded at, plenty for peaks and speech energy
+BIN_SAMPLES = 80  # Samples per bin of the finest level, 10 ms
+BIN_SECONDS = BIN_SAMPLES / WAVEFORM_RATE
+DECODE_CHUNK = 60 * WAVEFORM_RATE * 2  # Bytes of PCM reduced at a time, a minute of audio
+
+# Speech activity
+SPEECH_MARGIN_DB = 12  # Above the noise floor, the 10th percentile of the bin energies
+SPEECH_HANGOVER = 0.3  # Seconds speech is extended by on both sides, bridges the pauses between words
+MIN_SPEECH = 0.25  # Seconds, shorter bursts (clicks, coughs) are not speech
+MIN_SKIPPED_SILENCE = 2.0  # Seconds, shorter silences are not skipped
+SKIP_MARGIN = 0.3  # Seconds of silence kept before the speech a skip lands on
+
+def get_waveform_path(media_path):
+    """Waveforms are named after the lecture, like the transcripts."""
+    return os.path.join(WAVEFORM_DIR, f"{Path(media_path).stem}.npz")
+
+class Waveform:
+    """
+    Peaks pyramid and speech regions of a lecture. levels[0] holds the peak of every
+    BIN_SECONDS of audio, each following level the peak of two bins of the previous one,
+    so any zoom level is drawn from the level with about one bin per pixel.
+    """
+    def __init__(self, levels, speech, duration):
+        self.levels = levels  # uint8 peaks, 255 for full scale
+        self.speech = speech  # float32 (n, 2) start and end seconds of the speech regions
+        self.duration = duration
+
+    def peaks(self, start, end, pixels):
+        """
+        Peak of each of pixels columns between start and end seconds, as floats in [0, 1]
+        relative to the loudest peak of the lecture so that quiet recordings stay visible.
+        """
+        import numpy as np
+        if pixels <= 0 or end <= start:
+            return np.zeros(max(pixels, 0), np.float32)
+        seconds_per_pixel = (end - start) / pixels
+        level = 0
+        while level + 1 < len(self.levels) and BIN_SECONDS * 2 ** (level + 1) <= seconds_per_pixel:
+            level += 1
+        bins = self.levels[level]
+        bin_seconds = BIN_SECONDS * 2 ** level
+        edges = ((start + np.arange(pixels + 1) * seconds_per_pixel) / bin_seconds).astype(np.int64)
+        edges = np.clip(edges, 0, len(bins))
+        # About two bins per column, columns past the end of the audio stay empty
+        columns = np.zeros(pixels, np.float32)
+        inside = edges[:-1] < len(bins)
+        if inside.any():
+            columns[inside] = _column_peaks(bins, edges[:-1][inside], edges[1:][inside])
+        return columns / max(1, int(self.levels[-1][0]))  # The top level is the loudest peak
+
+    def speech_between(self, start, end):
+        """Speech regions overlapping [start, end], as (start, end) seconds."""
+        import numpy as np
+        first = np.searchsorted(self.speech[:, 1], start)
+        last = np.searchsorted(self.speech[:, 0], end)
+        return self.speech[first:last]
+
+    def skip_target(self, position):
+        """
+        Where to jump from position, in seconds, to skip the silence it is in: shortly
+        before the next speech, None if position isn't in a silence of MIN_SKIPPED_SILENCE.
+        """
+        import numpy as np
+        following = np.searchsorted(self.speech[:, 0], position, side="right")
+        if following > 0 and self.speech[following - 1, 1] > position:
+            return None  # Inside speech
+        silence_end = self.speech[following, 0] if following < len(self.speech) else self.duration
+        if silence_end - position < MIN_SKIPPED_SILENCE:
+            return None
+        return max(position, silence_end - SKIP_MARGIN)
+
+def _column_peaks(bins, first, last):
+    import numpy as np
+    # reduceat() reduces from each start to the next one and the last column to the end of
+    # the array, so it is cut at the end of the view. Empty columns take their first bin.
+    end = max(int(last[-1]), int(first[-1]) + 1)
+    peaks = np.maximum.reduceat(bins[:end], first)
+    return np.where(last > first, peaks, bins[first])
+
+def _build_pyramid(level):
+    import numpy as np
+    levels = [level]
+    while len(level) > 1:
+        if len(level) % 2:
+            level = np.append(level, level[-1])
+        level = level.reshape(-1, 2).max(axis=1)
+        levels.append(level)
+    return levels
+
+def _detect_speech(energies):
+    """Speech regions, in seconds, from the mean square of every bin."""
+    import numpy as np
+    if not len(energies):
+        return np.zeros((0, 2), np.float32)
+    db = 10 * np.log10(energies + 1e-10)
+    floor, loud = np.percentile(db, [10, 95])
+    threshold = min(floor + SPEECH_MARGIN_DB, loud - 3)
+    active = db > threshold
+    # Dilate by the hangover so that short pauses stay inside the region
+    hangover = int(SPEECH_HANGOVER / BIN_SECONDS)
+    active = np.convolve(active, np.ones(2 * hangover + 1), mode="same") > 0
+    changes = np.diff(np.concatenate([[0], active.astype(np.int8), [0]]))
+    starts = np.flatnonzero(changes == 1)
+    ends = np.flatnonzero(changes == -1)
+    keep = (ends - starts) * BIN_SECONDS >= MIN_SPEECH
+    return (np.stack([starts[keep], ends[keep]], axis=1) * BIN_SECONDS).astype(np.float32)
+
+def compute_waveform(media_path, token=None):
+    """
+    Decode the audio of media_path and reduce it to a Waveform, a minute at a time so that
+    only the bins are kept in memory. token cancels the decoding.
+    """
+    import numpy as np
+    command = ["ffmpeg", "-loglevel", "error", "-nostdin", "-i", media_path, "-vn", "-ac", "1",
+               "-ar", str(WAVEFORM_RATE), "-f", "s16le", "-"]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    lower_child_priority(process)
+    peaks, energies = [], []
+    try:
+        while True:
+            check_token(token)
+            data = process.stdout.read(DECODE_CHUNK)  # Whole bins, DECODE_CHUNK is a multiple
+            if not data:
+                break
+            samples = np.frombuffer(data[:len(data) - len(data) % 2], np.int16).astype(np.float32)
+            samples = np.pad(samples, (0, -len(samples) % BIN_SAMPLES)).reshape(-1, BIN_SAMPLES) / 32768.0
+            peaks.append(np.abs(samples).max(axis=1))
+            energies.append((samples ** 2).mean(axis=1))
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+    if process.returncode != 0 or not peaks:
+        raise RuntimeError(f"Error decoding the audio of {media_path}")
+    peaks = np.concatenate(peaks)
+    level = np.round(np.minimum(peaks, 1.0) * 255).astype(np.uint8)
+    return Waveform(_build_pyramid(level), _detect_speech(np.concatenate(energies)), len(peaks) * BIN_SECONDS)
+
+def media_stamp(media_path):
+    """Size and mtime of a media file, what the analyses cached for it are checked against."""
+    stat = os.stat(media_path)
+    return [stat.st_size, int(stat.st_mtime)]
+
+def save_waveform(waveform, media_path):
+    import numpy as np
+    os.makedirs(WAVEFORM_DIR, exist_ok=True)
+    path = get_waveform_path(media_path)
+    tmp_path = f"{path}.tmp.npz"  # savez() adds .npz to names without it
+    arrays = {f"level_{i}": level for i, level in enumerate(waveform.levels)}
+    np.savez(tmp_path, version=WAVEFORM_VERSION, source=media_stamp(media_path), duration=waveform.duration,
+             speech=waveform.speech, **arrays)
+    os.replace(tmp_path, path)
+
+def load_waveform(media_path):
+    """Cached waveform of media_path, None if missing or computed from another version of the file."""
+    import numpy as np
+    path = get_waveform_path(media_path)
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != WAVEFORM_VERSION or list(data["source"]) != media_stamp(media_path):
+                return None
+            levels = [data[f"level_{i}"] for i in range(sum(name.startswith("level_") for name in data.files))]
+            return Waveform(levels, data["speech"], float(data["duration"]))
+    except (OSError, KeyError, ValueError):
+        return None
+
+def get_waveform(media_path, token=None):
+    """Waveform of media_path, computed and cached the first time."""
+    waveform = load_waveform(media_path)
+    if waveform is None:
+        print(f"Computing the waveform of {media_path}")
+        waveform = compute_waveform(media_path, token)
+        save_waveform(waveform, media_path)
+    return waveform